@@ -0,0 +1,320 @@
+# python
+import time
+
+from google.genai import types
+
+from config import MAX_ITERS, MAX_PARALLEL_TOOLS, CONTEXT_CACHE_ENABLED, SPECULATIVE_ATTEMPTS, WORKING_DIRECTORY
+from prompts import system_prompt
+from call_functions import get_available_functions
+from history import History
+from prompt_cache import PromptCache
+from functions.dispatch import CallScheduler
+from functions.call_function import set_working_directory, READ_ONLY_FUNCTIONS
+from functions.cache import new_session, set_turn
+from transcript import touched_paths
+from speculate import find_failing_run, race
+from tracing import get_tracer
+
+
+def _print_text(text):
+    # Default sink for streamed answer text: write it to the terminal immediately
+    print(text, end="", flush=True)
+
+
+class SessionStats:
+    # Totals for one run, filled in by run_agent when one is passed in
+    def __init__(self):
+        self.iterations = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.response_tokens = 0
+
+
+def _changes_files(calls):
+    # Whether a turn may have modified the working tree through the write tools
+    return any(fc.name not in READ_ONLY_FUNCTIONS and fc.name != "run_python_file" for fc in calls)
+
+
+def _record_adopted(transcript, messages, turn):
+    # Checkpoint messages taken over from a speculative attempt, numbering turns
+    # the way the loop would have: a model message opens a turn, its tool
+    # results share it, and other user messages belong to the next one
+    for content in messages:
+        if content.role == "model":
+            turn += 1
+            transcript.record(turn, content)
+        elif any(part.function_response for part in content.parts or []):
+            transcript.record(turn, content)
+        else:
+            transcript.record(turn + 1, content)
+
+
+def _merge_text_parts(parts):
+    # Streaming splits text across many chunks; join neighbouring text parts so the
+    # conversation history holds one part per text block rather than one per chunk
+    merged = []
+    for part in parts:
+        if part.text is not None and not part.thought and merged and merged[-1].text is not None:
+            merged[-1] = types.Part(text=merged[-1].text + part.text)
+        else:
+            merged.append(part)
+    return merged
+
+
+async def run_agent(backend, prompt, verbose=False, max_parallel_tools=MAX_PARALLEL_TOOLS, on_text=_print_text,
+                    history=None, transcript=None, working_directory=None, stats=None,
+                    context_cache=CONTEXT_CACHE_ENABLED, speculate=SPECULATIVE_ATTEMPTS, max_iters=MAX_ITERS,
+                    verify=None):
+    # Run the agent loop against a model backend (see backends.py). Answer text
+    # is streamed to on_text as it arrives, and tool calls start executing as
+    # soon as their function_call parts show up in the stream. A resumed session
+    # passes its restored history; with a transcript every turn is checkpointed
+    # to disk. Tools run against working_directory (config.WORKING_DIRECTORY by
+    # default). With context_cache, the stable prompt prefix is served from a
+    # server-side cache that is deleted when the run ends. With speculate > 1,
+    # the first failing run_python_file branches the session into that many
+    # concurrent fix attempts (see speculate.py); an attempt is itself a run with
+    # a verify callback, and stops as soon as a verification passes. Returns a
+    # process exit code.
+    if history is None:
+        history = History(prompt)
+    if working_directory is not None:
+        set_working_directory(working_directory)
+    else:
+        working_directory = WORKING_DIRECTORY
+    config = types.GenerateContentConfig(
+        tools=[get_available_functions()],     # provide the list of callable tools
+        system_instruction=system_prompt,      # guide the model's behavior
+    )
+    prompt_cache = PromptCache(backend, config) if context_cache else None
+    try:
+        return await _run_turns(
+            backend, prompt, history, config, prompt_cache, verbose, max_parallel_tools, on_text, transcript, stats,
+            working_directory, speculate, max_iters, verify,
+        )
+    finally:
+        if prompt_cache is not None:
+            await prompt_cache.close()
+
+
+async def _run_turns(backend, prompt, history, config, prompt_cache, verbose, max_parallel_tools, on_text,
+                     transcript, stats, working_directory, speculate, max_iters, verify):
+    # Each run gets its own tool cache; its "unchanged since turn N" markers name
+    # turns of this run's history, which forks and adopted attempts keep numbering
+    cache = new_session()
+    tracer = get_tracer()
+
+    async def run_attempt(fork, attempt_directory, attempt_verify):
+        # One speculative attempt: a sub-session with the turns this run has left
+        return await run_agent(
+            backend, prompt, verbose=verbose, max_parallel_tools=max_parallel_tools, on_text=lambda text: None,
+            history=fork, working_directory=attempt_directory, stats=stats, context_cache=prompt_cache is not None,
+            speculate=0, max_iters=max_iters - turn, verify=attempt_verify,
+        )
+
+    turn = 0
+    while turn < max_iters:
+        turn += 1
+        with tracer.span("iteration", "agent", turn=turn) as iteration:
+            turn_start = time.perf_counter()
+            scheduler = CallScheduler(max_parallel=max_parallel_tools, verbose=verbose)
+            # Tool calls start while the response streams in, before it is added to
+            # the history, so they belong to the turn the history is about to get
+            set_turn(history.turn + 1)
+            calls = []
+            model_parts = []
+            streamed_text = False
+            meta = None
+            # Drop stale tool outputs before resending the history if it grew past the budget
+            with tracer.span("compact", "history") as compact_span:
+                saved_tokens = history.compact()
+                compact_span.set(saved_tokens=saved_tokens, history_tokens=history.total_tokens())
+            try:
+                # bytes_out is the serialized request size, estimated from the history
+                with tracer.span("model", "model", turn=turn, bytes_out=history.total_tokens() * 4) as model_span:
+                    # Send the conversation history (minus any cached prefix) and stream the next response
+                    contents, request_config = (
+                        await prompt_cache.prepare(history) if prompt_cache else (history.messages, config)
+                    )
+                    stream = await backend.generate_content_stream(
+                        contents=contents,
+                        config=request_config,
+                    )
+                    async for chunk in stream:
+                        # Usage metadata is cumulative; the last chunk carries the totals
+                        meta = getattr(chunk, "usage_metadata", None) or meta
+                        if not getattr(chunk, "candidates", None):
+                            continue
+                        content = chunk.candidates[0].content
+                        if content is None or not content.parts:
+                            continue
+                        for part in content.parts:
+                            model_parts.append(part)
+                            if part.function_call:
+                                # Start the tool right away instead of waiting for the full response
+                                calls.append(part.function_call)
+                                scheduler.submit(part.function_call)
+                            elif part.text and not part.thought:
+                                on_text(part.text)
+                                streamed_text = True
+
+                    # Check that we received a usable response
+                    if not model_parts:
+                        raise RuntimeError("Gemini API response contained no candidates")
+                    if tracer.enabled:
+                        model_span.set(
+                            prompt_tokens=meta.prompt_token_count if meta else None,
+                            cached_tokens=meta.cached_content_token_count if meta else None,
+                            response_tokens=meta.candidates_token_count if meta else None,
+                            bytes_in=sum(len(part.model_dump_json(exclude_none=True)) for part in model_parts),
+                        )
+
+                # Add the model's response to the conversation history
+                history.add_model(types.Content(role="model", parts=_merge_text_parts(model_parts)))
+                if transcript is not None:
+                    transcript.record(history.turn, history.messages[-1])
+
+                # Remember how long the model took for the per-turn timing line
+                model_seconds = time.perf_counter() - turn_start
+                iteration.set(calls=len(calls))
+                if stats is not None:
+                    stats.iterations += 1
+                    if meta:
+                        stats.prompt_tokens += meta.prompt_token_count or 0
+                        stats.cached_tokens += meta.cached_content_token_count or 0
+                        stats.response_tokens += meta.candidates_token_count or 0
+
+            except ValueError as e:
+                # The request had invalid parameters
+                print(f"Invalid request parameters:  {e}")
+                return 1
+
+            except ConnectionError as e:
+                # Network connection to the API failed
+                print(f"Network error connecting to Gemini API:  {e}")
+                return 1
+
+            except Exception as e:
+                # Catch any other errors from the API call
+                print(f"generate_content failed: {e}")
+                return 1
+
+            try:
+                # Finish the streamed answer line before any verbose output
+                if streamed_text:
+                    on_text("\n")
+
+                # Display token usage information if verbose mode is enabled
+                if verbose:
+                    print()
+                    print(f'User prompt: "{prompt}"')
+                    if not meta:
+                        print("Warning:  No usage metadata available.")
+                    else:
+                        print(
+                            f"Prompt tokens: {meta.prompt_token_count} "
+                            f"({meta.cached_content_token_count or 0} served from context cache, "
+                            f"history compaction saved ~{saved_tokens})"
+                        )
+                        print(f"Response tokens: {meta.candidates_token_count}")
+
+                if calls:
+                    # Wait for the tools that were started while the response streamed in
+                    results = await scheduler.results()
+                    tools_seconds = time.perf_counter() - turn_start - model_seconds
+
+                    response_parts = []
+                    for fc, (function_call_result, _) in zip(calls, results):
+                        # Ensure the function returned a properly structured result
+                        if not function_call_result.parts:
+                            print(f"Function call error:  Function '{fc.name}' returned no parts")
+                            return 1
+
+                        if not function_call_result.parts[0].function_response:
+                            print(f"Function call error:  Function '{fc.name}' returned invalid response structure")
+                            return 1
+
+                        # Collect the function's output, keeping the original call order
+                        response_parts.append(
+                            types.Part(
+                                function_response=function_call_result.parts[0].function_response
+                            )
+                        )
+
+                        # Show the function output in verbose mode
+                        if verbose:
+                            print(f"-> {function_call_result.parts[0].function_response.response}")
+
+                    # Add all of the turn's function outputs to the conversation as one message
+                    history.add_tool_results(response_parts)
+                    if transcript is not None:
+                        transcript.record(history.turn, history.messages[-1])
+                        transcript.record_files(history.turn, touched_paths(calls))
+
+                    if verify is not None and _changes_files(calls):
+                        # Speculative attempt: re-run the failing command against this attempt's tree
+                        passed, note = await verify()
+                        history.add_user(note)
+                        if passed:
+                            return 0
+                    elif speculate > 1 and turn < max_iters:
+                        failing = find_failing_run(calls, [content for content, _ in results])
+                        if failing is not None:
+                            if verbose:
+                                print(f"Reproduced a failure with `{failing.command()}`; starting {speculate} attempts")
+                            winner, attempts = await race(
+                                history, failing, working_directory, speculate, run_attempt, verbose=verbose
+                            )
+                            # The race used as many turns as its longest-running attempt
+                            turn += max(attempt.history.turn for attempt in attempts) - history.turn
+                            if winner is not None:
+                                # Carry on from the verified attempt, whose changes are now in the tree
+                                adopted = winner.history.messages[len(history.messages):]
+                                if transcript is not None:
+                                    _record_adopted(transcript, adopted, history.turn)
+                                    adopted_calls = [
+                                        part.function_call for content in adopted if content.role == "model"
+                                        for part in content.parts or [] if part.function_call
+                                    ]
+                                    transcript.record_files(winner.history.turn, touched_paths(adopted_calls))
+                                history = winner.history
+                            else:
+                                history.add_user(
+                                    f"None of the {speculate} speculative attempts made `{failing.command()}` pass; "
+                                    "their changes were discarded. Keep working on the fix here."
+                                )
+                                if transcript is not None:
+                                    transcript.record(history.turn + 1, history.messages[-1])
+                            speculate = 0
+
+                    # Show where the turn's wall-clock time went in verbose mode
+                    if verbose:
+                        serial_seconds = sum(seconds for _, seconds in results)
+                        print(
+                            f"Turn {turn}: model {model_seconds:.2f}s, "
+                            f"tools {tools_seconds:.2f}s after stream / {serial_seconds:.2f}s serial "
+                            f"({len(calls)} calls)"
+                        )
+                        print(cache.stats())
+                        if prompt_cache is not None:
+                            print(prompt_cache.stats())
+
+                    # Go back to the start of the loop so the model can process the function results
+                    continue
+
+                # If there are no function calls, the streamed text was the final answer
+                if streamed_text:
+                    return 0
+
+            except (IndexError, AttributeError) as e:
+                print(f"Function returned malformed response:  {e}")
+                return 1
+
+            except Exception as e:
+                # Handle any unexpected errors while processing the response
+                print(f"failed to read response: {e}")
+                return 1
+
+    # The loop finished without a final answer (hit max iterations)
+    print(f"Warning: Agent reached maximum iterations ({max_iters}) without completing")
+    return 1
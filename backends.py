@@ -0,0 +1,145 @@
+# python
+import os
+import re
+import json
+import hashlib
+import tempfile
+
+from google.genai import types
+
+from config import MODEL_NAME
+
+# Model backends the agent loop talks to. Each one exposes
+#   await backend.generate_content_stream(contents=..., config=...)
+# returning an async iterator of GenerateContentResponse chunks, like
+# client.aio.models.generate_content_stream with the model name bound.
+
+# Tool output that differs between otherwise identical runs (e.g. unittest's
+# "Ran 9 tests in 0.001s"); masked before hashing so replays still match
+VOLATILE_PATTERNS = (
+    (re.compile(r"\b\d+\.\d+s\b"), "<seconds>"),
+)
+
+
+class ReplayMiss(LookupError):
+    # The replay directory has no recording for a request
+    pass
+
+
+class GeminiBackend:
+    # Live backend around a genai.Client (or anything shaped like one, e.g. StubClient)
+    def __init__(self, client, model=MODEL_NAME):
+        self.client = client
+        self.model = model
+
+    async def generate_content_stream(self, contents, config=None):
+        return await self.client.aio.models.generate_content_stream(
+            model=self.model, contents=contents, config=config
+        )
+
+    # Server-side context caching (see prompt_cache.py); only the live API has it
+    async def create_cache(self, contents, config, ttl):
+        return await self.client.aio.caches.create(
+            model=self.model,
+            config=types.CreateCachedContentConfig(
+                contents=contents,
+                system_instruction=config.system_instruction,
+                tools=config.tools,
+                ttl=f"{int(ttl)}s",
+            ),
+        )
+
+    async def update_cache(self, name, ttl):
+        return await self.client.aio.caches.update(
+            name=name, config=types.UpdateCachedContentConfig(ttl=f"{int(ttl)}s")
+        )
+
+    async def delete_cache(self, name):
+        await self.client.aio.caches.delete(name=name)
+
+
+def _mask(value):
+    # Drop per-call ids and mask volatile text so equivalent requests hash equally
+    if isinstance(value, str):
+        for pattern, replacement in VOLATILE_PATTERNS:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, dict):
+        is_call = "name" in value and ("args" in value or "response" in value)
+        return {k: _mask(v) for k, v in value.items() if not (is_call and k == "id")}
+    if isinstance(value, list):
+        return [_mask(v) for v in value]
+    return value
+
+
+def normalize_request(model, contents, config=None):
+    return _mask({
+        "model": model,
+        "contents": [c.model_dump(mode="json", exclude_none=True) for c in contents],
+        "config": config.model_dump(mode="json", exclude_none=True) if config is not None else None,
+    })
+
+
+def request_key(model, contents, config=None):
+    # Stable hash of the normalized request, used as the recording's file name
+    data = json.dumps(normalize_request(model, contents, config), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class RecordingBackend:
+    # Passes requests through to another backend and saves each request with
+    # its streamed response chunks as <directory>/<request hash>.json
+    def __init__(self, inner, directory):
+        self.inner = inner
+        self.model = inner.model
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    async def generate_content_stream(self, contents, config=None):
+        key = request_key(self.model, contents, config)
+        request = normalize_request(self.model, contents, config)
+        stream = await self.inner.generate_content_stream(contents=contents, config=config)
+
+        async def recorded():
+            chunks = []
+            async for chunk in stream:
+                chunks.append(chunk.model_dump(mode="json", exclude_none=True))
+                yield chunk
+            # Only complete responses are saved; an interrupted stream leaves nothing behind
+            self._save(key, {"request": request, "chunks": chunks})
+
+        return recorded()
+
+    def _save(self, key, record):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f, separators=(",", ":"))
+        os.replace(tmp_path, os.path.join(self.directory, f"{key}.json"))
+
+
+class ReplayBackend:
+    # Serves recorded responses without any network access. Recordings are
+    # loaded once up front, so a replayed turn costs only the request hash.
+    def __init__(self, directory, model=MODEL_NAME):
+        self.model = model
+        self.directory = directory
+        self.recordings = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name)) as f:
+                    record = json.load(f)
+                self.recordings[name[:-len(".json")]] = [
+                    types.GenerateContentResponse.model_validate(chunk) for chunk in record["chunks"]
+                ]
+
+    async def generate_content_stream(self, contents, config=None):
+        key = request_key(self.model, contents, config)
+        chunks = self.recordings.get(key)
+        if chunks is None:
+            raise ReplayMiss(f"no recording for request {key[:12]} in {self.directory}")
+
+        async def replay():
+            for chunk in chunks:
+                yield chunk
+
+        return replay()
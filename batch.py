@@ -0,0 +1,172 @@
+# python
+import io
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+from contextvars import ContextVar
+
+from config import WORKING_DIRECTORY, BATCH_DIR, BATCH_CONCURRENCY
+from agent import run_agent, SessionStats
+from transcript import start_session
+from functions.overlay import Overlay
+from functions.call_function import release_working_directory
+from tracing import get_tracer
+
+# Batch mode: many agent sessions in one process, sharing the model backend
+# (and so its client and rate limiter). Every task runs in its own isolated
+# overlay of its working directory, so many tasks can try changes against one
+# base checkout side by side, and a result line is appended to the output JSONL
+# as soon as each session finishes. Task lines look like
+#   {"id": "precedence", "prompt": "fix 3 + 7 * 2", "working_directory": "./calculator", "overlay": "keep"}
+# where id defaults to the line number, working_directory to the config default
+# and overlay (what to do with the task's changes: keep, commit or discard) to keep.
+# A commit that would overwrite files another task already committed is refused;
+# the result then has overlay "conflict" and lists those files under "conflicts".
+
+_session_log = ContextVar("session_log", default=None)
+
+
+class _SessionOutput(io.TextIOBase):
+    # Stands in for sys.stdout during a batch: prints from a session (including
+    # its tool threads, which copy the context) go to that session's log file
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        return (_session_log.get() or self.fallback).write(text)
+
+    def flush(self):
+        (_session_log.get() or self.fallback).flush()
+
+
+def read_tasks(path):
+    # Parse the task file; malformed lines become tasks that fail with their error
+    tasks = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                task = json.loads(line)
+                if not isinstance(task, dict) or not task.get("prompt"):
+                    raise ValueError('expected an object with a "prompt"')
+                if task.get("overlay", "keep") not in _OVERLAY_MODES:
+                    raise ValueError(f'"overlay" must be one of {", ".join(_OVERLAY_MODES)}')
+            except ValueError as e:
+                task = {"error": f"line {number}: {e}"}
+            task.setdefault("id", str(number))
+            task["_line"] = number
+            tasks.append(task)
+    return tasks
+
+
+def _task_names(tasks):
+    # File-system names for the tasks' logs and overlays: the id with unsafe
+    # characters replaced, plus the line number when that collides with an
+    # earlier task's name (duplicate ids, or "a/b" next to "a_b")
+    names = []
+    taken = set()
+    for task in tasks:
+        name = re.sub(r"[^\w.-]", "_", str(task["id"]))
+        if name in taken:
+            name = f"{name}-line{task['_line']}"
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+_OVERLAY_MODES = ("keep", "commit", "discard")
+
+
+async def _run_task(backend, task, name, batch_dir, limit, verbose):
+    result = {"id": task["id"]}
+    if "error" in task:
+        result.update(exit_code=1, error=task["error"])
+        return result
+
+    async with limit:
+        start = time.perf_counter()
+        stats = SessionStats()
+        answer = []
+        # Sessions run concurrently on the event loop, so each gets its own trace track
+        get_tracer().start_track(f"task {task['id']}")
+        log_path = os.path.join(batch_dir, f"{name}.log")
+        with open(log_path, "w") as log:
+            _session_log.set(log)
+            try:
+                # Private copy of the task's tree so concurrent sessions never see each
+                # other's edits, including in-place writes by the scripts they run
+                overlay = await asyncio.to_thread(
+                    Overlay.create, task.get("working_directory", WORKING_DIRECTORY), os.path.join(batch_dir, name),
+                    isolated=True,
+                )
+                work = overlay.merged
+                history, transcript, _ = start_session(task["prompt"], working_directory=work)
+                try:
+                    code = await run_agent(
+                        backend, task["prompt"], verbose=verbose, on_text=answer.append,
+                        history=history, transcript=transcript, working_directory=work, stats=stats,
+                    )
+                finally:
+                    transcript.close()
+                    release_working_directory(work)
+                modified, added, deleted = await asyncio.to_thread(overlay.changes)
+                outcome = await asyncio.to_thread(overlay.finish, task.get("overlay", "keep"), code == 0)
+                result.update(
+                    exit_code=code, session=transcript.session, working_directory=work,
+                    changes={"modified": modified, "added": added, "deleted": deleted}, overlay=outcome,
+                )
+                if overlay.conflicts:
+                    result["conflicts"] = overlay.conflicts
+            except Exception as e:
+                result.update(exit_code=1, error=f"{type(e).__name__}: {e}")
+        result.update(
+            iterations=stats.iterations,
+            prompt_tokens=stats.prompt_tokens,
+            cached_tokens=stats.cached_tokens,
+            response_tokens=stats.response_tokens,
+            wall_seconds=round(time.perf_counter() - start, 3),
+            answer="".join(answer).strip(),
+            log=log_path,
+        )
+        return result
+
+
+async def run_batch(backend, tasks_path, output_path, concurrency=BATCH_CONCURRENCY, batch_dir=None, verbose=False):
+    # Run every task with at most `concurrency` sessions at a time; returns the
+    # number of tasks that failed
+    tasks = read_tasks(tasks_path)
+    batch_dir = batch_dir or os.path.join(BATCH_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(batch_dir, exist_ok=True)
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    console = sys.stdout
+    sys.stdout = _SessionOutput(console)
+    failed = 0
+    try:
+        with open(output_path, "a") as output:
+            pending = [
+                asyncio.create_task(_run_task(backend, task, name, batch_dir, limit, verbose))
+                for task, name in zip(tasks, _task_names(tasks))
+            ]
+            for done, finished in enumerate(asyncio.as_completed(pending), 1):
+                result = await finished
+                # Stream each result out as soon as its session ends
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                failed += result["exit_code"] != 0
+                console.write(
+                    f"[{done}/{len(tasks)}] {result['id']}: exit {result['exit_code']}, "
+                    f"{result.get('iterations', 0)} iterations, {result.get('wall_seconds', 0):.1f}s\n"
+                )
+                console.flush()
+    finally:
+        sys.stdout = console
+    print(f"Batch finished: {len(tasks) - failed}/{len(tasks)} succeeded; results in {output_path}")
+    return failed
@@ -0,0 +1,152 @@
+# python
+# End-to-end agent benchmarks on recorded sessions. Each scenario's model turns
+# are scripted once, recorded through RecordingBackend, and then replayed with
+# ReplayBackend against a fresh copy of its working tree, so every replay runs
+# the real agent loop and tools with zero model latency. What is left is the
+# agent's own per-iteration overhead: request serialization (hashing the
+# normalized request, as the SDK would serialize it), tool dispatch, and
+# history building plus scheduling. Run from the repository root:
+#   python benchmarks/bench_agent_e2e.py [replays]
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types
+
+import functions.dispatch as dispatch
+from agent import run_agent
+from stub_client import StubClient
+from backends import GeminiBackend, RecordingBackend, ReplayBackend
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def call(name, **args):
+    return types.Part.from_function_call(name=name, args=args)
+
+
+def precedence_bug_tree(root):
+    # The calculator with "*" demoted to the precedence of "+"
+    shutil.copytree(
+        os.path.join(REPO, "calculator"), os.path.join(root, "calculator"),
+        ignore=shutil.ignore_patterns("__pycache__", ".agent_index"),
+    )
+    path = os.path.join(root, "calculator", "pkg", "calculator.py")
+    with open(path) as f:
+        source = f.read()
+    buggy = source.replace('"*": 2,', '"*": 1,', 1)
+    if buggy == source:
+        raise RuntimeError("precedence_bug: could not inject the bug into pkg/calculator.py")
+    with open(path, "w") as f:
+        f.write(buggy)
+
+
+def precedence_bug_turns():
+    # Reproduce, locate, fix and verify, the way the bug fixing protocol asks
+    return [
+        [call("run_python_file", file_path="main.py", args=["3 + 7 * 2"])],
+        [call("search_code", query="precedence"), call("get_symbols", path="pkg/calculator.py")],
+        [call("get_file_content", file_path="pkg/calculator.py", start_line=1, end_line=20)],
+        [call("edit_file", file_path="pkg/calculator.py", edits=[{"search": '"*": 1,', "replace": '"*": 2,'}])],
+        [call("run_python_file", file_path="main.py", args=["3 + 7 * 2"]), call("run_python_file", file_path="tests.py")],
+        [types.Part(text="Fixed: '*' had the precedence of '+'. 3 + 7 * 2 now prints 17 and the tests pass.")],
+    ]
+
+
+SCENARIOS = {
+    "precedence_bug": (precedence_bug_tree, precedence_bug_turns, "3 + 7 * 2 prints 20 instead of 17; fix it."),
+}
+
+
+class TimedBackend:
+    # Wraps a backend to measure the time spent producing each response
+    def __init__(self, inner):
+        self.inner = inner
+        self.seconds = 0.0
+        self.calls = 0
+
+    async def generate_content_stream(self, contents, config=None):
+        start = time.perf_counter()
+        stream = await self.inner.generate_content_stream(contents=contents, config=config)
+        chunks = [chunk async for chunk in stream]
+        self.seconds += time.perf_counter() - start
+        self.calls += 1
+
+        async def replay():
+            for chunk in chunks:
+                yield chunk
+
+        return replay()
+
+
+def run_session(backend, make_tree, prompt):
+    # Run one session in a fresh tree; returns (exit code, wall seconds)
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root)
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            start = time.perf_counter()
+            code = asyncio.run(run_agent(backend, prompt, on_text=lambda text: None))
+            return code, time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+
+def bench(name, replays):
+    make_tree, make_turns, prompt = SCENARIOS[name]
+    with tempfile.TemporaryDirectory() as recordings:
+        # Record the scripted session once
+        recorder = RecordingBackend(GeminiBackend(StubClient(make_turns())), recordings)
+        code, _ = run_session(recorder, make_tree, prompt)
+        if code:
+            raise RuntimeError(f"{name}: recording run failed with exit code {code}")
+        replay = ReplayBackend(recordings)
+
+        # Time only the tool functions themselves (serial time across threads)
+        tool_seconds = [0.0]
+        original = dispatch.call_function
+
+        def timed_call_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                tool_seconds[0] += time.perf_counter() - start
+
+        dispatch.call_function = timed_call_function
+        try:
+            timed = TimedBackend(replay)
+            total = 0.0
+            for _ in range(replays):
+                code, seconds = run_session(timed, make_tree, prompt)
+                if code:
+                    raise RuntimeError(f"{name}: replay failed with exit code {code}")
+                total += seconds
+        finally:
+            dispatch.call_function = original
+
+    iterations = timed.calls
+    per_iter = lambda seconds: seconds / iterations * 1000
+    loop = total - timed.seconds - tool_seconds[0]
+    print(
+        f"{name:<16} {iterations // replays:>5} {per_iter(total):>9.2f} {per_iter(timed.seconds):>10.2f} "
+        f"{per_iter(tool_seconds[0]):>9.2f} {per_iter(loop):>9.2f}"
+    )
+
+
+def main():
+    replays = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"per-iteration milliseconds over {replays} replays (tools = serial time inside tool functions)")
+    print(f"{'scenario':<16} {'iters':>5} {'total':>9} {'serialize':>10} {'tools':>9} {'loop':>9}")
+    for name in SCENARIOS:
+        bench(name, replays)
+
+
+if __name__ == "__main__":
+    main()
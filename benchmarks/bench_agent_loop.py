@@ -0,0 +1,80 @@
+# python
+# Offline benchmark for the async agent loop. Compares time-to-first-byte of the
+# final answer and total session time against a blocking, non-streamed run of the
+# same scripted conversation. Run from the repository root:
+#   python benchmarks/bench_agent_loop.py
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types
+
+from agent import run_agent
+from stub_client import StubClient
+from backends import GeminiBackend
+from functions.dispatch import dispatch_calls
+
+FIRST_CHUNK_DELAY = 0.3
+CHUNK_DELAY = 0.01
+
+
+def scripted_turns():
+    # A typical session: explore, read a few files, run a script, then answer
+    answer = " ".join(["The calculator applies operator precedence correctly."] * 20)
+    return [
+        [types.Part.from_function_call(name="get_files_info", args={})],
+        [
+            types.Part.from_function_call(name="get_file_content", args={"file_path": "main.py"}),
+            types.Part.from_function_call(name="get_file_content", args={"file_path": "pkg/calculator.py"}),
+            types.Part.from_function_call(name="get_file_content", args={"file_path": "pkg/render.py"}),
+            types.Part.from_function_call(name="run_python_file", args={"file_path": "tests.py"}),
+        ],
+        [types.Part(text=answer)],
+    ]
+
+
+def run_blocking():
+    # Blocking baseline: full response first, then tools one at a time
+    client = StubClient(scripted_turns(), FIRST_CHUNK_DELAY, CHUNK_DELAY)
+    messages = [types.Content(role="user", parts=[types.Part(text="How does the calculator work?")])]
+    start = time.perf_counter()
+    while True:
+        response = client.models.generate_content(model="stub", contents=messages)
+        messages.append(response.candidates[0].content)
+        if response.function_calls:
+            results = dispatch_calls(response.function_calls, max_parallel=1)
+            messages.append(types.Content(role="user", parts=[r.parts[0] for r, _ in results]))
+            continue
+        first_byte = time.perf_counter() - start
+        return first_byte, time.perf_counter() - start
+
+
+def run_streaming():
+    client = StubClient(scripted_turns(), FIRST_CHUNK_DELAY, CHUNK_DELAY)
+    start = time.perf_counter()
+    first_byte = []
+
+    def on_text(text):
+        # Only the first chunk of the final answer matters for time-to-first-byte
+        if not first_byte:
+            first_byte.append(time.perf_counter() - start)
+
+    asyncio.run(run_agent(GeminiBackend(client), "How does the calculator work?", on_text=on_text))
+    return first_byte[0], time.perf_counter() - start
+
+
+def main():
+    # Tools resolve paths relative to the calculator sandbox
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    blocking = run_blocking()
+    streaming = run_streaming()
+    print(f"{'mode':<10} {'first byte':>12} {'total':>10}")
+    print(f"{'blocking':<10} {blocking[0]:>11.3f}s {blocking[1]:>9.3f}s")
+    print(f"{'streaming':<10} {streaming[0]:>11.3f}s {streaming[1]:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# python
+# Benchmarks ranged and line-window reads on a large generated file against the
+# naive approach of reading the file up to the wanted line. Run from the
+# repository root:
+#   python benchmarks/bench_get_file_content.py [size_mb]
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from functions.cache import new_session
+from functions.get_file_content import get_file_content
+
+
+def make_file(directory, size_mb):
+    # ~64-byte lines so a 100 MB file has ~1.6M lines
+    path = os.path.join(directory, "big.txt")
+    line = "x" * 50
+    block = "".join(f"{i:012d} {line}\n" for i in range(100_000))
+    with open(path, "w") as f:
+        while f.tell() < size_mb * 1024 * 1024:
+            f.write(block)
+    return path
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<40} {elapsed:>10.2f} ms")
+
+
+def naive_line(path, wanted):
+    # What the model had to do before: read everything up to the line
+    with open(path) as f:
+        for i, line in enumerate(f, 1):
+            if i == wanted:
+                return line
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as work:
+        path = make_file(work, size_mb)
+        size = os.path.getsize(path)
+        lines = size // 64
+        print(f"file: {size / 1024 / 1024:.0f} MB, ~{lines} lines")
+
+        cache = new_session()
+        # Each call uses a distinct window so the "unchanged" marker never short-circuits
+        timed("naive scan to last line", lambda: naive_line(path, lines - 10))
+        timed("first line window (builds index)", lambda: get_file_content(work, "big.txt", start_line=lines // 2, end_line=lines // 2 + 50))
+        timed("line window near end (cached index)", lambda: get_file_content(work, "big.txt", start_line=lines - 60, end_line=lines - 10))
+        timed("line window at start (cached index)", lambda: get_file_content(work, "big.txt", start_line=5000, end_line=5050))
+        timed("byte range at 90% offset", lambda: get_file_content(work, "big.txt", offset=int(size * 0.9), length=4096))
+        print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
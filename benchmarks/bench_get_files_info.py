@@ -0,0 +1,82 @@
+# python
+# Benchmarks the scandir-based get_files_info against the previous
+# listdir + getsize + isdir approach on a generated tree of ~100k files.
+# Run from the repository root:
+#   python benchmarks/bench_get_files_info.py [files]
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import functions.get_files_info as gfi
+from functions.cache import new_session
+
+
+def legacy_listing(abs_target):
+    # The original implementation: one listdir plus two stats per entry
+    lines = []
+    for name in sorted(os.listdir(abs_target)):
+        full_path = os.path.join(abs_target, name)
+        size = os.path.getsize(full_path)
+        is_dir = os.path.isdir(full_path)
+        lines.append(f' - {name}: file_size={size} bytes, is_dir={is_dir}')
+    return '\n'.join(lines)
+
+
+def legacy_recursive(abs_target):
+    # What exploring a tree cost before: one legacy listing per directory
+    out = []
+    stack = [abs_target]
+    while stack:
+        directory = stack.pop()
+        out.append(legacy_listing(directory))
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                stack.append(path)
+    return out
+
+
+def make_tree(root, files):
+    # 100 directories x (files / 100) small files, plus a flat directory
+    per_dir = max(files // 100, 1)
+    for d in range(100):
+        directory = os.path.join(root, "tree", f"pkg{d:03d}")
+        os.makedirs(directory)
+        for f in range(per_dir):
+            with open(os.path.join(directory, f"mod{f:04d}.py"), "w") as fh:
+                fh.write("x = 1\n")
+    flat = os.path.join(root, "flat")
+    os.makedirs(flat)
+    for f in range(files // 10):
+        open(os.path.join(flat, f"file{f:05d}.txt"), "w").close()
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<44} {(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    # Benchmark full traversals rather than the first page
+    gfi.LISTING_PAGE_SIZE = 10 ** 9
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, files)
+        print(f"tree: {files} files in 100 dirs, flat dir with {files // 10} files")
+        new_session()
+        timed("legacy flat listing", lambda: legacy_listing(os.path.join(root, "flat")))
+        timed("scandir flat listing", lambda: gfi.get_files_info(root, "flat"))
+        timed("legacy per-directory walk", lambda: legacy_recursive(os.path.join(root, "tree")))
+        timed("scandir recursive listing", lambda: gfi.get_files_info(root, "tree", recursive=True))
+        timed("scandir recursive, include='mod00*'", lambda: gfi.get_files_info(root, "tree", recursive=True, include=["mod00*"]))
+        gfi.LISTING_PAGE_SIZE = 200
+        timed("scandir recursive, one 200-entry page", lambda: gfi.get_files_info(root, "tree", recursive=True))
+        timed("scandir recursive, page from deep cursor", lambda: gfi.get_files_info(root, "tree", recursive=True, cursor="pkg090/mod0500.py"))
+
+
+if __name__ == "__main__":
+    main()
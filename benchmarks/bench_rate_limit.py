@@ -0,0 +1,68 @@
+# python
+# Runs many agent sessions concurrently in one process against a local fake
+# Gemini server (stub_server.py) that enforces its own requests-per-minute quota
+# and injects random 503s, using the real genai client. Compares sending
+# requests directly with sending them through one shared RequestScheduler.
+# Run from the repository root:
+#   python benchmarks/bench_rate_limit.py [sessions] [server_rpm] [failure_rate]
+import io
+import os
+import sys
+import time
+import asyncio
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google import genai
+from google.genai import types
+
+from agent import run_agent
+from backends import GeminiBackend
+from stub_server import FakeGeminiServer
+from rate_limit import RequestScheduler, RateLimitedBackend
+
+
+async def run_sessions(backend, sessions):
+    # Tool-call chatter goes to a buffer; only the outcome of each session matters
+    with contextlib.redirect_stdout(io.StringIO()):
+        codes = await asyncio.gather(*(
+            run_agent(backend, f"What is in the working directory? ({i})", on_text=lambda text: None)
+            for i in range(sessions)
+        ))
+    return sum(1 for code in codes if code == 0)
+
+
+def bench(label, sessions, rpm, failure_rate, limited):
+    server = FakeGeminiServer(rpm=rpm, failure_rate=failure_rate, retry_after=2).start()
+    try:
+        client = genai.Client(api_key="fake", http_options=types.HttpOptions(base_url=server.url))
+        backend = GeminiBackend(client)
+        scheduler = None
+        if limited:
+            # Pace to the server's quota; retries absorb the injected failures
+            scheduler = RequestScheduler(rpm=rpm, tpm=0, base_delay=0.2, max_delay=5.0)
+            backend = RateLimitedBackend(backend, scheduler)
+        start = time.perf_counter()
+        completed = asyncio.run(run_sessions(backend, sessions))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<10} {completed:>4}/{sessions:<4} {elapsed:>8.2f}s  {server.stats()}")
+        if scheduler is not None:
+            print(f"{'':<10} {scheduler.stats()}")
+    finally:
+        server.stop()
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rpm = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    print(f"{sessions} sessions of 2 model calls each; server quota {rpm} rpm, {failure_rate:.0%} injected 503s")
+    print(f"{'mode':<10} {'completed':>9} {'wall':>9}")
+    bench("direct", sessions, rpm, failure_rate, limited=False)
+    bench("scheduled", sessions, rpm, failure_rate, limited=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# python
+# Compares run_python_file on a cold interpreter per call (subprocess.run) with
+# the warm worker pool. In a session, runs are separated by model latency, so a
+# pause (not counted) is inserted between calls and only the tool latency the
+# agent loop waits on is measured. Run from the repository root:
+#   python benchmarks/bench_run_python_file.py [runs] [pause_seconds]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import functions.run_python_file as rpf
+
+
+def bench(label, runs, pool_size, pause):
+    # Toggle the pool through the module-level setting run_python_file reads
+    rpf.PYTHON_POOL_SIZE = pool_size
+    rpf.run_python_file("calculator", "tests.py")  # warm-up (fills the pool)
+    elapsed = 0.0
+    for _ in range(runs):
+        for file_path, args in (("tests.py", []), ("main.py", ["3 + 5"])):
+            # Simulated model think time between tool calls
+            time.sleep(pause)
+            start = time.perf_counter()
+            rpf.run_python_file("calculator", file_path, args)
+            elapsed += time.perf_counter() - start
+    per_call = elapsed / (runs * 2) * 1000
+    print(f"{label:<12} {runs * 2:>5} calls {elapsed:>8.3f}s {per_call:>8.1f} ms/call")
+    return per_call
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pause = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    cold = bench("subprocess", runs, 0, pause)
+    warm = bench("pool", runs, 2, pause)
+    print(f"speedup: {cold / warm:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
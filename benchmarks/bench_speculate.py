@@ -0,0 +1,140 @@
+# python
+# Wall-clock time to a verified fix, serial vs speculative. A bug is injected
+# into a copy of the calculator ("-" computes b - a, so tests.py fails), and a
+# scripted model fixes it: the serial session first chases a wrong hypothesis
+# (operator precedence) for a few turns before reading the operator table,
+# while with --speculate each attempt follows one of those lines of attack at
+# the same time and the first verified one wins. Every model turn costs a fixed
+# simulated latency, so the difference is the turns taken off the critical path.
+# Run from the repository root:
+#   python benchmarks/bench_speculate.py [latency_seconds]
+import os
+import re
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.genai import types
+
+from agent import run_agent, SessionStats
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUGGY = '"-": lambda a, b: b - a,'
+FIXED = '"-": lambda a, b: a - b,'
+
+
+def call(name, **args):
+    return types.Part.from_function_call(name=name, args=args)
+
+
+def subtraction_bug_tree(root):
+    shutil.copytree(
+        os.path.join(REPO, "calculator"), os.path.join(root, "calculator"),
+        ignore=shutil.ignore_patterns("__pycache__", ".agent_index"),
+    )
+    path = os.path.join(root, "calculator", "pkg", "calculator.py")
+    with open(path) as f:
+        source = f.read()
+    with open(path, "w") as f:
+        f.write(source.replace(FIXED, BUGGY, 1))
+
+
+REPRODUCE = [call("run_python_file", file_path="tests.py")]
+# A wrong lead: blame precedence, change it, see the tests still fail, undo it
+PRECEDENCE_LEAD = [
+    [call("search_code", query="precedence")],
+    [call("get_symbols", path="pkg/calculator.py", symbol="Calculator._evaluate_infix")],
+    [call("edit_file", file_path="pkg/calculator.py", edits=[{"search": '"-": 1,', "replace": '"-": 2,'}])],
+    [call("run_python_file", file_path="tests.py")],
+    [call("edit_file", file_path="pkg/calculator.py", edits=[{"search": '"-": 2,', "replace": '"-": 1,'}])],
+]
+# The right lead: read the operator table and fix the lambda
+OPERATOR_LEAD = [
+    [call("get_file_content", file_path="pkg/calculator.py", start_line=1, end_line=12)],
+    [call("edit_file", file_path="pkg/calculator.py", edits=[{"search": BUGGY, "replace": FIXED}])],
+]
+ANSWER = [types.Part(text="Fixed: subtraction computed b - a; tests.py passes now.")]
+
+SCRIPTS = {
+    # The serial session: reproduce, follow the wrong lead, then the right one, verify, answer
+    None: [REPRODUCE] + PRECEDENCE_LEAD + OPERATOR_LEAD + [[call("run_python_file", file_path="tests.py")], ANSWER],
+    # Speculative attempts start after the reproduction; verification is automatic
+    1: PRECEDENCE_LEAD + OPERATOR_LEAD + [ANSWER],
+    2: [[call("search_code", query="lambda a, b")]] + OPERATOR_LEAD + [ANSWER],
+    3: OPERATOR_LEAD + [ANSWER],
+}
+_ATTEMPT = re.compile(r"^Speculative attempt (\d+) of")
+
+
+class ScriptedBackend:
+    # Answers from SCRIPTS, keyed on which speculative attempt (if any) the
+    # conversation belongs to, so concurrent attempts each follow their own script
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+
+    async def generate_content_stream(self, contents, config=None):
+        self.requests += 1
+        route, turn = None, 0
+        for content in contents:
+            text = "".join(part.text or "" for part in content.parts or [])
+            match = _ATTEMPT.match(text) if content.role == "user" else None
+            if match:
+                route, turn = int(match.group(1)), 0
+            elif content.role == "model":
+                turn += 1
+        if route is None:
+            turn = sum(content.role == "model" for content in contents)
+        parts = SCRIPTS[route][turn]
+        await asyncio.sleep(self.latency)
+
+        async def stream():
+            yield types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=sum(len(str(c)) for c in contents) // 4, candidates_token_count=20,
+                ),
+            )
+
+        return stream()
+
+
+def run(latency, speculate):
+    with tempfile.TemporaryDirectory() as root:
+        subtraction_bug_tree(root)
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            backend = ScriptedBackend(latency)
+            stats = SessionStats()
+            start = time.perf_counter()
+            code = asyncio.run(run_agent(
+                backend, "tests.py fails; fix it.", on_text=lambda text: None, stats=stats, speculate=speculate,
+            ))
+            seconds = time.perf_counter() - start
+            with open(os.path.join("calculator", "pkg", "calculator.py")) as f:
+                fixed = FIXED in f.read()
+        finally:
+            os.chdir(cwd)
+    if code or not fixed:
+        raise RuntimeError(f"speculate={speculate}: session failed (exit {code}, fixed={fixed})")
+    return seconds, backend.requests
+
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    print(f"simulated model latency {latency:.2f}s per turn")
+    print(f"{'mode':<14} {'wall s':>8} {'requests':>9}")
+    serial, serial_requests = run(latency, 0)
+    print(f"{'serial':<14} {serial:>8.2f} {serial_requests:>9}")
+    for attempts in (2, 3):
+        seconds, requests = run(latency, attempts)
+        print(f"{f'speculate {attempts}':<14} {seconds:>8.2f} {requests:>9}  ({serial / seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
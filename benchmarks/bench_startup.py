@@ -0,0 +1,100 @@
+# python
+# Startup cost of the CLI, measured with `python -X importtime`: the time spent
+# importing modules beyond what a bare interpreter imports, and the process's
+# wall time, for --help, a run without an API key, and getting the agent ready
+# (importing it and loading the tool schemas). Each scenario has an import-time
+# budget and modules it must not load; the script exits with status 1 when one
+# is exceeded, so it can guard against regressions. Run from the repository root:
+#   python benchmarks/bench_startup.py [runs]
+import os
+import sys
+import time
+import subprocess
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The registry's tool modules, which load only when a tool is first called
+TOOL_MODULES = [
+    "functions.get_files_info", "functions.get_file_content", "functions.get_file_contents",
+    "functions.run_python_file", "functions.write_file", "functions.edit_file", "functions.write_files",
+    "functions.search_code", "functions.get_symbols", "functions.run_tests",
+]
+
+# (name, python arguments, extra environment, import budget in ms, modules that must not be imported)
+SCENARIOS = [
+    ("--help", ["main.py", "--help"], {}, 25, ["google.genai", "dotenv", "asyncio", "agent", "functions"]),
+    ("no API key", ["main.py", "hello"], {"GEMINI_API_KEY": ""}, 40, ["google.genai", "asyncio", "agent", "functions"]),
+    (
+        "agent ready",
+        # -X importtime doesn't log importlib.import_module, which is how tools
+        # load, so this scenario also lists sys.modules on a "loaded:" line
+        [
+            "-c",
+            "import sys, agent, call_functions; call_functions.get_available_functions(); print('loaded:', *sys.modules)",
+        ],
+        {}, 600, TOOL_MODULES,
+    ),
+]
+
+
+def importtime(args, env):
+    # ({top-level module: cumulative us}, every imported module, wall seconds) of one run
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO, env={**os.environ, **env}, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+    )
+    seconds = time.perf_counter() - start
+    top_level = {}
+    modules = set()
+    for line in process.stdout.splitlines():
+        if line.startswith("loaded:"):
+            modules.update(line.split()[1:])
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules, seconds
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # What the interpreter imports by itself (site, encodings, ...) isn't ours
+    baseline, _, _ = importtime(["-c", "pass"], {})
+    # Untimed run, so the tool schema cache and bytecode are warm
+    for _, args, env, _, _ in SCENARIOS:
+        importtime(args, env)
+
+    print(f"best of {runs} runs; import ms excludes what a bare interpreter imports")
+    print(f"{'scenario':<12} {'import ms':>10} {'budget ms':>10} {'wall ms':>8}  status")
+    failures = 0
+    for name, args, env, budget, forbidden in SCENARIOS:
+        best_imports = best_wall = None
+        loaded = set()
+        for _ in range(runs):
+            top_level, modules, seconds = importtime(args, env)
+            imports = sum(us for module, us in top_level.items() if module not in baseline) / 1000
+            best_imports = imports if best_imports is None else min(best_imports, imports)
+            best_wall = seconds * 1000 if best_wall is None else min(best_wall, seconds * 1000)
+            loaded |= modules
+        unwanted = sorted(
+            module for module in loaded
+            if any(module == f or module.startswith(f + ".") for f in forbidden)
+        )
+        problems = []
+        if best_imports > budget:
+            problems.append("over budget")
+        if unwanted:
+            problems.append("imports " + ", ".join(unwanted[:3]) + (f" +{len(unwanted) - 3}" if len(unwanted) > 3 else ""))
+        failures += bool(problems)
+        status = "; ".join(problems) if problems else "ok"
+        print(f"{name:<12} {best_imports:>10.1f} {budget:>10} {best_wall:>8.1f}  {status}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
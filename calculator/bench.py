@@ -0,0 +1,93 @@
+# python
+# Throughput of Calculator.evaluate against the previous implementation (which
+# split on spaces and re-parsed every call), on a cached workload (a small set
+# of expressions evaluated over and over) and an uncached one (every expression
+# is new, so each call compiles). Run from this directory:
+#   python bench.py [evaluations]
+import sys
+import time
+
+from pkg.calculator import Calculator
+
+
+class LegacyCalculator:
+    # The evaluator before expressions were compiled: whitespace tokens, an
+    # operator-stack pass per call, float() per token
+    def __init__(self):
+        self.operators = {
+            "+": lambda a, b: a + b,
+            "-": lambda a, b: a - b,
+            "*": lambda a, b: a * b,
+            "/": lambda a, b: a / b,
+        }
+        self.precedence = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+    def evaluate(self, expression):
+        if not expression or expression.isspace():
+            return None
+        return self._evaluate_infix(expression.strip().split())
+
+    def _evaluate_infix(self, tokens):
+        values = []
+        operators = []
+        for token in tokens:
+            if token in self.operators:
+                while (
+                    operators
+                    and operators[-1] in self.operators
+                    and self.precedence[operators[-1]] >= self.precedence[token]
+                ):
+                    self._apply_operator(operators, values)
+                operators.append(token)
+            else:
+                try:
+                    values.append(float(token))
+                except ValueError:
+                    raise ValueError(f"invalid token: {token}")
+        while operators:
+            self._apply_operator(operators, values)
+        if len(values) != 1:
+            raise ValueError("invalid expression")
+        return values[0]
+
+    def _apply_operator(self, operators, values):
+        if not operators:
+            return
+        operator = operators.pop()
+        if len(values) < 2:
+            raise ValueError(f"not enough operands for operator {operator}")
+        b = values.pop()
+        a = values.pop()
+        values.append(self.operators[operator](a, b))
+
+
+def expressions(count, distinct):
+    # Space-separated (so the legacy evaluator can parse them) mixes of all operators
+    return [f"{i % distinct} + {i % distinct % 7 + 1} * 3 - {i % distinct % 5} / 2 + 4 * 2.5" for i in range(count)]
+
+
+def throughput(calculator, workload):
+    evaluate = calculator.evaluate
+    start = time.perf_counter()
+    for expression in workload:
+        evaluate(expression)
+    return len(workload) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    workloads = {
+        "cached (100 distinct)": expressions(count, 100),
+        "uncached (all distinct)": expressions(count, count),
+    }
+    print(f"{count} evaluations per workload")
+    print(f"{'workload':<24} {'legacy eval/s':>14} {'compiled eval/s':>16} {'speedup':>8}")
+    for name, workload in workloads.items():
+        # Fresh instances, so the cached workload starts cold like a real run
+        legacy = throughput(LegacyCalculator(), workload)
+        compiled = throughput(Calculator(), workload)
+        print(f"{name:<24} {legacy:>14,.0f} {compiled:>16,.0f} {compiled / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
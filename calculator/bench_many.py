@@ -0,0 +1,64 @@
+# python
+# Calculator.evaluate_many (whole-array NumPy evaluation) against a scalar loop
+# calling Calculator.evaluate once per row, for one formula over 1e4, 1e6 and
+# 1e7 rows. The scalar loop walks the columns in chunks so it doesn't need a
+# Python float per row of every column at once. Run from this directory:
+#   python bench_many.py [rows ...]
+import sys
+import time
+
+import numpy
+
+from pkg.calculator import Calculator
+
+EXPRESSION = "price * (1 + tax) - discount / 2"
+
+
+def columns(rows):
+    generator = numpy.random.default_rng(0)
+    return {
+        "price": generator.uniform(1, 100, rows),
+        "tax": generator.uniform(0, 0.25, rows),
+        "discount": generator.uniform(0, 10, rows),
+    }
+
+
+def scalar_loop(calculator, data, chunk=1 << 16):
+    evaluate = calculator.evaluate
+    rows = len(data["price"])
+    result = numpy.empty(rows)
+    for start in range(0, rows, chunk):
+        stop = min(start + chunk, rows)
+        prices, taxes, discounts = (data[name][start:stop].tolist() for name in ("price", "tax", "discount"))
+        result[start:stop] = [
+            evaluate(EXPRESSION, price=price, tax=tax, discount=discount)
+            for price, tax, discount in zip(prices, taxes, discounts)
+        ]
+    return result
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(float(arg)) for arg in sys.argv[1:]] or [10_000, 1_000_000, 10_000_000]
+    calculator = Calculator()
+    print(f"{EXPRESSION!r}, chunk size {calculator.chunk_size}")
+    print(f"{'rows':>10} {'scalar s':>9} {'numpy s':>9} {'scalar rows/s':>14} {'numpy rows/s':>14} {'speedup':>8}")
+    for rows in sizes:
+        data = columns(rows)
+        expected, scalar = timed(scalar_loop, calculator, data)
+        result, vector = timed(calculator.evaluate_many, EXPRESSION, **data)
+        if not numpy.array_equal(result, expected):
+            raise RuntimeError(f"{rows} rows: evaluate_many disagrees with the scalar path")
+        print(
+            f"{rows:>10,} {scalar:>9.3f} {vector:>9.3f} {rows / scalar:>14,.0f} {rows / vector:>14,.0f} "
+            f"{scalar / vector:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,38 @@
 # python
 import sys
+import argparse
 from pkg.calculator import Calculator
 from pkg.render import format_json_output
+from pkg.batch import evaluate_stream
+
+
+def batch(argv):
+    # --batch [FILE]: one expression per line from FILE (or stdin), results as JSON Lines on stdout
+    parser = argparse.ArgumentParser(prog="main.py --batch", description="Evaluate one expression per line.")
+    parser.add_argument("file", nargs="?", default="-", help="Input file (default: stdin)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count; 1 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Expressions per work unit")
+    args = parser.parse_args(argv)
+
+    try:
+        source = sys.stdin if args.file == "-" else open(args.file)
+    except OSError as e:
+        # Report a missing or unreadable FILE like an evaluation error
+        print(f"Error: {e}")
+        return
+    try:
+        evaluate_stream(source, sys.stdout, workers=args.workers, chunk_size=max(1, args.chunk_size))
+    finally:
+        if source is not sys.stdin:
+            source.close()
 
 
 def main():
+    # Streaming mode for files of expressions
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        batch(sys.argv[2:])
+        return
+
     # Instantiate the calculator engine
     calculator = Calculator()
 
@@ -13,6 +41,7 @@ def main():
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
         print('Example: python main.py "3 + 5"')
+        print('Batch: python main.py --batch [FILE] (one expression per line; stdin by default)')
         return
 
     # Join all CLI args into a single space-separated expression
@@ -0,0 +1,65 @@
+# python
+import os
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from pkg.calculator import Calculator
+from pkg.render import format_json_line
+
+# Streaming evaluation for `main.py --batch`: input lines are read lazily and
+# grouped into chunks, at most `window` chunks are in flight across the worker
+# processes, and results are written in input order as soon as the oldest chunk
+# is done. Memory therefore depends on chunk_size * window, not on input size.
+
+# One calculator per worker process, so its compiled-expression cache is reused
+# across chunks
+_calculator = None
+
+
+def evaluate_chunk(chunk):
+    # chunk: [(line number, expression)]; returns the chunk's JSON Lines output
+    global _calculator
+    if _calculator is None:
+        _calculator = Calculator()
+    evaluate = _calculator.evaluate
+    records = []
+    for number, expression in chunk:
+        try:
+            records.append(format_json_line(number, expression, evaluate(expression)))
+        except Exception as e:
+            # Report the error for this line and keep going
+            records.append(format_json_line(number, expression, error=str(e) or type(e).__name__))
+    records.append("")
+    return "\n".join(records)
+
+
+def _chunks(lines, chunk_size):
+    # Numbered, stripped, non-blank lines in lists of chunk_size
+    numbered = ((number, line.strip()) for number, line in enumerate(lines, 1))
+    expressions = ((number, line) for number, line in numbered if line)
+    while True:
+        chunk = list(islice(expressions, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def evaluate_stream(lines, output, workers=None, chunk_size=1000, window=None):
+    # Evaluate every line of `lines` (any iterable of strings) and write one
+    # JSON record per expression to `output`, in input order
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in _chunks(lines, chunk_size):
+            output.write(evaluate_chunk(chunk))
+        return
+    window = window or workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunks(lines, chunk_size):
+            if len(pending) >= window:
+                # Bounded sliding window: flush the oldest chunk before reading more
+                output.write(pending.popleft().result())
+            pending.append(pool.submit(evaluate_chunk, chunk))
+        while pending:
+            output.write(pending.popleft().result())
@@ -1,5 +1,37 @@
 # python
+import re
+from functools import lru_cache
+
+# Numeric literals (with a sign attached to the digits, if any), variable
+# names, or any other single non-space character: operators, parentheses, or
+# junk to report
+_TOKEN = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[A-Za-z_]\w*|\S")
+_NAME = re.compile(r"[A-Za-z_]\w*")
+
+
+def _numpy():
+    # NumPy is only needed for evaluate_many, so it is imported on first use
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("evaluate_many requires NumPy (pip install numpy)") from None
+    return numpy
+
+
+class _Unspaced(Exception):
+    # Raised when a whitespace-split token has to be split further
+    pass
+
+
 class Calculator:
+    # Expressions are compiled once into a postfix program (a tuple whose items
+    # are float constants, variable names and operator functions) and kept in a
+    # bounded LRU cache keyed by the expression text; evaluating is a single
+    # loop over the program with one stack. evaluate_many runs the same program
+    # over whole NumPy arrays, chunk_size rows at a time.
+    cache_size = 1024
+    chunk_size = 1 << 16
+
     def __init__(self):
         # Supported binary operators mapped to their implementations
         self.operators = {
@@ -16,61 +48,175 @@ class Calculator:
             "*": 2,
             "/": 2,
         }
+        # Per instance, since programs bind this instance's operators
+        self.compile = lru_cache(maxsize=self.cache_size)(self._compile)
 
-    def evaluate(self, expression):
+    def evaluate(self, expression, **variables):
         # Treat empty/whitespace-only input as no-op
         if not expression or expression.isspace():
             return None
-        # Tokenize by spaces (expects space-separated infix input)
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
+        return self._run(self.compile(expression.strip()), variables)
+
+    def evaluate_many(self, expression, **columns):
+        # Evaluate one expression for every row of the given columns (equal-length
+        # 1-D arrays or sequences; plain numbers apply to every row) and return a
+        # float64 array. Division by zero raises ZeroDivisionError, naming the
+        # first offending row, just as evaluating that row alone would.
+        np = _numpy()
+        if not expression or expression.isspace():
+            raise ValueError("invalid expression")
+        program = self.compile(expression.strip())
+        arrays = {}
+        rows = None
+        for name, column in columns.items():
+            array = np.asarray(column, dtype=np.float64)
+            if array.ndim > 1:
+                raise ValueError(f"column {name} must be one-dimensional")
+            if array.ndim == 1:
+                if rows is not None and len(array) != rows:
+                    raise ValueError(f"column {name} has {len(array)} rows, expected {rows}")
+                rows = len(array)
+            arrays[name] = array
+        if rows is None:
+            raise ValueError("evaluate_many needs at least one array column")
 
-    def _evaluate_infix(self, tokens):
-        # Value stack and operator stack for shunting-yard-like eval
-        values = []
+        result = np.empty(rows, dtype=np.float64)
+        # Chunks bound the temporaries each operator allocates
+        for start in range(0, rows, self.chunk_size):
+            stop = min(start + self.chunk_size, rows)
+            chunk = {name: array[start:stop] if array.ndim else array for name, array in arrays.items()}
+            result[start:stop] = self._run_arrays(np, program, chunk, start)
+        return result
+
+    def _compile(self, expression):
+        # Space-separated input tokenizes with a plain split; tokens that run
+        # together ("3+5", "(1") need the tokenizer regex
+        try:
+            return self._postfix(expression.split(), expression, spaced=True)
+        except _Unspaced:
+            return self._postfix(_TOKEN.findall(expression), expression, spaced=False)
+
+    def _postfix(self, tokens, expression, spaced):
+        # Shunting-yard into postfix. Operand counts are checked here, so the
+        # program is known to leave exactly one value on the stack.
+        operator_functions = self.operators
+        precedence = self.precedence
+        program = []
+        append = program.append
         operators = []
+        depth = 0
+        expect_operand = True
 
         for token in tokens:
-            if token in self.operators:
-                # Resolve previous operators with higher or equal precedence
-                while (
-                    operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
+            if token in operator_functions or token == ")":
+                # Resolve previous operators: those with higher or equal
+                # precedence, or everything back to the matching "("
+                while operators and operators[-1] != "(" and (
+                    token == ")" or precedence[operators[-1]] >= precedence[token]
                 ):
-                    self._apply_operator(operators, values)
-                # Push current operator
+                    operator = operators.pop()
+                    # Need two operands for a binary operator
+                    if depth < 2:
+                        raise ValueError(f"not enough operands for operator {operator}")
+                    append(operator_functions[operator])
+                    depth -= 1
+                if token == ")":
+                    if not operators:
+                        raise ValueError("mismatched parentheses")
+                    operators.pop()
+                    expect_operand = False
+                else:
+                    operators.append(token)
+                    expect_operand = True
+                continue
+            if token == "(":
                 operators.append(token)
-            else:
-                try:
-                    # Parse numeric literal as float (supports ints and decimals)
-                    values.append(float(token))
-                except ValueError:
-                    # Reject unknown tokens early
-                    raise ValueError(f"invalid token: {token}")
+                expect_operand = True
+                continue
+            try:
+                # Parse numeric literal as float (supports ints and decimals)
+                value = float(token)
+            except ValueError:
+                if _NAME.fullmatch(token):
+                    # Variable, looked up when the program runs
+                    append(token)
+                    depth += 1
+                    expect_operand = False
+                    continue
+                if spaced and len(token) > 1:
+                    raise _Unspaced()
+                # Reject unknown tokens, reporting the whole word, e.g. "$x"
+                raise ValueError(f"invalid token: {expression[expression.find(token):].split(None, 1)[0]}")
+            if not expect_operand and token[0] in "+-":
+                # "3-2": after an operand, the sign is the binary operator
+                operator = token[0]
+                while operators and operators[-1] != "(" and precedence[operators[-1]] >= precedence[operator]:
+                    if depth < 2:
+                        raise ValueError(f"not enough operands for operator {operators[-1]}")
+                    append(operator_functions[operators.pop()])
+                    depth -= 1
+                operators.append(operator)
+                value = float(token[1:])
+            append(value)
+            depth += 1
+            expect_operand = False
 
         # Apply remaining operators
         while operators:
-            self._apply_operator(operators, values)
+            operator = operators.pop()
+            if operator == "(":
+                raise ValueError("mismatched parentheses")
+            if depth < 2:
+                raise ValueError(f"not enough operands for operator {operator}")
+            append(operator_functions[operator])
+            depth -= 1
 
         # A valid expression should collapse to exactly one value
-        if len(values) != 1:
+        if depth != 1:
             raise ValueError("invalid expression")
+        return tuple(program)
 
-        return values[0]
-
-    def _apply_operator(self, operators, values):
-        # No-op if no operators (defensive guard)
-        if not operators:
-            return
-
-        operator = operators.pop()
-        # Need two operands for a binary operator
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
+    def _run(self, program, variables):
+        # Constants and variables are pushed; an operator pops its two operands
+        # (second one first) and pushes the result
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for item in program:
+            if item.__class__ is float:
+                push(item)
+            elif item.__class__ is str:
+                try:
+                    push(variables[item])
+                except KeyError:
+                    raise ValueError(f"unknown variable: {item}") from None
+            else:
+                b = pop()
+                push(item(pop(), b))
+        return stack[0]
 
-        # Pop in reverse order: second operand, then first
-        b = values.pop()
-        a = values.pop()
-        # Compute and push the result
-        values.append(self.operators[operator](a, b))
\ No newline at end of file
+    def _run_arrays(self, np, program, columns, offset):
+        # _run over arrays: the same operator functions, applied to whole chunks
+        divide = self.operators["/"]
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for item in program:
+            if item.__class__ is float:
+                push(item)
+            elif item.__class__ is str:
+                try:
+                    push(columns[item])
+                except KeyError:
+                    raise ValueError(f"unknown variable: {item}") from None
+            else:
+                b = pop()
+                if item is divide:
+                    # NumPy would return inf/nan; the scalar path raises
+                    zero = np.equal(b, 0)
+                    if zero.any():
+                        row = offset + int(np.flatnonzero(zero)[0]) if zero.ndim else offset
+                        raise ZeroDivisionError(f"float division by zero (row {row})")
+                push(item(pop(), b))
+        # A program without variables yields one value for every row
+        return stack[0]
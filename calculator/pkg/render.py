@@ -1,13 +1,20 @@
 # python
 import json
 
+# One encoder for every JSON Lines record instead of a json.dumps call (and its
+# encoder setup) per line; compact separators, no indentation
+_LINE_ENCODER = json.JSONEncoder(separators=(",", ":"))
 
-def format_json_output(expression: str, result: float, indent: int = 2) -> str:
+
+def _normalize(result):
     # Normalize float results like 5.0 -> 5 for cleaner output
     if isinstance(result, float) and result.is_integer():
-        result_to_dump = int(result)
-    else:
-        result_to_dump = result
+        return int(result)
+    return result
+
+
+def format_json_output(expression: str, result: float, indent: int = 2) -> str:
+    result_to_dump = _normalize(result)
 
     # Construct a simple, predictable JSON payload
     output_data = {
@@ -15,4 +22,14 @@ def format_json_output(expression: str, result: float, indent: int = 2) -> str:
         "result": result_to_dump,
     }
     # Pretty-print with configurable indentation (default 2 spaces)
-    return json.dumps(output_data, indent=indent)
\ No newline at end of file
+    return json.dumps(output_data, indent=indent)
+
+
+def format_json_line(line: int, expression: str, result: float = None, error: str = None) -> str:
+    # One compact JSON Lines record for --batch: the result, or the error for that line
+    record = {"line": line, "expression": expression}
+    if error is None:
+        record["result"] = _normalize(result)
+    else:
+        record["error"] = error
+    return _LINE_ENCODER.encode(record)
@@ -1,6 +1,19 @@
 # python
+import io
+import os
+import json
+import tempfile
 import unittest
+from contextlib import redirect_stdout
 from pkg.calculator import Calculator
+from pkg.render import format_json_line
+from pkg.batch import evaluate_stream
+from main import batch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestCalculator(unittest.TestCase):
@@ -53,6 +66,118 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("+ 3")
 
+    def test_no_spaces(self):
+        # Tokens don't need to be separated by spaces
+        result = self.calculator.evaluate("3+5*2")
+        self.assertEqual(result, 13)
+
+    def test_parentheses(self):
+        # Parentheses override precedence, also when nested
+        self.assertEqual(self.calculator.evaluate("(3 + 5) * 2"), 16)
+        self.assertEqual(self.calculator.evaluate("2 * (3 + (4 - 1))"), 12)
+
+    def test_signed_numbers(self):
+        # A sign attached to a number where an operand is expected is part of it
+        self.assertEqual(self.calculator.evaluate("3 * -2"), -6)
+        self.assertEqual(self.calculator.evaluate("3-2"), 1)
+
+    def test_mismatched_parentheses(self):
+        # Unbalanced parentheses should raise a ValueError
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("(3 + 5")
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("3 + 5)")
+
+    def test_division_by_zero(self):
+        # Division by zero propagates like Python's own
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate("1 / 0")
+
+    def test_compiled_program_is_cached(self):
+        # Repeated expressions reuse the compiled program
+        self.calculator.evaluate("3 * 4 + 5")
+        self.assertEqual(self.calculator.evaluate("3 * 4 + 5"), 17)
+        self.assertEqual(self.calculator.compile.cache_info().hits, 1)
+
+    def test_variables(self):
+        # Named variables are looked up at evaluation time
+        self.assertEqual(self.calculator.evaluate("price * (1 + tax)", price=10, tax=0.5), 15)
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x + 1")
+
+
+class TestBatch(unittest.TestCase):
+    def run_stream(self, lines, **kwargs):
+        # The JSON Lines records evaluate_stream writes for `lines`
+        output = io.StringIO()
+        evaluate_stream(lines, output, **kwargs)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_order_preserved_across_chunks(self):
+        # One expression per chunk on two workers still comes back in input order
+        lines = [f"{i} * 2\n" for i in range(50)]
+        records = self.run_stream(lines, workers=2, chunk_size=1)
+        self.assertEqual([r["line"] for r in records], list(range(1, 51)))
+        self.assertEqual([r["result"] for r in records], [i * 2 for i in range(50)])
+
+    def test_errors_are_reported_per_line(self):
+        # A bad line gets an error record and the run continues
+        records = self.run_stream(["1 / 0\n", "2 * x\n", "3 + 4\n"], workers=1)
+        self.assertEqual(records[0], {"line": 1, "expression": "1 / 0", "error": "float division by zero"})
+        self.assertEqual(records[1], {"line": 2, "expression": "2 * x", "error": "unknown variable: x"})
+        self.assertEqual(records[2], {"line": 3, "expression": "3 + 4", "result": 7})
+
+    def test_blank_lines_keep_line_numbers(self):
+        # Blank lines are skipped, but records keep the source line numbers
+        records = self.run_stream(["1 + 1\n", "\n", "   \n", "2 + 2"], workers=1)
+        self.assertEqual([(r["line"], r["result"]) for r in records], [(1, 2), (4, 4)])
+
+    def test_format_json_line_is_compact(self):
+        self.assertEqual(format_json_line(3, "1 + 2", 3.0), '{"line":3,"expression":"1 + 2","result":3}')
+        self.assertEqual(
+            format_json_line(4, "1 / 0", error="float division by zero"),
+            '{"line":4,"expression":"1 / 0","error":"float division by zero"}',
+        )
+
+    def test_missing_file(self):
+        # Reported like the single-expression path, without a stack trace
+        missing = os.path.join(tempfile.gettempdir(), "calculator-missing-input.txt")
+        output = io.StringIO()
+        with redirect_stdout(output):
+            batch([missing, "--workers", "1"])
+        self.assertTrue(output.getvalue().startswith("Error: "), output.getvalue())
+        self.assertIn(missing, output.getvalue())
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestEvaluateMany(unittest.TestCase):
+    def setUp(self):
+        self.calculator = Calculator()
+
+    def test_matches_scalar_path(self):
+        # Whole-array evaluation agrees with evaluating row by row
+        x = numpy.linspace(-5, 5, 101)
+        expression = "x * x - 3 * x / 2 + 1"
+        expected = [self.calculator.evaluate(expression, x=value) for value in x.tolist()]
+        self.assertEqual(self.calculator.evaluate_many(expression, x=x).tolist(), expected)
+
+    def test_chunks_and_scalar_columns(self):
+        # Chunk boundaries don't change the result; plain numbers apply to every row
+        self.calculator.chunk_size = 4
+        result = self.calculator.evaluate_many("x + offset", x=range(10), offset=100)
+        self.assertEqual(result.tolist(), [100.0 + i for i in range(10)])
+
+    def test_division_by_zero(self):
+        # Like the scalar path, a zero divisor raises instead of producing inf
+        self.calculator.chunk_size = 4
+        with self.assertRaisesRegex(ZeroDivisionError, "row 6"):
+            self.calculator.evaluate_many("1 / (x - 6)", x=numpy.arange(10))
+
+    def test_mismatched_columns(self):
+        # Columns must have the same number of rows
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_many("x + y", x=[1, 2], y=[1, 2, 3])
+
 
 if __name__ == "__main__":
     # Allow running tests directly via `python tests.py`
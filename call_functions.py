@@ -1,18 +1,70 @@
 # python
+import os
+import sys
+import json
+import importlib
+
 from google.genai import types
+from google.genai.version import __version__ as GENAI_VERSION
+
+from functions.call_function import TOOL_NAMES
+
+# The declarations are serialized next to the tool modules' bytecode the first
+# time they are built, and later runs load them from there instead of importing
+# every tool module (and what those import). The cache is keyed on the tool
+# sources, config.py (descriptions quote its limits) and the SDK version, so
+# editing a schema or a limit rebuilds it.
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_FUNCTIONS_DIR = os.path.join(_ROOT, "functions")
+_SCHEMA_CACHE = os.path.join(_FUNCTIONS_DIR, "__pycache__", "tool_schemas.json")
+
+_available_functions = None
+
+
+def _sources_key():
+    # Identifies the tool sources the declarations were built from
+    key = [GENAI_VERSION, sys.version]
+    sources = [os.path.join(_FUNCTIONS_DIR, f"{name}.py") for name in TOOL_NAMES]
+    for path in sources + [os.path.join(_ROOT, "config.py")]:
+        st = os.stat(path)
+        key.append([os.path.basename(path), st.st_mtime_ns, st.st_size])
+    return key
 
-from functions.get_files_info import schema_get_files_info
-from functions.get_file_content import schema_get_file_content
-from functions.run_python_file import schema_run_python_file
-from functions.write_file import schema_write_file
-
-# Tool configuration that registers all available function schemas
-# for the LLM to choose from when processing user requests
-available_functions = types.Tool(
-    function_declarations=[
-        schema_get_files_info,
-        schema_get_file_content,
-        schema_run_python_file,
-        schema_write_file,
+
+def _load_declarations(key):
+    try:
+        with open(_SCHEMA_CACHE) as f:
+            data = json.load(f)
+        if data.get("key") != key:
+            return None
+        return [types.FunctionDeclaration.model_validate(d) for d in data["declarations"]]
+    except Exception:
+        return None
+
+
+def _build_declarations(key):
+    # Import each tool module for its schema_<name>, then save them for next time
+    declarations = [
+        getattr(importlib.import_module(f"functions.{name}"), f"schema_{name}") for name in TOOL_NAMES
     ]
-)
\ No newline at end of file
+    try:
+        os.makedirs(os.path.dirname(_SCHEMA_CACHE), exist_ok=True)
+        tmp = f"{_SCHEMA_CACHE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"key": key, "declarations": [d.model_dump(mode="json", exclude_none=True) for d in declarations]}, f)
+        os.replace(tmp, _SCHEMA_CACHE)
+    except OSError:
+        # A read-only install just rebuilds the declarations every run
+        pass
+    return declarations
+
+
+def get_available_functions():
+    # Tool configuration that registers all available function schemas
+    # for the LLM to choose from when processing user requests
+    global _available_functions
+    if _available_functions is None:
+        key = _sources_key()
+        declarations = _load_declarations(key) or _build_declarations(key)
+        _available_functions = types.Tool(function_declarations=declarations)
+    return _available_functions
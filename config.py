@@ -1,3 +1,38 @@
 # python
 MAX_CHARS = 10000
-MAX_ITERS = 20
\ No newline at end of file
+MAX_ITERS = 20
+MAX_PARALLEL_TOOLS = 4
+MODEL_NAME = "gemini-2.0-flash-001"
+HISTORY_TOKEN_BUDGET = 30000
+HISTORY_KEEP_RECENT = 2
+PYTHON_POOL_SIZE = 2
+PYTHON_POOL_PREIMPORT = ("unittest", "json")
+RUN_TIMEOUT = 30
+RUN_OUTPUT_MAX_BYTES = 16 * 1024
+LISTING_PAGE_SIZE = 200
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_FILE_BYTES = 1024 * 1024
+SYMBOLS_PARALLEL_THRESHOLD = 200
+EDIT_SUMMARY_MAX_LINES = 40
+BATCH_MAX_FILES = 20
+WORKING_DIRECTORY = "./calculator"
+SESSIONS_DIR = ".sessions"
+TRANSCRIPT_BLOB_MIN_CHARS = 512
+TRANSCRIPT_COMPRESS_MIN_BYTES = 256
+RATE_LIMIT_RPM = 15
+RATE_LIMIT_TPM = 1_000_000
+RATE_LIMIT_BURST = 3
+RETRY_MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+BATCH_DIR = ".batch"
+BATCH_CONCURRENCY = 8
+CONTEXT_CACHE_ENABLED = True
+CONTEXT_CACHE_MIN_TOKENS = 4096
+CONTEXT_CACHE_TTL_SECONDS = 600
+CONTEXT_CACHE_REFRESH_MARGIN = 120
+OVERLAY_DIR = ".overlays"
+SPECULATIVE_ATTEMPTS = 0
+TESTS_MAX_WORKERS = 4
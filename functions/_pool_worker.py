@@ -0,0 +1,63 @@
+# python
+# Entry point of a warm run_python_file worker. The interpreter starts and
+# pre-imports common modules ahead of time, then blocks until the pool hands it
+# one job (a JSON line on stdin), runs the target with runpy semantics and exits.
+import os
+import sys
+import json
+import runpy
+import importlib
+import traceback
+
+
+def _preimport(names):
+    # Warm the import cache; a module that fails to import is simply skipped
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+
+def _print_script_traceback(exc, script):
+    # Hide this worker's and runpy's frames so tracebacks look like a plain run
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != script:
+        tb = tb.tb_next
+    traceback.print_exception(type(exc), exc, tb or exc.__traceback__)
+
+
+def main():
+    _preimport(sys.argv[1:])
+
+    # Wait for the job; EOF means the pool shut down before using this worker
+    line = sys.stdin.readline()
+    if not line:
+        return 0
+    job = json.loads(line)
+    script = job["file"]
+
+    # Recreate what `python script args...` would have set up
+    sys.argv = [script] + job["args"]
+    sys.path[0] = os.path.dirname(script)
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        code = e.code
+        if code is None:
+            return 0
+        if isinstance(code, int):
+            return code
+        print(code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        _print_script_traceback(e, script)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = main()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sys.exit(exit_code)
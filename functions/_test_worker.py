@@ -0,0 +1,159 @@
+# python
+# Entry point of a run_tests worker process: imports one test file, runs its
+# unittest TestCases and pytest-style test functions/classes, and
+# prints a JSON list of results as the last line of stdout. Output the tests
+# themselves print is captured so it can't corrupt that line.
+import io
+import os
+import sys
+import json
+import time
+import inspect
+import unittest
+import traceback
+import contextlib
+import importlib.util
+
+
+def _summary(formatted, script):
+    # "AssertionError: 2 != 3 (tests.py:17)" from a formatted traceback
+    lines = [line for line in formatted.strip().splitlines() if line.strip()]
+    message = lines[-1].strip() if lines else "unknown error"
+    location = None
+    marker = f'File "{script}", line '
+    for line in lines:
+        if marker in line:
+            location = line.split(marker, 1)[1].split(",", 1)[0]
+    if location is not None:
+        message += f" ({os.path.basename(script)}:{location})"
+    return message
+
+
+class _Recorder(unittest.TestResult):
+    # Collects one result per TestCase method; running the cases as one suite
+    # keeps setUpClass/setUpModule fixtures working
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+        self.results = []
+        self._start = None
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._start = time.perf_counter()
+
+    def _add(self, test, outcome, message=None):
+        if isinstance(test, unittest.TestCase):
+            test_id = f"{type(test).__name__}.{test._testMethodName}"
+        else:
+            # Fixture failure (setUpClass and friends)
+            test_id = str(test)
+        seconds = time.perf_counter() - self._start if self._start is not None else 0
+        self.results.append({"test": test_id, "outcome": outcome, "message": message, "seconds": round(seconds, 4)})
+        self._start = None
+
+    def addSuccess(self, test):
+        self._add(test, "pass")
+
+    def addFailure(self, test, err):
+        self._add(test, "fail", _summary(self._exc_info_to_string(err, test), self.script))
+
+    def addError(self, test, err):
+        self._add(test, "error", _summary(self._exc_info_to_string(err, test), self.script))
+
+    def addSkip(self, test, reason):
+        self._add(test, "skip", reason)
+
+    def addExpectedFailure(self, test, err):
+        self._add(test, "pass", "expected failure")
+
+    def addUnexpectedSuccess(self, test):
+        self._add(test, "fail", "unexpected success")
+
+
+def _run_callable(function, script):
+    if any(p.default is p.empty and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+           for p in inspect.signature(function).parameters.values()):
+        return "skip", "needs pytest fixtures"
+    try:
+        function()
+    except AssertionError as e:
+        return "fail", _summary("".join(traceback.format_exception(type(e), e, e.__traceback__)), script)
+    except unittest.SkipTest as e:
+        return "skip", str(e)
+    except (Exception, SystemExit) as e:
+        if type(e).__name__ == "Skipped":
+            # pytest.skip()
+            return "skip", str(e)
+        return "error", _summary("".join(traceback.format_exception(type(e), e, e.__traceback__)), script)
+    return "pass", None
+
+
+def _collect(module):
+    # Plain test_* functions and test methods of non-TestCase Test* classes
+    tests = []
+    for name, value in vars(module).items():
+        if getattr(value, "__module__", None) != module.__name__:
+            continue
+        if name.startswith("test") and inspect.isfunction(value):
+            tests.append((name, value))
+        elif name.startswith("Test") and inspect.isclass(value) and not issubclass(value, unittest.TestCase):
+            for method in [m for m in vars(value) if m.startswith("test") and callable(getattr(value, m))]:
+                tests.append((f"{name}.{method}", (value, method)))
+    return tests
+
+
+def _run(test, script):
+    if isinstance(test, tuple):
+        cls, method = test
+        instance = cls()
+        setup = getattr(instance, "setup_method", None)
+        teardown = getattr(instance, "teardown_method", None)
+        if setup is not None:
+            outcome = _run_callable(lambda: setup(getattr(instance, method)), script)
+            if outcome[0] != "pass":
+                return "error", outcome[1]
+        try:
+            return _run_callable(getattr(instance, method), script)
+        finally:
+            if teardown is not None:
+                _run_callable(lambda: teardown(getattr(instance, method)), script)
+    return _run_callable(test, script)
+
+
+def main():
+    script = os.path.realpath(sys.argv[1])
+    # Import the file the way `python script` would find its siblings
+    sys.path.insert(0, os.path.dirname(script))
+    results = []
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+        try:
+            name = "_run_tests_" + os.path.splitext(os.path.basename(script))[0]
+            spec = importlib.util.spec_from_file_location(name, script)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            spec.loader.exec_module(module)
+        except BaseException as e:
+            formatted = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            results.append({"test": "<import>", "outcome": "error", "message": _summary(formatted, script), "seconds": 0})
+            module = None
+        if module is not None:
+            recorder = _Recorder(script)
+            unittest.defaultTestLoader.loadTestsFromModule(module).run(recorder)
+            results.extend(recorder.results)
+            tests = _collect(module)
+        else:
+            tests = []
+        for test_id, test in tests:
+            start = time.perf_counter()
+            outcome, message = _run(test, script)
+            results.append({
+                "test": test_id, "outcome": outcome, "message": message,
+                "seconds": round(time.perf_counter() - start, 4),
+            })
+    sys.__stdout__.write(json.dumps(results) + "\n")
+
+
+if __name__ == "__main__":
+    main()
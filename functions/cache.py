@@ -0,0 +1,130 @@
+# python
+import os
+import hashlib
+import threading
+from contextvars import ContextVar
+
+# Prefix of the marker returned instead of file content the model has already seen
+UNCHANGED_MARKER = "[Unchanged since turn"
+
+
+def file_key(stat_result):
+    # Content-addressing key: a file is considered unchanged while these match
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ToolCache:
+    # Per-session cache of file contents and directory listings keyed on
+    # (realpath, mtime_ns, size). Entries also remember the model turn whose tool
+    # results first returned them, so repeated reads can be answered with a short
+    # marker naming that turn (a number the model can find in its own history).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = {}
+        self.listings = {}
+        self.line_indexes = {}
+        # realpath -> (file key, sha256 or None) of the file as the model last saw
+        # it, through a read or its own write (None: only part of it was read)
+        self.seen = {}
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+
+    def next_call(self):
+        # Count tool calls and start this call's cache hit counter
+        with self._lock:
+            self.calls += 1
+            # Shared by reference with any threads the call fans out to
+            _call_hits.set([0])
+            return self.calls
+
+    def get(self, table, path, key):
+        # Return (value, turn) for a fresh entry, or None on a miss
+        with self._lock:
+            entry = table.get(path)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                hits = _call_hits.get()
+                if hits is not None:
+                    hits[0] += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, table, path, key, value, turn):
+        with self._lock:
+            table[path] = (key, value, turn)
+
+    def note_seen(self, abs_path, key, sha256=None):
+        with self._lock:
+            self.seen[abs_path] = (key, sha256)
+
+    def changed_since_seen(self, abs_path, key, text):
+        # Whether a file (now at `key`, with content `text`) differs from what the
+        # model last read or wrote; False for files it hasn't seen this session
+        with self._lock:
+            seen = self.seen.get(abs_path)
+        if seen is None:
+            return False
+        seen_key, seen_hash = seen
+        if seen_hash is not None:
+            return content_hash(text) != seen_hash
+        return key != seen_key
+
+    def invalidate(self, abs_path):
+        # Forget a written file and the listings of the directories containing it
+        with self._lock:
+            self.line_indexes.pop(abs_path, None)
+            # File entries are keyed on (path, read window)
+            for entry in [k for k in self.files if k[0] == abs_path]:
+                del self.files[entry]
+            # Listing entries are keyed on (directory, listing options)
+            for entry in list(self.listings):
+                if abs_path.startswith(entry[0].rstrip(os.sep) + os.sep):
+                    del self.listings[entry]
+
+    def invalidate_listings(self):
+        # Scripts can change file sizes without going through write_file
+        with self._lock:
+            self.listings.clear()
+
+    def stats(self):
+        return f"Tool cache: {self.hits} hits, {self.misses} misses"
+
+
+_default_cache = ToolCache()
+_turn = ContextVar("model_turn", default=0)
+_call_hits = ContextVar("tool_call_hits", default=None)
+_session_cache = ContextVar("tool_cache", default=None)
+
+
+def get_cache():
+    # The cache of the current agent session (or a process-wide default)
+    return _session_cache.get() or _default_cache
+
+
+def set_turn(turn):
+    # The model turn (its Nth response in the history) whose tool calls run next
+    _turn.set(turn)
+
+
+def current_turn():
+    # Model turn of the tool call being executed in this thread
+    return _turn.get()
+
+
+def current_call_hits():
+    # Cache hits served to the tool call being executed in this thread
+    hits = _call_hits.get()
+    return hits[0] if hits is not None else 0
+
+
+def new_session():
+    # Start a fresh cache for the session running in the current context
+    cache = ToolCache()
+    _session_cache.set(cache)
+    return cache
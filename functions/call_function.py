@@ -1,11 +1,70 @@
 # python
+import os
+import sys
+import importlib
+from contextvars import ContextVar
 from google.genai import types
+from config import WORKING_DIRECTORY
+from tracing import get_tracer
+from functions.cache import get_cache, current_call_hits
+
+# Tool functions the model may call. Each lives in functions/<name>.py next to
+# its schema_<name> declaration, and its module is imported on the first call,
+# so a session only loads the tools it actually uses.
+TOOL_NAMES = (
+    "get_files_info",
+    "get_file_content",
+    "get_file_contents",
+    "run_python_file",
+    "write_file",
+    "edit_file",
+    "write_files",
+    "search_code",
+    "get_symbols",
+    "run_tests",
+)
+
+# Map of function names (strings) to actual callables, filled in on first call
+functions_map = {}
+
+# Tools that never modify the working directory and may safely run concurrently
+READ_ONLY_FUNCTIONS = {"get_files_info", "get_file_content", "get_file_contents", "search_code", "get_symbols"}
+
+# Working directory injected into tool calls; each agent session sets its own
+_working_directory = ContextVar("working_directory", default=WORKING_DIRECTORY)
+
+
+def set_working_directory(working_directory):
+    # Point tool calls made from the current context (and threads it starts) at a directory
+    _working_directory.set(working_directory)
+
+
+def get_function(function_name):
+    # The callable for a tool name, importing its module if needed; None if unknown
+    func = functions_map.get(function_name)
+    if func is None and function_name in TOOL_NAMES:
+        func = getattr(importlib.import_module(f"functions.{function_name}"), function_name)
+        functions_map[function_name] = func
+    return func
+
+
+# Per-directory state kept by tool modules: (module, release function)
+_RELEASERS = (
+    ("functions.python_pool", "release_pool"),
+    ("functions.search_code", "release_index"),
+    ("functions.run_tests", "release_suite"),
+)
+
+
+def release_working_directory(working_directory):
+    # Free the warm interpreters, search index and test graph kept for a finished
+    # session's directory; a module that was never imported has nothing to free
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+    for module_name, release in _RELEASERS:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            getattr(module, release)(abs_work)
 
-# Import available tool functions the model may call
-from functions.get_files_info import get_files_info
-from functions.get_file_content import get_file_content
-from functions.run_python_file import run_python_file
-from functions.write_file import write_file
 
 def call_function(function_call_part, verbose=False):
     # Extract the chosen function's name and its argument dict from the model
@@ -18,20 +77,12 @@ def call_function(function_call_part, verbose=False):
     else:
         print(f" - Calling function: {function_name}")
 
-    # Map of function names (strings) to actual callables
-    functions_map = {
-        "get_files_info": get_files_info,
-        "get_file_content": get_file_content,
-        "run_python_file": run_python_file,
-        "write_file": write_file
-    }
-
     # Start from provided args (or empty), then inject the required working directory
     call_args = dict(args) if args is not None else {}
-    call_args.setdefault("working_directory", "./calculator")
+    call_args.setdefault("working_directory", _working_directory.get())
 
     # Look up the target function by name
-    func = functions_map.get(function_name)
+    func = get_function(function_name)
     if func is None:
         # Return a tool response indicating the function name was invalid
         return types.Content(
@@ -44,8 +95,11 @@ def call_function(function_call_part, verbose=False):
             ],
         )
     
-    # Execute the function with keyword arguments and capture the result
-    result = func(**call_args)
+    # Number the call for the session cache, then execute it with keyword arguments
+    with get_tracer().span(function_name, "tool", bytes_in=len(str(args or {}))) as span:
+        get_cache().next_call()
+        result = func(**call_args)
+        span.set(bytes_out=len(str(result)), cache_hits=current_call_hits())
 
     # Return a standardized tool response wrapping the result
     return types.Content(
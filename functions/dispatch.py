@@ -0,0 +1,68 @@
+# python
+import time
+import asyncio
+
+from functions.call_function import call_function, READ_ONLY_FUNCTIONS
+
+
+def _timed_call(function_call_part, verbose):
+    # Run a single tool call and report how long it took
+    start = time.perf_counter()
+    result = call_function(function_call_part, verbose=verbose)
+    return result, time.perf_counter() - start
+
+
+class CallScheduler:
+    # Starts tool calls as soon as they are submitted while preserving ordering:
+    # read-only calls overlap with each other (bounded by max_parallel), and any
+    # other call (writes, script runs) acts as a barrier, so mutations keep their
+    # order relative to every other call in the turn.
+    def __init__(self, max_parallel=1, verbose=False):
+        self.verbose = verbose
+        self._slots = asyncio.Semaphore(max(1, max_parallel))
+        self._barrier = None
+        self._since_barrier = []
+        self._tasks = []
+
+    async def _run(self, function_call_part, wait_for):
+        # Wait until every call this one depends on has finished
+        for task in wait_for:
+            await asyncio.shield(task)
+        async with self._slots:
+            # Tool functions are blocking, so run them off the event loop
+            return await asyncio.to_thread(_timed_call, function_call_part, self.verbose)
+
+    def submit(self, function_call_part):
+        if function_call_part.name in READ_ONLY_FUNCTIONS:
+            # Reads only need earlier mutations to have completed
+            wait_for = [self._barrier] if self._barrier else []
+            task = asyncio.create_task(self._run(function_call_part, wait_for))
+            self._since_barrier.append(task)
+        else:
+            # Mutations wait for everything submitted before them
+            wait_for = ([self._barrier] if self._barrier else []) + self._since_barrier
+            task = asyncio.create_task(self._run(function_call_part, wait_for))
+            self._barrier = task
+            self._since_barrier = []
+        self._tasks.append(task)
+        return task
+
+    async def results(self):
+        # Collect (Content, seconds) tuples in the original submission order
+        return await asyncio.gather(*self._tasks)
+
+
+async def dispatch_calls_async(calls, max_parallel=1, verbose=False):
+    scheduler = CallScheduler(max_parallel=max_parallel, verbose=verbose)
+    for fc in calls:
+        scheduler.submit(fc)
+    return await scheduler.results()
+
+
+# Execute the function calls from one model turn and return (Content, seconds)
+# tuples in the original call order. Blocking wrapper around CallScheduler.
+def dispatch_calls(calls, max_parallel=1, verbose=False):
+    # Sequential mode: behave exactly like the original loop
+    if max_parallel <= 1 or len(calls) <= 1:
+        return [_timed_call(fc, verbose) for fc in calls]
+    return asyncio.run(dispatch_calls_async(calls, max_parallel=max_parallel, verbose=verbose))
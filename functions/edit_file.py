@@ -0,0 +1,197 @@
+# python
+import os
+import re
+import difflib
+from google.genai import types
+from config import EDIT_SUMMARY_MAX_LINES
+from functions.cache import get_cache, file_key, content_hash
+from functions.write_file import atomic_write, after_write
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class EditError(Exception):
+    # An edit that doesn't apply cleanly to the current file content
+    pass
+
+
+def _apply_replacements(text, edits):
+    # Apply exact-match search/replace pairs in order; each search must be unique
+    for i, edit in enumerate(edits, 1):
+        search = edit.get("search")
+        replace = edit.get("replace", "")
+        if not search:
+            raise EditError(f"edit {i} has an empty search string")
+        count = text.count(search)
+        if count == 0:
+            raise EditError(f"edit {i}: search text not found")
+        if count > 1:
+            raise EditError(f"edit {i}: search text matches {count} places; include more context")
+        text = text.replace(search, replace, 1)
+    return text
+
+
+def _parse_hunks(diff):
+    # Split a unified diff into (old_start, old_lines, new_lines) hunks, using the
+    # header counts to tell hunk bodies apart from file headers between them
+    hunks = []
+    old_left = new_left = 0
+    for line in diff.splitlines():
+        match = _HUNK_HEADER.match(line)
+        if match:
+            old_left = int(match.group(2)) if match.group(2) is not None else 1
+            new_left = int(match.group(4)) if match.group(4) is not None else 1
+            current = (int(match.group(1)), [], [])
+            hunks.append(current)
+        elif old_left <= 0 and new_left <= 0 or line.startswith("\\"):
+            # File headers, trailing text, or "\ No newline at end of file"
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+            old_left -= 1
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+            new_left -= 1
+        else:
+            # Context line (a bare empty line is an empty context line)
+            context = line[1:] if line.startswith(" ") else line
+            current[1].append(context)
+            current[2].append(context)
+            old_left -= 1
+            new_left -= 1
+    if not hunks:
+        raise EditError("diff contains no @@ hunks")
+    return hunks
+
+
+def _apply_unified_diff(text, diff):
+    # Apply hunks at their stated position, or at the unique place the old lines occur
+    lines = text.split("\n")
+    shift = 0
+    for i, (old_start, old_lines, new_lines) in enumerate(_parse_hunks(diff), 1):
+        size = len(old_lines)
+        # A pure insertion ("@@ -2,0 +3 @@") goes after line old_start, not at it
+        expected = max(old_start - 1 + shift if size else old_start + shift, 0)
+        if lines[expected:expected + size] == old_lines:
+            position = expected
+        else:
+            found = [p for p in range(len(lines) - size + 1) if lines[p:p + size] == old_lines]
+            if len(found) != 1:
+                reason = "not found" if not found else f"matches {len(found)} places"
+                raise EditError(f"hunk {i} (line {old_start}): context {reason}")
+            position = found[0]
+        lines[position:position + size] = new_lines
+        shift += len(new_lines) - size
+    return "\n".join(lines)
+
+
+def _summary(file_path, before, after):
+    # Compact diff of what changed: zero-context unified diff, capped in length
+    diff = list(difflib.unified_diff(
+        before.splitlines(), after.splitlines(), f"a/{file_path}", f"b/{file_path}", n=0, lineterm=""
+    ))
+    added = sum(1 for l in diff if l.startswith("+") and not l.startswith("+++"))
+    removed = sum(1 for l in diff if l.startswith("-") and not l.startswith("---"))
+    hunks = sum(1 for l in diff if l.startswith("@@"))
+    body = diff[2:]
+    if len(body) > EDIT_SUMMARY_MAX_LINES:
+        body = body[:EDIT_SUMMARY_MAX_LINES] + [f"[...{len(body) - EDIT_SUMMARY_MAX_LINES} more diff lines]"]
+    header = (
+        f'Successfully edited "{file_path}" ({hunks} hunks, +{added} -{removed} lines); '
+        f"sha256={content_hash(after)}"
+    )
+    return "\n".join([header] + body)
+
+
+def edit_file(working_directory, file_path, edits=None, diff=None, expected_sha256=None):
+    # Resolve the working directory to an absolute, normalized path
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+    # Resolve the target file path relative to the working directory
+    abs_file = os.path.realpath(os.path.join(abs_work, file_path))
+
+    # Sandbox enforcement: same rule as write_file
+    if not (abs_file == abs_work or abs_file.startswith(abs_work + os.sep)):
+        return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
+
+    if not os.path.isfile(abs_file):
+        return f'Error: File not found or is not a regular file: "{file_path}"'
+    if not edits and not diff:
+        return "Error: provide either edits or diff"
+
+    try:
+        key = file_key(os.stat(abs_file))
+        with open(abs_file, "r") as f:
+            before = f.read()
+
+        # Refuse to edit a file that changed since the model last saw it: against
+        # the given hash, or else against what this session last read or wrote
+        if expected_sha256:
+            if content_hash(before) != expected_sha256:
+                return f'Error: "{file_path}" has changed (sha256 mismatch); re-read it before editing'
+        elif get_cache().changed_since_seen(abs_file, key, before):
+            return f'Error: "{file_path}" has changed since you last read or wrote it; re-read it before editing'
+
+        after = before
+        if edits:
+            after = _apply_replacements(after, [dict(e) for e in edits])
+        if diff:
+            after = _apply_unified_diff(after, diff)
+        if after == before:
+            return f'No changes: edits to "{file_path}" left the content unchanged'
+
+        atomic_write(abs_file, after)
+        after_write(abs_work, abs_file, after)
+        return _summary(file_path, before, after)
+    except EditError as e:
+        return f'Error: Could not apply edit to "{file_path}": {e}'
+    except Exception as e:
+        # Surface any filesystem error in the required format
+        return f'Error: {e}'
+
+# Function declaration schema for tool usage by the LLM
+schema_edit_file = types.FunctionDeclaration(
+    name="edit_file",
+    description=(
+        "Edits an existing file within the working directory without resending it: applies exact search/replace "
+        "edits and/or a unified diff, writes atomically and returns a compact diff summary with the new sha256."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="The filepath to edit, relative to the working directory.",
+            ),
+            "edits": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "search": types.Schema(
+                            type=types.Type.STRING,
+                            description="Exact text to find; must occur exactly once in the file.",
+                        ),
+                        "replace": types.Schema(
+                            type=types.Type.STRING,
+                            description="Text to put in its place.",
+                        ),
+                    },
+                    required=["search", "replace"],
+                ),
+                description="Search/replace edits, applied in order.",
+            ),
+            "diff": types.Schema(
+                type=types.Type.STRING,
+                description="A unified diff (with @@ hunk headers) to apply to the file.",
+            ),
+            "expected_sha256": types.Schema(
+                type=types.Type.STRING,
+                description=(
+                    "Optional sha256 of the content the edits were written against (from a previous edit_file "
+                    "result). Without it, the edit is refused if the file changed since you last read or wrote it."
+                ),
+            ),
+        },
+        required=["file_path"],
+    ),
+)
@@ -1,33 +1,132 @@
 # python
 import os
+import mmap
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
 from config import MAX_CHARS
 from google.genai import types
+from functions.cache import get_cache, current_turn, file_key, content_hash, UNCHANGED_MARKER
 
-def get_file_content(working_directory, file_path):
+
+def _line_index(cache, abs_file, key):
+    # Byte offset where each line starts (plus the file size as a final entry),
+    # built in one C-level pass and cached until the file's mtime/size changes
+    cached = cache.get(cache.line_indexes, abs_file, key)
+    if cached is not None:
+        return cached[0]
+    with open(abs_file, "rb") as f:
+        offsets = array("Q", accumulate(map(len, f), initial=0))
+    cache.put(cache.line_indexes, abs_file, key, offsets, current_turn())
+    return offsets
+
+
+def _read_window(abs_file, start, end):
+    # Serve a byte range straight from an mmap of the file
+    if end <= start:
+        return ""
+    with open(abs_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[start:end].decode("utf-8", errors="replace")
+
+
+def _byte_window(abs_file, file_path, size, offset, length):
+    # Return `length` bytes from `offset`, capped at MAX_CHARS
+    start = min(max(offset or 0, 0), size)
+    wanted = length if length is not None else MAX_CHARS
+    end = min(start + min(max(wanted, 0), MAX_CHARS), size)
+    text = _read_window(abs_file, start, end)
+    if start > 0 or end < size:
+        text += f'\n[...Returned bytes {start}-{end} of {size} from "{file_path}"]'
+    return text
+
+
+def _line_window(abs_file, file_path, size, offsets, start_line, end_line):
+    # Return whole lines start_line..end_line (1-based, inclusive), capped at MAX_CHARS
+    total_lines = len(offsets) - 1
+    first = min(max(start_line or 1, 1), total_lines + 1)
+    last = min(end_line if end_line is not None else total_lines, total_lines)
+    start = offsets[first - 1]
+    end = offsets[last] if last >= first else start
+    returned_last = last
+    if end - start > MAX_CHARS:
+        # Keep as many complete lines as fit; cut a single oversized line by bytes
+        returned_last = bisect_right(offsets, start + MAX_CHARS) - 1
+        if returned_last < first:
+            returned_last = first
+            end = start + MAX_CHARS
+        else:
+            end = offsets[returned_last]
+    text = _read_window(abs_file, start, end)
+    if first > 1 or returned_last < total_lines or end < offsets[returned_last]:
+        notice = f'\n[...Returned lines {first}-{returned_last} of {total_lines} from "{file_path}"'
+        if end < offsets[returned_last]:
+            notice += f", line {first} cut at {MAX_CHARS} bytes"
+        elif returned_last < last:
+            notice += f" (requested {first}-{last}, capped at {MAX_CHARS} bytes)"
+        text += notice + "]"
+    return text
+
+
+def get_file_content(working_directory, file_path, offset=None, length=None, start_line=None, end_line=None):
     # Normalize and resolve absolute paths for sandboxing
     abs_work = os.path.realpath(working_directory).rstrip(os.sep)
-    abs_file = os.path.realpath(os.path.join(working_directory, file_path))
+    return read_resolved(abs_work, file_path, offset, length, start_line, end_line)
+
+
+def read_resolved(abs_work, file_path, offset=None, length=None, start_line=None, end_line=None):
+    # Read one file given an already-resolved working directory (shared with get_file_contents)
+    abs_file = os.path.realpath(os.path.join(abs_work, file_path))
 
     # Enforce sandbox: target file must reside within the working directory
     inside = abs_file.startswith(abs_work + os.sep)
     if not inside:
         return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
-    
+
     # Ensure the target exists and is a regular file
     if not os.path.isfile(abs_file):
         return f'Error: File not found or is not a regular file: "{file_path}"'
 
     try:
-        # Read up to MAX_CHARS + 1 to detect if truncation is required
-        with open(abs_file, "r") as f:
-            file_content_string = f.read(MAX_CHARS + 1)
-
-        # Truncate and append a notice if content exceeds the limit
-        if len(file_content_string) > MAX_CHARS:
-            file_content_string = (
-                file_content_string[:MAX_CHARS]
-                + f'[...File "{file_path}" truncated at 10000 characters]'
+        # Answer re-reads of an unchanged file (or window) with a marker instead of the full text
+        cache = get_cache()
+        stat_result = os.stat(abs_file)
+        key = file_key(stat_result)
+        # Numbers arrive from the model as floats; normalize the window to ints
+        window = tuple(None if v is None else int(v) for v in (offset, length, start_line, end_line))
+        offset, length, start_line, end_line = window
+        cached = cache.get(cache.files, (abs_file, window), key)
+        if cached is not None:
+            return (
+                f'{UNCHANGED_MARKER} {cached[1]}: "{file_path}" has not been modified since its content was '
+                f'returned for your response #{cached[1]}]'
             )
+
+        # sha256 of the file when the model gets all of it (edit_file checks against it)
+        whole_hash = None
+        if start_line is not None or end_line is not None:
+            # Line windows are resolved through the cached line-offset index
+            offsets = _line_index(cache, abs_file, key)
+            file_content_string = _line_window(
+                abs_file, file_path, stat_result.st_size, offsets, start_line, end_line
+            )
+        elif offset is not None or length is not None:
+            file_content_string = _byte_window(abs_file, file_path, stat_result.st_size, offset, length)
+        else:
+            # Read up to MAX_CHARS + 1 to detect if truncation is required
+            with open(abs_file, "r") as f:
+                file_content_string = f.read(MAX_CHARS + 1)
+
+            # Truncate and append a notice if content exceeds the limit
+            if len(file_content_string) <= MAX_CHARS:
+                whole_hash = content_hash(file_content_string)
+            else:
+                file_content_string = (
+                    file_content_string[:MAX_CHARS]
+                    + f'[...File "{file_path}" truncated at {MAX_CHARS} characters; '
+                    + f'use offset/length or start_line/end_line to read more]'
+                )
+        cache.put(cache.files, (abs_file, window), key, file_content_string, current_turn())
+        cache.note_seen(abs_file, key, whole_hash)
         return file_content_string
     except Exception as e:
         # Convert any I/O or OS errors into a standardized error string
@@ -36,7 +135,10 @@ def get_file_content(working_directory, file_path):
 # Function declaration schema for tool usage by the LLM
 schema_get_file_content = types.FunctionDeclaration(
     name="get_file_content",
-    description="Reads and returns the first {MAX_CHARS} characters of the content from a specified file within the working directory.",
+    description=(
+        f"Reads and returns the first {MAX_CHARS} characters of the content from a specified file within the working directory. "
+        "Pass start_line/end_line for a window of lines, or offset/length for a byte range, to read further into large files."
+    ),
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -44,6 +146,22 @@ schema_get_file_content = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="The filepath to read content from, relative to the working directory",
             ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional byte offset to start reading from.",
+            ),
+            "length": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"Optional number of bytes to read from offset (at most {MAX_CHARS}).",
+            ),
+            "start_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional first line to return (1-based, inclusive).",
+            ),
+            "end_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional last line to return (1-based, inclusive). Defaults to the end of the file.",
+            ),
         },
     ),
-)
\ No newline at end of file
+)
@@ -0,0 +1,48 @@
+# python
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from google.genai import types
+from config import BATCH_MAX_FILES, MAX_PARALLEL_TOOLS
+from functions.get_file_content import read_resolved
+
+
+def get_file_contents(working_directory, file_paths):
+    # Resolve the sandbox root once for the whole batch
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+
+    if not file_paths:
+        return "Error: file_paths must list at least one file"
+    if len(file_paths) > BATCH_MAX_FILES:
+        return f"Error: at most {BATCH_MAX_FILES} files can be read in one call"
+
+    # Read the files concurrently; each worker runs in a copy of this context so the
+    # session cache and call number stay visible. Duplicates are read once.
+    unique_paths = list(dict.fromkeys(file_paths))
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_TOOLS, len(unique_paths)))) as pool:
+        futures = {
+            path: pool.submit(contextvars.copy_context().run, read_resolved, abs_work, path)
+            for path in unique_paths
+        }
+        # One structured result: file path -> content (or error string)
+        return {path: future.result() for path, future in futures.items()}
+
+# Function declaration schema for tool usage by the LLM
+schema_get_file_contents = types.FunctionDeclaration(
+    name="get_file_contents",
+    description=(
+        "Reads several files within the working directory in one call and returns each file's content "
+        "(subject to the same per-file limits as get_file_content), keyed by file path."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_paths": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description=f"Filepaths to read, relative to the working directory (at most {BATCH_MAX_FILES}).",
+            ),
+        },
+        required=["file_paths"],
+    ),
+)
@@ -1,8 +1,21 @@
 # python
 import os
 from google.genai import types
+from config import LISTING_PAGE_SIZE
+from functions.cache import get_cache, current_turn, file_key
+from functions.walk import walk
 
-def get_files_info(working_directory, directory="."):
+
+def _patterns(value):
+    # Accept a single glob, a comma-separated string, or a list of globs
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(p.strip() for p in value if p and p.strip())
+
+
+def get_files_info(working_directory, directory=".", recursive=False, max_depth=None, include=None, exclude=None, cursor=None):
     # Compute absolute paths for the sandbox root and target
     abs_work = os.path.abspath(working_directory)
     abs_target = os.path.abspath(os.path.join(working_directory, directory))
@@ -15,32 +28,66 @@ def get_files_info(working_directory, directory="."):
     # Ensure target exists and is a directory
     if not os.path.isdir(abs_target):
         return f'Error: "{directory}" is not a directory'
-    
+
     try:
-        # Get deterministic listing
-        listing = sorted(os.listdir(abs_target))
+        include = _patterns(include)
+        exclude = _patterns(exclude)
+        max_depth = int(max_depth) if max_depth is not None else None
+
+        # Reuse a single-level listing while the directory itself is unchanged
+        # (recursive listings depend on every subdirectory, so they aren't cached)
+        cache = get_cache()
+        real_target = os.path.realpath(abs_target)
+        cacheable = not recursive
+        if cacheable:
+            key = file_key(os.stat(real_target))
+            table_key = (real_target, include, exclude, cursor)
+            cached = cache.get(cache.listings, table_key, key)
+            if cached is not None:
+                return cached[0]
+
+        # Single scandir pass: DirEntry carries the type, so only size needs a stat
         lines = []
-        for name in listing:
-            full_path = os.path.join(abs_target, name)
+        last = None
+        more = False
+        for rel_path, entry, _ in walk(
+            abs_work, abs_target, recursive=recursive, max_depth=max_depth,
+            include=include, exclude=exclude, after=cursor,
+        ):
+            if len(lines) >= LISTING_PAGE_SIZE:
+                more = True
+                break
             try:
                 # Collect basic metadata for each entry
-                size = os.path.getsize(full_path)
-                is_dir = os.path.isdir(full_path)
+                size = entry.stat().st_size
+                is_dir = entry.is_dir()
                 # Format a single-line summary for the entry
-                lines.append(f' - {name}: file_size={size} bytes, is_dir={is_dir}')
-            except Exception as e:
-                # Surface a per-entry error as a single error string
-                return f'Error: {e}'
+                lines.append(f' - {rel_path}: file_size={size} bytes, is_dir={is_dir}')
+            except OSError as e:
+                # A broken entry shouldn't hide the rest of the listing
+                lines.append(f' - {rel_path}: Error: {e.strerror or e}')
+            last = rel_path
+
+        # Tell the model how to fetch the next page
+        if more:
+            lines.append(f'[...Listing truncated after {LISTING_PAGE_SIZE} entries; call again with cursor="{last}" for more]')
+
         # Return the aggregated listing
-        return '\n'.join(lines)
+        listing_string = '\n'.join(lines)
+        if cacheable:
+            cache.put(cache.listings, table_key, key, listing_string, current_turn())
+        return listing_string
     except Exception as e:
         # Surface a top-level directory listing error
         return f'Error: {e}'
-    
+
 # Function declaration schema for tool usage by the LLM
 schema_get_files_info = types.FunctionDeclaration(
     name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
+    description=(
+        "Lists files in the specified directory along with their sizes, constrained to the working directory. "
+        "Can walk subdirectories recursively with glob filters; .gitignore'd paths and __pycache__ are skipped."
+    ),
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -48,6 +95,28 @@ schema_get_files_info = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
             ),
+            "recursive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="List subdirectories recursively. Entries are shown as paths relative to the directory.",
+            ),
+            "max_depth": types.Schema(
+                type=types.Type.INTEGER,
+                description="With recursive, the maximum number of directory levels to descend (1 lists only the directory itself).",
+            ),
+            "include": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Optional glob patterns (e.g. '*.py'); only matching entries are listed.",
+            ),
+            "exclude": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Optional glob patterns for entries to skip entirely, including their subdirectories.",
+            ),
+            "cursor": types.Schema(
+                type=types.Type.STRING,
+                description="Resume a truncated listing after this entry (taken from the previous result).",
+            ),
         },
     ),
 )
@@ -0,0 +1,184 @@
+# python
+import os
+import ast
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from google.genai import types
+from config import MAX_CHARS, SYMBOLS_PARALLEL_THRESHOLD
+from functions.walk import walk
+
+# Parsed outlines keyed by absolute path: ((mtime_ns, size), symbols or error string)
+_outlines = {}
+_outlines_lock = threading.Lock()
+
+
+def _signature(node):
+    # One-line signature for a def/class node
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases + node.keywords)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _collect(body, parent, depth, out):
+    # Walk classes and functions (including nested ones) in source order
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            qualname = f"{parent}.{node.name}" if parent else node.name
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            out.append((qualname, depth, _signature(node), start, node.end_lineno))
+            _collect(node.body, qualname, depth + 1, out)
+
+
+def _parse_file(abs_file):
+    # Parse one file into (qualname, depth, signature, start, end) tuples. Runs in
+    # worker processes during cold builds, so it must stay a plain top-level function.
+    try:
+        st = os.stat(abs_file)
+        with open(abs_file, "rb") as f:
+            tree = ast.parse(f.read(), filename=abs_file)
+        symbols = []
+        _collect(tree.body, "", 0, symbols)
+        return abs_file, (st.st_mtime_ns, st.st_size), symbols
+    except (SyntaxError, ValueError) as e:
+        return abs_file, (st.st_mtime_ns, st.st_size), f"SyntaxError: {e}"
+    except OSError as e:
+        return abs_file, None, f"Error: {e}"
+
+
+def _outline_files(abs_files):
+    # Return {abs_file: symbols-or-error}, parsing only files whose mtime/size changed
+    result = {}
+    stale = []
+    for abs_file in abs_files:
+        try:
+            st = os.stat(abs_file)
+        except OSError as e:
+            result[abs_file] = f"Error: {e}"
+            continue
+        with _outlines_lock:
+            entry = _outlines.get(abs_file)
+        if entry is not None and entry[0] == (st.st_mtime_ns, st.st_size):
+            result[abs_file] = entry[1]
+        else:
+            stale.append(abs_file)
+
+    workers = min(os.cpu_count() or 1, 8)
+    if len(stale) >= SYMBOLS_PARALLEL_THRESHOLD and workers > 1:
+        # Cold build of a large tree: spread parsing across processes
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                parsed = list(pool.map(_parse_file, stale, chunksize=32))
+        except BrokenProcessPool:
+            # Workers can't start (e.g. no importable __main__); parse in-process instead
+            parsed = [_parse_file(abs_file) for abs_file in stale]
+    else:
+        parsed = [_parse_file(abs_file) for abs_file in stale]
+
+    with _outlines_lock:
+        for abs_file, key, symbols in parsed:
+            if key is not None:
+                _outlines[abs_file] = (key, symbols)
+            result[abs_file] = symbols
+    return result
+
+
+def _format_outline(rel_path, symbols):
+    if isinstance(symbols, str):
+        return f"{rel_path}: {symbols}"
+    lines = [rel_path]
+    for _, depth, signature, start, end in symbols:
+        lines.append(f"{'  ' * (depth + 1)}{signature}  L{start}-{end}")
+    return "\n".join(lines)
+
+
+def _symbol_source(abs_file, rel_path, symbols, symbol):
+    # Source of the named symbol; a bare name matches the last part of a qualname
+    if isinstance(symbols, str):
+        return None
+    matches = [s for s in symbols if s[0] == symbol or s[0].rsplit(".", 1)[-1] == symbol]
+    if not matches:
+        return None
+    exact = [s for s in matches if s[0] == symbol]
+    qualname, _, _, start, end = (exact or matches)[0]
+    with open(abs_file, "r", errors="replace") as f:
+        lines = f.read().splitlines()
+    source = "\n".join(lines[start - 1:end])
+    if len(source) > MAX_CHARS:
+        source = source[:MAX_CHARS] + f'[...Symbol "{qualname}" truncated at {MAX_CHARS} characters]'
+    others = ""
+    if len(matches) > 1 and not exact:
+        others = f" (also: {', '.join(s[0] for s in matches[1:])})"
+    return f"{rel_path}:{start}-{end} {qualname}{others}\n{source}"
+
+
+def get_symbols(working_directory, path=".", symbol=None):
+    # Resolve absolute paths for sandboxing
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+    abs_target = os.path.realpath(os.path.join(working_directory, path))
+
+    # Enforce sandbox: target must be the work dir or inside it
+    if not (abs_target == abs_work or abs_target.startswith(abs_work + os.sep)):
+        return f'Error: Cannot inspect "{path}" as it is outside the permitted working directory'
+    if not os.path.exists(abs_target):
+        return f'Error: "{path}" does not exist'
+
+    try:
+        # Collect the Python files to outline, leaving out symlinks that lead
+        # outside the working directory
+        if os.path.isdir(abs_target):
+            abs_files = [
+                entry.path
+                for rel, entry, _ in walk(abs_work, abs_target, recursive=True, include=("*.py",))
+                if entry.is_file() and os.path.realpath(entry.path).startswith(abs_work + os.sep)
+            ]
+        else:
+            abs_files = [abs_target]
+        outlines = _outline_files(abs_files)
+
+        def rel(abs_file):
+            return os.path.relpath(abs_file, abs_work).replace(os.sep, "/")
+
+        if symbol:
+            # Return just the source of one symbol instead of whole files
+            for abs_file in abs_files:
+                found = _symbol_source(abs_file, rel(abs_file), outlines[abs_file], symbol)
+                if found:
+                    return found
+            return f'Error: Symbol "{symbol}" not found under "{path}"'
+
+        text = "\n".join(_format_outline(rel(f), outlines[f]) for f in abs_files)
+        if not text:
+            return f'No Python files found under "{path}"'
+        if len(text) > MAX_CHARS:
+            text = text[:MAX_CHARS] + f"[...Outline truncated at {MAX_CHARS} characters; narrow the path]"
+        return text
+    except Exception as e:
+        return f"Error: {e}"
+
+# Function declaration schema for tool usage by the LLM
+schema_get_symbols = types.FunctionDeclaration(
+    name="get_symbols",
+    description=(
+        "Outlines the classes, functions and methods (with signatures and line ranges) of a Python file or "
+        "of every Python file under a directory. With symbol set, returns only that symbol's source."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "path": types.Schema(
+                type=types.Type.STRING,
+                description="File or directory to outline, relative to the working directory. Defaults to the working directory.",
+            ),
+            "symbol": types.Schema(
+                type=types.Type.STRING,
+                description="Optional symbol name, e.g. 'Calculator._apply_operator' or '_apply_operator', whose source to return.",
+            ),
+        },
+    ),
+)
@@ -0,0 +1,88 @@
+# python
+import os
+import threading
+
+from config import RUN_OUTPUT_MAX_BYTES
+
+_READ_SIZE = 64 * 1024
+
+
+class HeadTailBuffer:
+    # Keeps the first and last `limit // 2` bytes of a stream and counts what
+    # falls in between, so memory stays fixed no matter how much a child prints
+    def __init__(self, limit=RUN_OUTPUT_MAX_BYTES):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.dropped = 0
+
+    def write(self, data):
+        # Fill the head first, then keep only the newest bytes in the tail
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self.tail += data
+        overflow = len(self.tail) - self.tail_limit
+        if overflow > 0:
+            del self.tail[:overflow]
+            self.dropped += overflow
+
+    def text(self):
+        # Decode, marking where bytes were dropped between head and tail
+        head = self.head.decode("utf-8", errors="replace")
+        tail = self.tail.decode("utf-8", errors="replace")
+        if self.dropped:
+            return f"{head}\n[... {self.dropped} bytes dropped ...]\n{tail}"
+        return head + tail
+
+
+def _drain(pipe, buffer):
+    # Read a pipe incrementally until the child closes it
+    fd = pipe.fileno()
+    while True:
+        chunk = os.read(fd, _READ_SIZE)
+        if not chunk:
+            break
+        buffer.write(chunk)
+    pipe.close()
+
+
+class CapturedOutput:
+    # Result of capture(): exit code (None after a timeout) and bounded streams
+    def __init__(self, returncode, stdout, stderr, timed_out):
+        self.returncode = returncode
+        self.stdout = stdout.text()
+        self.stderr = stderr.text()
+        self.dropped = stdout.dropped + stderr.dropped
+        self.timed_out = timed_out
+
+
+def capture(process, timeout, limit=RUN_OUTPUT_MAX_BYTES):
+    # Stream a binary-mode Popen's stdout/stderr into bounded buffers. On timeout
+    # the child is killed and whatever it printed so far is still returned.
+    stdout = HeadTailBuffer(limit)
+    stderr = HeadTailBuffer(limit)
+    readers = [
+        threading.Thread(target=_drain, args=(process.stdout, stdout), daemon=True),
+        threading.Thread(target=_drain, args=(process.stderr, stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except Exception:
+        # Timeout (or interruption): stop the child so the pipes reach EOF
+        timed_out = True
+        process.kill()
+        process.wait()
+
+    for reader in readers:
+        # After a kill, don't wait forever on grandchildren holding the pipes
+        reader.join(1 if timed_out else None)
+    return CapturedOutput(None if timed_out else process.returncode, stdout, stderr, timed_out)
@@ -0,0 +1,257 @@
+# python
+import os
+import json
+import time
+import shutil
+import secrets
+import tempfile
+import threading
+
+from config import OVERLAY_DIR, BATCH_DIR
+from functions.walk import ALWAYS_SKIPPED
+from functions.call_function import release_working_directory
+
+# Copy-on-write overlay of a working directory. The merged view is a tree of
+# real directories whose files are hardlinks to the base tree's files (a copy
+# only when the overlay is on another filesystem), so building it costs one
+# link per file and no data is copied. Every write tool replaces files with
+# os.replace, which puts a new inode into the merged view and leaves the base
+# file untouched; the overlay's changes ("upper layer") are therefore exactly
+# the paths whose inode no longer matches the base. Scripts run with
+# run_python_file see the merged view as an ordinary directory. Note that a
+# script rewriting an existing file in place (open(path, "w")) would write
+# through the shared inode; the agent's own tools never do. Every overlay that
+# runs scripts (sessions with --overlay, batch tasks, speculative attempts) is
+# therefore isolated: it copies every file instead, so nothing written in it
+# can reach the base or another overlay, and its changes are the files whose
+# size or mtime differ from the snapshot. Linked overlays are only safe for
+# work that goes through the write tools alone.
+#
+# Changes are found by comparing the merged view with a snapshot of the base
+# taken when the overlay was created, not with the base as it is now, so files
+# that other overlays committed to the base in the meantime are not mistaken
+# for this overlay's changes. A commit refuses to overwrite (or delete) a base
+# file that changed since the snapshot.
+_META = "overlay.json"
+_MERGED = "merged"
+
+# Never part of an overlay: besides the usual skips, the directories overlays
+# (and batch tasks' overlays) are created in, which often sit inside the base
+_SKIPPED = ALWAYS_SKIPPED | {os.path.basename(OVERLAY_DIR), os.path.basename(BATCH_DIR)}
+
+# Serializes commits in this process, so conflict checks and writes of
+# concurrent batch tasks don't interleave
+_commit_lock = threading.Lock()
+
+
+class OverlayConflict(Exception):
+    # Base files changed since the overlay was created; nothing was committed
+    def __init__(self, paths):
+        super().__init__(f"changed in the base since the overlay was created: {', '.join(paths)}")
+        self.paths = paths
+
+
+class Overlay:
+    def __init__(self, root, base, snapshot=None, isolated=False):
+        self.root = root
+        self.base = base
+        self.isolated = isolated
+        self.merged = os.path.join(root, _MERGED)
+        # {relative path: (st_dev, st_ino, size, mtime_ns)} of the base when the overlay was created
+        self.snapshot = snapshot
+        self.conflicts = []
+
+    @classmethod
+    def create(cls, base, root=None, isolated=False):
+        base = os.path.realpath(base)
+        if root is None:
+            os.makedirs(OVERLAY_DIR, exist_ok=True)
+            name = f"{os.path.basename(base)}-{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+            root = os.path.join(OVERLAY_DIR, name)
+        root = os.path.realpath(root)
+        os.makedirs(root)
+        overlay = cls(root, base, {}, isolated)
+        overlay._link_tree(base, overlay.merged, "")
+        overlay._save()
+        return overlay
+
+    @classmethod
+    def open(cls, root):
+        # Reattach to an overlay created earlier (e.g. by a resumed session)
+        root = os.path.realpath(root)
+        with open(os.path.join(root, _META)) as f:
+            meta = json.load(f)
+        snapshot = meta.get("snapshot")
+        if snapshot is not None:
+            snapshot = {rel: tuple(st) for rel, st in snapshot.items()}
+        return cls(root, meta["base"], snapshot, meta.get("isolated", False))
+
+    def _save(self):
+        tmp = os.path.join(self.root, _META + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"base": self.base, "snapshot": self.snapshot, "isolated": self.isolated}, f)
+        os.replace(tmp, os.path.join(self.root, _META))
+
+    @classmethod
+    def containing(cls, working_directory):
+        # The overlay whose merged view is working_directory, or None
+        merged = os.path.realpath(working_directory)
+        root = os.path.dirname(merged)
+        if os.path.basename(merged) != _MERGED or not os.path.isfile(os.path.join(root, _META)):
+            return None
+        return cls.open(root)
+
+    def _link_tree(self, source, destination, rel_dir):
+        os.makedirs(destination)
+        shutil.copystat(source, destination)
+        with os.scandir(source) as entries:
+            for entry in entries:
+                # The overlay's own root may be inside the base under any name
+                if entry.name in _SKIPPED or entry.path == self.root:
+                    continue
+                target = os.path.join(destination, entry.name)
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    self._link_tree(entry.path, target, rel)
+                    continue
+                # Stat before linking: the link shares this inode, so the snapshot
+                # matches the merged file until something replaces it
+                st = entry.stat(follow_symlinks=False)
+                self.snapshot[rel] = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                elif self.isolated:
+                    shutil.copy2(entry.path, target)
+                else:
+                    try:
+                        os.link(entry.path, target)
+                    except OSError:
+                        # Different filesystem (or no hardlink support): fall back to a copy
+                        shutil.copy2(entry.path, target)
+
+    def _files(self, top):
+        # {relative path: (st_dev, st_ino, size, mtime_ns)} for every file under top
+        files = {}
+        stack = [("", top)]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    if entry.name in _SKIPPED or entry.path == self.root:
+                        continue
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((rel, entry.path))
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                        files[rel] = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        return files
+
+    def changes(self):
+        # (modified, added, deleted) relative paths, compared by inode against the
+        # base snapshot (overlays created before snapshots existed: the current base).
+        # Files that had to be copied (no hardlinks) are compared by size and mtime instead.
+        base = self.snapshot if self.snapshot is not None else self._files(self.base)
+        merged = self._files(self.merged)
+        modified, added = [], []
+        for rel, (dev, ino, size, mtime) in merged.items():
+            original = base.get(rel)
+            if original is None:
+                added.append(rel)
+            elif self.isolated:
+                if (size, mtime) != original[2:]:
+                    modified.append(rel)
+            elif (dev, ino) != original[:2] and (dev == original[0] or (size, mtime) != original[2:]):
+                modified.append(rel)
+        deleted = [rel for rel in base if rel not in merged]
+        return sorted(modified), sorted(added), sorted(deleted)
+
+    def _base_conflicts(self, modified, added, deleted):
+        # Paths this overlay changed whose base file changed too since the snapshot
+        if self.snapshot is None:
+            return []
+        conflicts = []
+        for rel in modified + added + deleted:
+            try:
+                st = os.stat(os.path.join(self.base, rel), follow_symlinks=False)
+                current = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                current = None
+            if current != self.snapshot.get(rel):
+                conflicts.append(rel)
+        return conflicts
+
+    def commit(self):
+        # Apply the overlay's changes to the base tree. Each file is swapped in
+        # atomically; the merged view stays usable (and now matches the base).
+        # Raises OverlayConflict, before writing anything, if the base changed
+        # any of the same paths since the overlay was created.
+        # write_file (and the search index behind it) only loads if there is a commit.
+        from functions.write_file import after_write
+        with _commit_lock:
+            modified, added, deleted = self.changes()
+            conflicts = self._base_conflicts(modified, added, deleted)
+            if conflicts:
+                raise OverlayConflict(conflicts)
+            for rel in modified + added:
+                source = os.path.join(self.merged, rel)
+                target = os.path.join(self.base, rel)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+                os.close(fd)
+                try:
+                    os.unlink(tmp)
+                    try:
+                        os.link(source, tmp)
+                    except OSError:
+                        shutil.copy2(source, tmp)
+                    os.replace(tmp, target)
+                except BaseException:
+                    if os.path.lexists(tmp):
+                        os.unlink(tmp)
+                    raise
+                after_write(self.base, target)
+                if self.snapshot is not None:
+                    st = os.stat(target, follow_symlinks=False)
+                    self.snapshot[rel] = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+            for rel in deleted:
+                target = os.path.join(self.base, rel)
+                os.unlink(target)
+                after_write(self.base, target)
+                if self.snapshot is not None:
+                    self.snapshot.pop(rel, None)
+            if self.snapshot is not None:
+                # The committed base is the new starting point for later changes
+                self._save()
+        return modified, added, deleted
+
+    def discard(self):
+        # Drop the overlay and everything written to it; the base is never touched
+        release_working_directory(self.merged)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def finish(self, mode, succeeded=True):
+        # End-of-session handling shared by the CLI and batch mode: "commit"
+        # applies the changes to the base (only if the session succeeded,
+        # otherwise the overlay is kept for inspection), "discard" drops them,
+        # "keep" leaves the overlay in place. Returns what happened; "conflict"
+        # means the commit was refused (see self.conflicts) and the overlay kept.
+        if mode == "commit" and succeeded:
+            try:
+                self.commit()
+            except OverlayConflict as e:
+                self.conflicts = e.paths
+                return "conflict"
+            self.discard()
+            return "committed"
+        if mode == "discard":
+            self.discard()
+            return "discarded"
+        return "kept"
+
+    def summary(self):
+        modified, added, deleted = self.changes()
+        parts = [f"{len(modified)} modified", f"{len(added)} added", f"{len(deleted)} deleted"]
+        lines = [f"Overlay {self.merged} over {self.base}: " + ", ".join(parts)]
+        lines += [f"  M {rel}" for rel in modified] + [f"  A {rel}" for rel in added] + [f"  D {rel}" for rel in deleted]
+        return "\n".join(lines)
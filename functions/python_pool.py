@@ -0,0 +1,98 @@
+# python
+import os
+import sys
+import json
+import atexit
+import threading
+import subprocess
+from collections import deque
+
+from config import PYTHON_POOL_SIZE, PYTHON_POOL_PREIMPORT
+from functions.output_capture import capture
+
+_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_pool_worker.py")
+
+
+class PythonWorkerPool:
+    # Keeps `size` pre-started interpreters rooted at one working directory. Each
+    # worker runs exactly one script and exits, so no module state leaks between
+    # runs; the pool refills itself as soon as a worker is taken. Idle workers
+    # have only pre-imported PYTHON_POOL_PREIMPORT from outside the working
+    # directory (the tree isn't on sys.path until the job arrives), so edits to
+    # the tree never make them stale.
+    def __init__(self, abs_work, size=PYTHON_POOL_SIZE, preimport=PYTHON_POOL_PREIMPORT):
+        self.abs_work = abs_work
+        self.size = size
+        self.preimport = list(preimport)
+        self._lock = threading.Lock()
+        self._idle = deque()
+
+    def _spawn(self):
+        # Popen returns right after exec, so interpreter startup overlaps other work
+        return subprocess.Popen(
+            [sys.executable, _WORKER] + self.preimport,
+            cwd=self.abs_work,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def acquire(self):
+        with self._lock:
+            worker = None
+            while self._idle and worker is None:
+                candidate = self._idle.popleft()
+                if candidate.poll() is None:
+                    worker = candidate
+            if worker is None:
+                worker = self._spawn()
+            # Top the pool back up for the next run
+            while len(self._idle) < self.size:
+                self._idle.append(self._spawn())
+            return worker
+
+    def run(self, abs_file, args, timeout):
+        # Execute abs_file in a warm worker; returns a CapturedOutput
+        worker = self.acquire()
+        job = json.dumps({"file": abs_file, "args": args}) + "\n"
+        worker.stdin.write(job.encode())
+        worker.stdin.close()
+        return capture(worker, timeout)
+
+    def shutdown(self):
+        # Closing stdin makes idle workers exit on their own
+        while self._idle:
+            worker = self._idle.popleft()
+            try:
+                worker.stdin.close()
+                worker.wait(timeout=1)
+            except Exception:
+                worker.kill()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(abs_work):
+    # One pool per working directory, created on first use
+    with _pools_lock:
+        pool = _pools.get(abs_work)
+        if pool is None:
+            pool = PythonWorkerPool(abs_work)
+            _pools[abs_work] = pool
+        return pool
+
+
+def release_pool(abs_work):
+    # Stop the idle workers of a working directory that won't be used again
+    with _pools_lock:
+        pool = _pools.pop(abs_work, None)
+    if pool is not None:
+        pool.shutdown()
+
+
+@atexit.register
+def _shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
@@ -3,6 +3,11 @@ import os
 import sys
 import subprocess
 from google.genai import types
+from config import PYTHON_POOL_SIZE, RUN_TIMEOUT
+from tracing import get_tracer
+from functions.cache import get_cache
+from functions.python_pool import get_pool
+from functions.output_capture import capture
 
 def run_python_file(working_directory, file_path, args=[]):
     # Resolve absolute paths to avoid path traversal and normalize inputs
@@ -27,31 +32,56 @@ def run_python_file(working_directory, file_path, args=[]):
     try:
         # Ensure args is a sequence of strings
         args = list(map(str, args))
-        # Use the current interpreter for portability
-        command = [sys.executable, abs_file] + args
+        # Time the interpreter itself (startup included) apart from the tool call
+        with get_tracer().span("subprocess", "process", pooled=PYTHON_POOL_SIZE > 0) as span:
+            if PYTHON_POOL_SIZE > 0:
+                # Hand the script to a pre-started interpreter rooted at the working directory
+                captured = get_pool(abs_work).run(abs_file, args, timeout=RUN_TIMEOUT)
+            else:
+                # Use the current interpreter for portability
+                command = [sys.executable, abs_file] + args
 
-        completed_process = subprocess.run(
-            command,
-            cwd=abs_work,           # Set working directory for relative paths/imports
-            timeout=30,             # Prevent long-running processes
-            capture_output=True,    # Capture both stdout and stderr
-            text=True               # Decode output as text (str) instead of bytes
-        )
+                process = subprocess.Popen(
+                    command,
+                    cwd=abs_work,             # Set working directory for relative paths/imports
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,   # Stream both stdout and stderr into bounded buffers
+                    stderr=subprocess.PIPE,
+                )
+                # Prevent long-running processes while keeping whatever they printed
+                captured = capture(process, timeout=RUN_TIMEOUT)
+
+            span.set(
+                returncode=captured.returncode,
+                bytes_out=len(captured.stdout) + len(captured.stderr),
+                dropped=captured.dropped,
+            )
+
+        # The script may have created or resized files behind the cache's back
+        get_cache().invalidate_listings()
 
         # Normalize outputs for consistent formatting
-        stripped_stdout = completed_process.stdout.strip()
-        stripped_stderr = completed_process.stderr.strip()
+        stripped_stdout = captured.stdout.strip()
+        stripped_stderr = captured.stderr.strip()
 
         # If neither stream produced output, report explicitly
         if stripped_stdout == "" and stripped_stderr == "":
+            if captured.timed_out:
+                return f"Error: Process timed out after {RUN_TIMEOUT} seconds with no output."
             return "No output produced."
 
         # Build the formatted output
         output = f"STDOUT: {stripped_stdout}\nSTDERR: {stripped_stderr}"
 
         # Include non-zero exit code information if applicable
-        if completed_process.returncode != 0:
-            output += f"\nProcess exited with code {completed_process.returncode}"
+        if captured.timed_out:
+            output += f"\nProcess timed out after {RUN_TIMEOUT} seconds (partial output shown)"
+        elif captured.returncode != 0:
+            output += f"\nProcess exited with code {captured.returncode}"
+
+        # Tell the model how much of the output it is not seeing
+        if captured.dropped:
+            output += f"\nOutput truncated: {captured.dropped} bytes dropped"
 
         return output
     except Exception as e:
@@ -0,0 +1,329 @@
+# python
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import threading
+import contextvars
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from google.genai import types
+from config import MAX_CHARS, RUN_TIMEOUT, TESTS_MAX_WORKERS
+from tracing import get_tracer
+from functions.cache import get_cache
+from functions.walk import walk, INDEX_DIR
+
+_CACHE_FILE = "tests.json"
+_CACHE_VERSION = 1
+_WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_test_worker.py")
+
+
+def _is_test_name(name):
+    stem = os.path.splitext(name)[0]
+    return stem.startswith("test") or stem.endswith(("_test", "tests"))
+
+
+def _has_tests(tree):
+    # unittest-style (a class with test* methods) or pytest-style (test* functions)
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            return True
+        if isinstance(node, ast.ClassDef) and any(
+            isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith("test")
+            for item in node.body
+        ):
+            return True
+    return False
+
+
+def _analyze(abs_file, name):
+    # (content digest, imports, is_test) of one Python file; imports are
+    # [module, level, [imported names]] as written in the source
+    with open(abs_file, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        tree = ast.parse(data, filename=abs_file)
+    except (SyntaxError, ValueError):
+        # Still a dependency (its change must rerun tests), just with unknown imports
+        return digest, [], False
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, 0, []] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or "", node.level, [alias.name for alias in node.names]])
+    return digest, imports, _is_test_name(name) and _has_tests(tree)
+
+
+def _module_files(rel_dir, dotted, files):
+    # Files that importing `dotted` from rel_dir loads: the module (or package
+    # __init__) and the __init__ of every package on the way
+    found = []
+    parts = [p for p in dotted.split(".") if p]
+    for i in range(1, len(parts) + 1):
+        base = "/".join(([rel_dir] if rel_dir else []) + parts[:i])
+        for candidate in (f"{base}/__init__.py", f"{base}.py"):
+            if candidate in files:
+                found.append(candidate)
+                break
+    return found
+
+
+def _resolve(rel_file, imports, files):
+    # Files in the tree that rel_file's imports refer to. Absolute imports are
+    # looked up next to the file (its directory is sys.path[0] when run as a
+    # script) and at the root of the working directory.
+    rel_dir = os.path.dirname(rel_file)
+    deps = set()
+    for module, level, names in imports:
+        if level:
+            parts = rel_dir.split("/") if rel_dir else []
+            if level - 1 > len(parts):
+                continue
+            roots = ["/".join(parts[:len(parts) - (level - 1)])]
+        else:
+            roots = list(dict.fromkeys([rel_dir, ""]))
+        for root in roots:
+            found = _module_files(root, module, files) if module else []
+            # `from pkg import mod` may import a submodule
+            prefix = f"{module}." if module else ""
+            for name in names:
+                found += _module_files(root, prefix + name, files)[-1:]
+            if found:
+                deps.update(found)
+                break
+    deps.discard(rel_file)
+    return deps
+
+
+class TestSuite:
+    # Test files of one working directory, the import graph between its Python
+    # files, and the last result of every test file keyed on a hash of the file
+    # and everything it imports (transitively). A test file whose key is
+    # unchanged is not run again; its cached results are reported instead.
+    def __init__(self, abs_work):
+        self.abs_work = abs_work
+        self.path = os.path.join(abs_work, INDEX_DIR, _CACHE_FILE)
+        self.lock = threading.Lock()
+        self.files = {}
+        self.results = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == _CACHE_VERSION and data.get("python") == sys.version:
+                self.files = data["files"]
+                self.results = data["results"]
+        except Exception:
+            self.files, self.results = {}, {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": _CACHE_VERSION, "python": sys.version, "files": self.files, "results": self.results}, f)
+        os.replace(tmp, self.path)
+
+    def refresh(self):
+        # Re-analyze Python files whose mtime or size changed; drop deleted ones
+        seen = set()
+        for rel_path, entry, _ in walk(self.abs_work, self.abs_work, recursive=True):
+            if not entry.name.endswith(".py") or not entry.is_file():
+                continue
+            if not os.path.realpath(entry.path).startswith(self.abs_work + os.sep):
+                # A symlink out of the working directory
+                continue
+            seen.add(rel_path)
+            st = entry.stat()
+            known = self.files.get(rel_path)
+            if known is not None and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+                continue
+            try:
+                digest, imports, is_test = _analyze(entry.path, entry.name)
+            except OSError:
+                continue
+            self.files[rel_path] = [st.st_mtime_ns, st.st_size, digest, imports, is_test]
+        for rel_path in set(self.files) - seen:
+            del self.files[rel_path]
+
+    def closure(self, rel_file):
+        # rel_file and every file it imports, directly or not, with their digests
+        graph = {}
+        stack = [rel_file]
+        while stack:
+            current = stack.pop()
+            if current in graph:
+                continue
+            graph[current] = self.files[current][2]
+            stack.extend(_resolve(current, self.files[current][3], self.files))
+        return graph
+
+    def test_files(self, selected=()):
+        # Test files, optionally limited to the given files or directories
+        tests = sorted(rel for rel, entry in self.files.items() if entry[4])
+        if not selected:
+            return tests
+        return [
+            rel for rel in tests
+            if any(rel == s or rel.startswith(s.rstrip("/") + "/") or s in ("", ".") for s in selected)
+        ]
+
+
+def _run_file(abs_work, rel_file):
+    # Run one test file in a fresh interpreter; returns (results, seconds)
+    start = time.perf_counter()
+    with get_tracer().span("test_file", "process", file=rel_file) as span:
+        try:
+            process = subprocess.run(
+                [sys.executable, _WORKER, os.path.join(abs_work, rel_file)],
+                cwd=abs_work, stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=RUN_TIMEOUT,
+            )
+            lines = process.stdout.strip().splitlines()
+            results = json.loads(lines[-1]) if lines else None
+            if not isinstance(results, list):
+                raise ValueError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "no results")
+        except subprocess.TimeoutExpired:
+            results = [{"test": "<file>", "outcome": "error", "message": f"timed out after {RUN_TIMEOUT} seconds", "seconds": RUN_TIMEOUT}]
+        except ValueError as e:
+            results = [{"test": "<file>", "outcome": "error", "message": f"worker failed: {e}", "seconds": 0}]
+        span.set(tests=len(results))
+    return results, time.perf_counter() - start
+
+
+def _counts(results):
+    passed = sum(r["outcome"] == "pass" for r in results)
+    failed = sum(r["outcome"] in ("fail", "error") for r in results)
+    return passed, failed, len(results) - passed - failed
+
+
+_suites = {}
+_suites_lock = threading.Lock()
+
+
+def get_suite(abs_work):
+    with _suites_lock:
+        suite = _suites.get(abs_work)
+        if suite is None:
+            suite = TestSuite(abs_work)
+            _suites[abs_work] = suite
+        return suite
+
+
+def release_suite(abs_work):
+    # Forget a working directory that won't be used again (its results stay on disk)
+    with _suites_lock:
+        _suites.pop(abs_work, None)
+
+
+def run_tests(working_directory, paths=None, rerun=False):
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+    selected = []
+    for path in paths or []:
+        abs_path = os.path.realpath(os.path.join(abs_work, path))
+        if not (abs_path == abs_work or abs_path.startswith(abs_work + os.sep)):
+            return f'Error: Cannot run tests in "{path}" as it is outside the permitted working directory'
+        if not os.path.exists(abs_path):
+            return f'Error: "{path}" does not exist'
+        selected.append(os.path.relpath(abs_path, abs_work).replace(os.sep, "/"))
+
+    try:
+        start = time.perf_counter()
+        suite = get_suite(abs_work)
+        with suite.lock:
+            suite.refresh()
+            test_files = suite.test_files(selected)
+            if not test_files:
+                return "No tests found (looked for test*.py, *_test.py and *tests.py files with test functions or classes)."
+            plan = {}
+            for rel in test_files:
+                deps = suite.closure(rel)
+                key = hashlib.sha256(json.dumps(sorted(deps.items())).encode()).hexdigest()
+                cached = suite.results.get(rel)
+                if rerun or cached is None or cached["key"] != key:
+                    # Name the changed files that made this test file stale
+                    before = cached["deps"] if cached else {}
+                    changed = sorted(dep for dep, digest in deps.items() if before.get(dep) != digest)
+                    plan[rel] = (key, deps, changed if cached else None)
+
+        # Affected test files run concurrently, each in its own interpreter
+        ran = {}
+        if plan:
+            with ThreadPoolExecutor(max_workers=max(1, min(TESTS_MAX_WORKERS, len(plan)))) as pool:
+                futures = {
+                    rel: pool.submit(contextvars.copy_context().run, _run_file, abs_work, rel) for rel in plan
+                }
+                ran = {rel: future.result() for rel, future in futures.items()}
+            # Tests may create files behind the cache's back
+            get_cache().invalidate_listings()
+
+        with suite.lock:
+            for rel, (results, seconds) in ran.items():
+                key, deps, _ = plan[rel]
+                suite.results[rel] = {"key": key, "deps": deps, "tests": results, "seconds": round(seconds, 3)}
+            suite.save()
+            report = {rel: suite.results[rel] for rel in test_files}
+    except Exception as e:
+        return f"Error: running tests: {e}"
+
+    # Compact report: totals, then every failure, then one row per test file
+    all_results = [r for entry in report.values() for r in entry["tests"]]
+    passed, failed, skipped = _counts(all_results)
+    cached = len(test_files) - len(ran)
+    header = (
+        f"Ran {len(ran)} of {len(test_files)} test files"
+        + (f" ({cached} unchanged since their last run, results cached)" if cached else "")
+        + f" in {time.perf_counter() - start:.2f}s: {passed} passed, {failed} failed"
+        + (f", {skipped} skipped" if skipped else "")
+    )
+    lines = [header]
+    for rel, entry in report.items():
+        for r in entry["tests"]:
+            if r["outcome"] in ("fail", "error"):
+                lines.append(f"{r['outcome'].upper():<5} {rel}::{r['test']}  {r['message']}")
+    width = max(len(rel) for rel in report)
+    lines.append(f"{'file':<{width}}  {'tests':>5}  {'pass':>4}  {'fail':>4}  status")
+    for rel, entry in report.items():
+        p, f, _ = _counts(entry["tests"])
+        if rel not in ran:
+            status = "cached"
+        elif plan[rel][2] is None:
+            status = f"ran {entry['seconds']:.2f}s"
+        else:
+            changed = plan[rel][2]
+            reason = ", ".join(changed[:3]) + (f" +{len(changed) - 3}" if len(changed) > 3 else "")
+            status = f"ran {entry['seconds']:.2f}s" + (f" ({reason} changed)" if changed else "")
+        lines.append(f"{rel:<{width}}  {len(entry['tests']):>5}  {p:>4}  {f:>4}  {status}")
+    output = "\n".join(lines)
+    if len(output) > MAX_CHARS:
+        output = output[:MAX_CHARS] + f'\n[...report truncated at {MAX_CHARS} characters]'
+    return output
+
+
+# Function declaration schema for tool usage by the LLM
+schema_run_tests = types.FunctionDeclaration(
+    name="run_tests",
+    description=(
+        "Discovers unittest and pytest-style tests in the working directory and runs the test files affected by "
+        "changes since their last run (a test file is affected when it or anything it imports changed), in "
+        "parallel. Returns a compact pass/fail table; unaffected files report their cached results."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "paths": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Optional test files or directories to limit the run to, relative to the working directory. Defaults to all tests.",
+            ),
+            "rerun": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Run the selected test files even if their results are cached. Defaults to false.",
+            ),
+        },
+    ),
+)
@@ -0,0 +1,300 @@
+# python
+import os
+import re
+import pickle
+import threading
+from google.genai import types
+from config import SEARCH_MAX_RESULTS, SEARCH_MAX_FILE_BYTES
+from functions.walk import walk, INDEX_DIR
+
+_INDEX_FILE = "trigrams.pickle"
+_INDEX_VERSION = 1
+_SNIPPET_CHARS = 200
+# Regex escapes of one character by its code point, and their digit counts
+_HEX_ESCAPES = {"x": 2, "u": 4, "U": 8}
+_HEX = re.compile(r"[0-9A-Fa-f]+")
+
+
+def _trigrams(data):
+    # Lowercased byte trigrams of a file (or query); case is checked when matching lines
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _required_literals(pattern):
+    # Literal runs every match of a regex must contain. Only text outside groups
+    # and character classes counts, and any alternation disables the filter.
+    if "|" in pattern:
+        return []
+    literals = []
+    run = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            width = _HEX_ESCAPES.get(nxt)
+            if width and _HEX.fullmatch(pattern[i:i + width]):
+                # \xHH, \uXXXX, \UXXXXXXXX stand for one literal character
+                if depth == 0:
+                    run.append(chr(int(pattern[i:i + width], 16)))
+                i += width
+            elif nxt.isalnum():
+                # \d, \w, \b, backreferences, octal and \N{...} escapes are not
+                # literal text here; skip the escape's digits or name with it
+                literals.append("".join(run))
+                run = []
+                if nxt.isdigit():
+                    while i < len(pattern) and pattern[i].isdigit():
+                        i += 1
+                elif nxt == "N" and pattern[i:i + 1] == "{":
+                    close = pattern.find("}", i)
+                    i = close + 1 if close != -1 else len(pattern)
+            elif depth == 0:
+                run.append(nxt)
+            continue
+        if ch == "[":
+            # Skip a character class entirely
+            literals.append("".join(run))
+            run = []
+            i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        if ch in "*?{":
+            # The previous character is optional, so it can't be required
+            if run:
+                run.pop()
+            literals.append("".join(run))
+            run = []
+            if ch == "{":
+                # Skip the repetition count, e.g. {2,3}
+                close = pattern.find("}", i)
+                i = close if close != -1 else len(pattern)
+        elif ch in "().^$+":
+            depth += ch == "("
+            depth -= ch == ")"
+            literals.append("".join(run))
+            run = []
+        elif depth == 0:
+            run.append(ch)
+        i += 1
+    literals.append("".join(run))
+    return [lit for lit in literals if len(lit) >= 3]
+
+
+def _inside(abs_work, rel_path):
+    # Whether a file really lives in the working directory (a symlink may point out of it)
+    return os.path.realpath(os.path.join(abs_work, rel_path)).startswith(abs_work + os.sep)
+
+
+class TrigramIndex:
+    # On-disk trigram index for one working directory. Each file maps to its
+    # (mtime_ns, size, trigrams); postings map a trigram to the files containing
+    # it. The index is refreshed incrementally by comparing mtimes and sizes.
+    def __init__(self, abs_work):
+        self.abs_work = abs_work
+        self.path = os.path.join(abs_work, INDEX_DIR, _INDEX_FILE)
+        self.lock = threading.Lock()
+        self.files = {}
+        self.postings = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == _INDEX_VERSION:
+                self.files = data["files"]
+                self.postings = data["postings"]
+        except Exception:
+            # Missing or unreadable index: rebuild from scratch
+            self.files, self.postings = {}, {}
+
+    def save(self):
+        # Write atomically so a crash never leaves a half-written index behind
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": _INDEX_VERSION, "files": self.files, "postings": self.postings}, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def _remove(self, rel_path):
+        entry = self.files.pop(rel_path, None)
+        if entry is None:
+            return
+        for gram in entry[2]:
+            holders = self.postings.get(gram)
+            if holders is not None:
+                holders.discard(rel_path)
+                if not holders:
+                    del self.postings[gram]
+        self.dirty = True
+
+    def update(self, rel_path, stat_result):
+        # (Re)index one file if its mtime or size changed
+        entry = self.files.get(rel_path)
+        if entry is not None and entry[0] == stat_result.st_mtime_ns and entry[1] == stat_result.st_size:
+            return
+        self._remove(rel_path)
+        grams = frozenset()
+        if stat_result.st_size <= SEARCH_MAX_FILE_BYTES and _inside(self.abs_work, rel_path):
+            try:
+                with open(os.path.join(self.abs_work, rel_path), "rb") as f:
+                    data = f.read()
+                # Binary files are tracked (so they aren't re-read) but not searchable
+                if b"\0" not in data:
+                    grams = frozenset(_trigrams(data))
+            except OSError:
+                pass
+        self.files[rel_path] = (stat_result.st_mtime_ns, stat_result.st_size, grams)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(rel_path)
+        self.dirty = True
+
+    def refresh(self):
+        # Bring the index up to date with the tree: reindex changed files, drop deleted ones
+        seen = set()
+        for rel_path, entry, _ in walk(self.abs_work, self.abs_work, recursive=True):
+            if entry.is_file():
+                seen.add(rel_path)
+                self.update(rel_path, entry.stat())
+        for rel_path in set(self.files) - seen:
+            self._remove(rel_path)
+
+    def candidates(self, literals):
+        # Files containing every trigram of every required literal
+        result = None
+        for literal in literals:
+            for gram in _trigrams(literal.encode()):
+                holders = self.postings.get(gram, set())
+                result = set(holders) if result is None else result & holders
+                if not result:
+                    return []
+        if result is None:
+            return sorted(rel for rel, entry in self.files.items() if entry[2])
+        return sorted(result)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(abs_work):
+    # One index object per working directory, loaded from disk on first use
+    with _indexes_lock:
+        index = _indexes.get(abs_work)
+        if index is None:
+            index = TrigramIndex(abs_work)
+            _indexes[abs_work] = index
+        return index
+
+
+def release_index(abs_work):
+    # Save and forget the index of a working directory that won't be used again
+    with _indexes_lock:
+        index = _indexes.pop(abs_work, None)
+    if index is not None:
+        with index.lock:
+            index.save()
+
+
+def note_write(abs_work, abs_file):
+    # Called by write tools so the index never serves a stale file
+    index = _indexes.get(abs_work)
+    if index is None or not abs_file.startswith(abs_work + os.sep):
+        return
+    rel_path = os.path.relpath(abs_file, abs_work).replace(os.sep, "/")
+    with index.lock:
+        try:
+            index.update(rel_path, os.stat(abs_file))
+        except OSError:
+            index._remove(rel_path)
+
+
+def search_code(working_directory, query, regex=False, case_sensitive=True, max_results=None):
+    # Resolve the sandbox root
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+    if not os.path.isdir(abs_work):
+        return f'Error: "{working_directory}" is not a directory'
+    if not query:
+        return "Error: query must not be empty"
+
+    try:
+        # Compile the query once; literal searches are escaped regexes
+        flags = 0 if case_sensitive else re.IGNORECASE
+        try:
+            matcher = re.compile(query if regex else re.escape(query), flags)
+        except re.error as e:
+            return f"Error: invalid regex: {e}"
+        literals = _required_literals(query) if regex else [query]
+        limit = int(max_results) if max_results else SEARCH_MAX_RESULTS
+        limit = min(limit, SEARCH_MAX_RESULTS)
+
+        index = get_index(abs_work)
+        with index.lock:
+            index.refresh()
+            index.save()
+            candidates = index.candidates(literals)
+
+        # Confirm candidates line by line and collect file:line snippets
+        results = []
+        total = 0
+        for rel_path in candidates:
+            if not _inside(abs_work, rel_path):
+                continue
+            try:
+                with open(os.path.join(abs_work, rel_path), "r", errors="replace") as f:
+                    for line_number, line in enumerate(f, 1):
+                        if matcher.search(line):
+                            total += 1
+                            if len(results) < limit:
+                                snippet = line.strip()[:_SNIPPET_CHARS]
+                                results.append(f"{rel_path}:{line_number}: {snippet}")
+            except OSError:
+                continue
+
+        if not results:
+            return f'No matches for "{query}" ({len(candidates)} candidate files checked)'
+        if total > len(results):
+            results.append(f"[...{total - len(results)} more matches not shown; narrow the query]")
+        return "\n".join(results)
+    except Exception as e:
+        return f"Error: {e}"
+
+# Function declaration schema for tool usage by the LLM
+schema_search_code = types.FunctionDeclaration(
+    name="search_code",
+    description="Searches all text files in the working directory for a literal string or regular expression and returns matching lines as file:line: snippet.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "query": types.Schema(
+                type=types.Type.STRING,
+                description="The text (or regular expression, if regex is true) to search for.",
+            ),
+            "regex": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Treat the query as a Python regular expression. Defaults to a literal search.",
+            ),
+            "case_sensitive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Match case exactly. Defaults to true.",
+            ),
+            "max_results": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"Maximum number of matching lines to return (at most {SEARCH_MAX_RESULTS}).",
+            ),
+        },
+        required=["query"],
+    ),
+)
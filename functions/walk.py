@@ -0,0 +1,132 @@
+# python
+import os
+from fnmatch import fnmatchcase
+
+# Where tools keep their on-disk indexes inside a working directory
+INDEX_DIR = ".agent_index"
+
+# Directories that are never worth showing to the model
+ALWAYS_SKIPPED = {"__pycache__", ".git", INDEX_DIR}
+
+
+def _parse_gitignore(path):
+    # Turn a .gitignore file into (pattern, negated, dir_only, anchored) rules
+    rules = []
+    try:
+        with open(path, "r", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if line:
+            rules.append((line, negated, dir_only, anchored))
+    return rules
+
+
+class IgnoreRules:
+    # Stack of .gitignore rule sets, each tied to the directory it was found in
+    def __init__(self, levels=()):
+        self.levels = list(levels)
+
+    def descend(self, abs_dir, rel_dir):
+        # Rules for a child directory: the parent's plus its own .gitignore, if any
+        rules = _parse_gitignore(os.path.join(abs_dir, ".gitignore"))
+        if not rules:
+            return self
+        return IgnoreRules(self.levels + [(rel_dir, rules)])
+
+    def ignored(self, rel_path, is_dir):
+        # Later (deeper) rules win, and within a file the last matching rule wins
+        result = False
+        for base, rules in self.levels:
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                local = rel_path[len(base) + 1:]
+            else:
+                local = rel_path
+            name = local.rsplit("/", 1)[-1]
+            for pattern, negated, dir_only, anchored in rules:
+                if dir_only and not is_dir:
+                    continue
+                if fnmatchcase(local if anchored else name, pattern):
+                    result = not negated
+        return result
+
+
+def rules_for(abs_work, abs_target):
+    # Collect the .gitignore files from the working directory down to the target
+    rules = IgnoreRules().descend(abs_work, "")
+    rel = os.path.relpath(abs_target, abs_work)
+    if rel == ".":
+        return rules
+    current = abs_work
+    parts = []
+    for part in rel.split(os.sep):
+        current = os.path.join(current, part)
+        parts.append(part)
+        rules = rules.descend(current, "/".join(parts))
+    return rules
+
+
+def _matches(patterns, rel_path, name):
+    return any(fnmatchcase(rel_path, p) or fnmatchcase(name, p) for p in patterns)
+
+
+def walk(abs_work, abs_target, recursive=False, max_depth=None, include=(), exclude=(), after=None):
+    # Yield (rel_path, DirEntry, depth) below abs_target in sorted depth-first
+    # order, reusing each DirEntry's cached type information. rel_path is relative
+    # to abs_target; `after` resumes strictly after a previously returned rel_path.
+    # Symlinks are yielded as entries but never followed, so the walk can't leave
+    # the working directory or loop.
+    limit = max_depth if recursive else 1
+    after_key = tuple(after.split("/")) if after else None
+    base_rel = os.path.relpath(abs_target, abs_work).replace(os.sep, "/")
+    base_rel = "" if base_rel == "." else base_rel
+    parent_rules = rules_for(abs_work, os.path.dirname(abs_target)) if base_rel else IgnoreRules()
+
+    def visit(abs_dir, rel_dir, depth, rules):
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            if depth == 1:
+                raise
+            # An unreadable subdirectory shouldn't abort the rest of the walk
+            return
+        # Pick up this directory's own .gitignore without an extra open() attempt
+        if any(e.name == ".gitignore" for e in entries):
+            rules = rules.descend(abs_dir, f"{base_rel}/{rel_dir}".strip("/") if base_rel else rel_dir)
+        for entry in entries:
+            if entry.name in ALWAYS_SKIPPED:
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir()
+                descend = is_dir and not entry.is_symlink()
+            except OSError:
+                is_dir = descend = False
+            work_rel = f"{base_rel}/{rel_path}" if base_rel else rel_path
+            if rules.ignored(work_rel, is_dir) or _matches(exclude, rel_path, entry.name):
+                continue
+            key = tuple(rel_path.split("/"))
+            # Skip whole subtrees that sort entirely before the cursor
+            before_cursor = after_key is not None and key <= after_key
+            inside_cursor = after_key is not None and after_key[:len(key)] == key
+            if not before_cursor and (not include or _matches(include, rel_path, entry.name)):
+                yield rel_path, entry, depth
+            if descend and (limit is None or depth < limit) and (not before_cursor or inside_cursor):
+                yield from visit(entry.path, rel_path, depth + 1, rules)
+
+    yield from visit(abs_target, "", 1, parent_rules)
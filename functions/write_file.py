@@ -1,6 +1,49 @@
 # python
 import os
+import tempfile
 from google.genai import types
+from functions.cache import get_cache, file_key, content_hash
+from functions.search_code import note_write
+
+
+def stage_write(abs_file, content):
+    # Write content to a temp file next to abs_file and return its path; the
+    # caller swaps it in with os.replace (or unlinks it to back out)
+    directory = os.path.dirname(abs_file)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(abs_file)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        # Keep the permissions of the file being replaced (mkstemp creates 0600)
+        mode = os.stat(abs_file).st_mode & 0o7777 if os.path.exists(abs_file) else 0o644
+        os.chmod(tmp_path, mode)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path
+
+
+def atomic_write(abs_file, content):
+    # Swap in the new content with os.replace so readers (and crashes) only
+    # ever see the old or the new file
+    tmp_path = stage_write(abs_file, content)
+    try:
+        os.replace(tmp_path, abs_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def after_write(abs_work, abs_file, content=None):
+    # Drop cached reads and listings that this write made stale
+    cache = get_cache()
+    cache.invalidate(abs_file)
+    if content is not None:
+        # The model knows what it just wrote; later edits are checked against it
+        cache.note_seen(abs_file, file_key(os.stat(abs_file)), content_hash(content))
+    # Keep the code-search index in step with the new content
+    note_write(abs_work, abs_file)
+
 
 def write_file(working_directory, file_path, content):
     # Resolve the working directory to an absolute, normalized path
@@ -16,8 +59,8 @@ def write_file(working_directory, file_path, content):
         # Ensure parent directories exist (noop if they already do)
         os.makedirs(os.path.dirname(abs_file), exist_ok=True)
         # Overwrite or create the file and write the provided content
-        with open(abs_file, "w") as f:
-            f.write(content)
+        atomic_write(abs_file, content)
+        after_write(abs_work, abs_file, content)
     except Exception as e:
         # Surface any filesystem error in the required format
         return f'Error: {e}'
@@ -0,0 +1,137 @@
+# python
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from google.genai import types
+from config import BATCH_MAX_FILES, MAX_PARALLEL_TOOLS
+from functions.write_file import stage_write, after_write
+
+
+def _rollback(staged, backups, created_dirs):
+    # Undo a partially applied batch: restore originals, drop new files and temp files
+    for abs_file, backup in reversed(backups):
+        if backup is None:
+            if os.path.exists(abs_file):
+                os.unlink(abs_file)
+        else:
+            os.replace(backup, abs_file)
+    for tmp_path in staged.values():
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    for directory in reversed(created_dirs):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+def write_files(working_directory, files):
+    # Resolve the working directory to an absolute, normalized path
+    abs_work = os.path.realpath(working_directory).rstrip(os.sep)
+
+    if not files:
+        return "Error: files must list at least one write"
+    if len(files) > BATCH_MAX_FILES:
+        return f"Error: at most {BATCH_MAX_FILES} files can be written in one call"
+
+    # Validate every target before touching the disk: one bad path rejects the batch
+    targets = {}
+    for entry in files:
+        entry = dict(entry)
+        file_path = entry.get("file_path")
+        content = entry.get("content")
+        if not file_path or content is None:
+            return "Error: each write needs file_path and content"
+        abs_file = os.path.realpath(os.path.join(abs_work, file_path))
+        if not (abs_file == abs_work or abs_file.startswith(abs_work + os.sep)):
+            return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
+        if abs_file in targets:
+            return f'Error: "{file_path}" appears more than once in the batch'
+        targets[abs_file] = (file_path, content)
+
+    staged = {}
+    backups = []
+    created_dirs = []
+    try:
+        # Create missing parent directories, remembering them for rollback
+        for abs_file in targets:
+            missing = []
+            directory = os.path.dirname(abs_file)
+            while not os.path.isdir(directory):
+                missing.append(directory)
+                directory = os.path.dirname(directory)
+            for directory in reversed(missing):
+                os.mkdir(directory)
+                created_dirs.append(directory)
+
+        # Stage all contents to temp files concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_PARALLEL_TOOLS, len(targets)))) as pool:
+            futures = {
+                abs_file: pool.submit(contextvars.copy_context().run, stage_write, abs_file, content)
+                for abs_file, (_, content) in targets.items()
+            }
+            # Record every temp file that was created before surfacing any failure
+            errors = []
+            for abs_file, future in futures.items():
+                try:
+                    staged[abs_file] = future.result()
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+
+        # Commit: move originals aside, then swap every staged file into place
+        for abs_file, tmp_path in staged.items():
+            backup = None
+            if os.path.exists(abs_file):
+                backup = tmp_path + ".orig"
+                os.link(abs_file, backup)
+            backups.append((abs_file, backup))
+            os.replace(tmp_path, abs_file)
+            staged[abs_file] = None
+    except Exception as e:
+        _rollback(staged, backups, created_dirs)
+        return f"Error: batch write failed and was rolled back: {e}"
+
+    # The batch is in place; clean up backups and refresh caches/indexes
+    results = {}
+    for abs_file, backup in backups:
+        if backup is not None:
+            os.unlink(backup)
+        file_path, content = targets[abs_file]
+        after_write(abs_work, abs_file, content)
+        results[file_path] = f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+    return results
+
+# Function declaration schema for tool usage by the LLM
+schema_write_files = types.FunctionDeclaration(
+    name="write_files",
+    description=(
+        "Writes several files within the working directory in one all-or-nothing call: "
+        "if any write fails, none of the files are changed."
+    ),
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "files": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "file_path": types.Schema(
+                            type=types.Type.STRING,
+                            description="The filepath to write to, relative to the working directory.",
+                        ),
+                        "content": types.Schema(
+                            type=types.Type.STRING,
+                            description="Content to write to the file.",
+                        ),
+                    },
+                    required=["file_path", "content"],
+                ),
+                description=f"The files to write (at most {BATCH_MAX_FILES}).",
+            ),
+        },
+        required=["files"],
+    ),
+)
@@ -0,0 +1,208 @@
+# python
+from google.genai import types
+
+from config import HISTORY_TOKEN_BUDGET, HISTORY_KEEP_RECENT
+from functions.cache import UNCHANGED_MARKER
+
+
+def estimate_tokens(content):
+    # Cheap heuristic (~4 characters per token) over the serialized message
+    return len(content.model_dump_json(exclude_none=True)) // 4
+
+
+def _call_key(name, args):
+    # Identify which earlier tool outputs a new call makes obsolete
+    args = args or {}
+    if name == "get_file_content":
+        # Different windows of the same file don't replace each other
+        window = tuple(args.get(k) for k in ("offset", "length", "start_line", "end_line"))
+        if any(v is not None for v in window):
+            return ("window", args.get("file_path"), window)
+        return ("file", args.get("file_path"))
+    if name == "get_file_contents":
+        return ("files", tuple(sorted(args.get("file_paths") or [])))
+    if name in ("write_file", "edit_file"):
+        return ("file", args.get("file_path"))
+    if name == "get_files_info":
+        options = tuple(str(args.get(k)) for k in ("recursive", "max_depth", "include", "exclude", "cursor"))
+        return ("dir", args.get("directory", "."), options)
+    if name == "get_symbols":
+        return ("symbols", args.get("path", "."), args.get("symbol"))
+    if name == "run_python_file":
+        return ("run", args.get("file_path"), tuple(map(str, args.get("args") or [])))
+    if name == "run_tests":
+        return ("tests", tuple(sorted(args.get("paths") or [])))
+    return None
+
+
+def _is_reference(result):
+    # True when a result (or any file in a batch result) only points back at an earlier one
+    if isinstance(result, dict):
+        return any(_is_reference(value) for value in result.values())
+    return str(result).startswith(UNCHANGED_MARKER)
+
+
+class _ToolRecord:
+    # Where one tool call and its output live in the message list
+    def __init__(self, turn, name, args, call_msg, call_part, result_msg, result_part):
+        self.turn = turn
+        self.name = name
+        self.args = dict(args or {})
+        self.call_msg = call_msg
+        self.call_part = call_part
+        self.result_msg = result_msg
+        self.result_part = result_part
+        self.compacted = False
+        # Set when the result only points back at an earlier, still-needed result
+        self.reference = False
+
+
+class History:
+    # Conversation history that keeps a running token estimate per message and,
+    # once the budget is exceeded, replaces stale tool outputs with short stubs.
+    # The newest HISTORY_KEEP_RECENT turns of tool output are never touched.
+    def __init__(self, prompt=None, token_budget=HISTORY_TOKEN_BUDGET, keep_recent=HISTORY_KEEP_RECENT):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.messages = []
+        self.tokens = []
+        self.records = []
+        self.turn = 0
+        self._pending_calls = []
+        if prompt is not None:
+            self.add_user(prompt)
+
+    @classmethod
+    def restore(cls, messages, **kwargs):
+        # Rebuild a history (and its tool records) from saved messages
+        history = cls(**kwargs)
+        for content in messages:
+            if content.role == "model":
+                history.add_model(content)
+            elif history._pending_calls and any(p.function_response for p in content.parts or []):
+                history.add_tool_results(content.parts)
+            else:
+                history._append(content)
+        return history
+
+    def _append(self, content):
+        self.messages.append(content)
+        self.tokens.append(estimate_tokens(content))
+
+    def _replace(self, index, content):
+        self.messages[index] = content
+        self.tokens[index] = estimate_tokens(content)
+
+    def total_tokens(self):
+        return sum(self.tokens)
+
+    def add_user(self, text):
+        self._append(types.Content(role="user", parts=[types.Part(text=text)]))
+
+    def add_model(self, content):
+        # Record a model turn and remember where its function calls are
+        self.turn += 1
+        self._append(content)
+        self._pending_calls = [
+            (i, part.function_call)
+            for i, part in enumerate(content.parts or [])
+            if part.function_call
+        ]
+
+    def add_tool_results(self, parts):
+        # Append the turn's function responses and link each one to its call
+        self._append(types.Content(role="user", parts=parts))
+        call_msg = len(self.messages) - 2
+        result_msg = len(self.messages) - 1
+        for result_part, (call_part, fc) in enumerate(self._pending_calls):
+            record = _ToolRecord(self.turn, fc.name, fc.args, call_msg, call_part, result_msg, result_part)
+            response = parts[result_part].function_response.response or {}
+            record.reference = _is_reference(response.get("result"))
+            self.records.append(record)
+        self._pending_calls = []
+
+    def _stale_records(self):
+        # A record is stale when a later call targets the same file, directory or
+        # script invocation; only records outside the recent window are eligible.
+        # "Unchanged since turn N" results keep the result they point at alive.
+        latest = {}
+        stale = []
+        for record in reversed(self.records):
+            key = _call_key(record.name, record.args)
+            if key is None:
+                continue
+            if record.reference:
+                if key in latest:
+                    stale.append((record, latest[key]))
+                continue
+            if key in latest:
+                stale.append((record, latest[key]))
+            else:
+                latest[key] = record
+        oldest_first = sorted(stale, key=lambda pair: pair[0].turn)
+        cutoff = self.turn - self.keep_recent
+        return [(r, newer) for r, newer in oldest_first if r.turn <= cutoff and not r.compacted]
+
+    def _old_runs(self):
+        # Run outputs outside the recent window that were not superseded
+        cutoff = self.turn - self.keep_recent
+        return [
+            r for r in self.records
+            if r.name == "run_python_file" and r.turn <= cutoff and not r.compacted
+        ]
+
+    def _stub_result(self, record, text):
+        # Swap one function_response payload for a short stub
+        content = self.messages[record.result_msg]
+        parts = list(content.parts)
+        old = parts[record.result_part].function_response
+        parts[record.result_part] = types.Part(
+            function_response=types.FunctionResponse(name=old.name, response={"result": text})
+        )
+        self._replace(record.result_msg, types.Content(role=content.role, parts=parts))
+
+    def _stub_write_args(self, record, text):
+        # Superseded write_file calls no longer need their full content argument
+        content = self.messages[record.call_msg]
+        parts = list(content.parts)
+        old = parts[record.call_part].function_call
+        args = dict(old.args or {})
+        args["content"] = text
+        parts[record.call_part] = types.Part(
+            function_call=types.FunctionCall(id=old.id, name=old.name, args=args)
+        )
+        self._replace(record.call_msg, types.Content(role=content.role, parts=parts))
+
+    def _compact_record(self, record, text):
+        if record.name == "write_file":
+            self._stub_write_args(record, text)
+        self._stub_result(record, text)
+        record.compacted = True
+
+    def compact(self):
+        # Shrink the history until it fits the budget; returns tokens saved
+        before = self.total_tokens()
+        if before <= self.token_budget:
+            return 0
+
+        for record, newer in self._stale_records():
+            target = record.args.get("file_path") or record.args.get("directory", ".")
+            self._compact_record(
+                record,
+                f"[compacted: {record.name} output for \"{target}\" from turn {record.turn} "
+                f"was superseded by turn {newer.turn}]",
+            )
+            if self.total_tokens() <= self.token_budget:
+                return before - self.total_tokens()
+
+        for record in self._old_runs():
+            # Summarize old script runs down to their first and last lines
+            response = self.messages[record.result_msg].parts[record.result_part].function_response.response
+            lines = str(response.get("result", "")).splitlines()
+            if len(lines) > 4:
+                summary = "\n".join(lines[:2] + [f"[... {len(lines) - 4} lines compacted ...]"] + lines[-2:])
+                self._compact_record(record, summary)
+            if self.total_tokens() <= self.token_budget:
+                break
+
+        return before - self.total_tokens()
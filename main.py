@@ -3,28 +3,14 @@ import os
 import sys
 import argparse
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-
-from config import MAX_ITERS
-from prompts import system_prompt
-from call_functions import available_functions
-from functions.call_function import call_function
+# Only cheap imports up here: the SDK, the agent and the tools are imported in
+# main() once the arguments (and the API key) have been checked, so --help and
+# configuration errors exit without loading them
+from config import (
+    MAX_PARALLEL_TOOLS, RATE_LIMIT_RPM, RATE_LIMIT_TPM, BATCH_CONCURRENCY, WORKING_DIRECTORY, SPECULATIVE_ATTEMPTS,
+)
 
 def main():
-    # Load environment variables from .env file (if it exists)
-    load_dotenv()
-    api_key = os.environ.get("GEMINI_API_KEY")
-    
-    # Exit immediately if the API key isn't configured
-    if not api_key:
-        print("Error: GEMINI_API_KEY not set.")
-        sys.exit(1)
-
-    # Initialize the Gemini API client
-    client = genai.Client(api_key=api_key)
-
     # Set up CLI argument parsing
     parser = argparse.ArgumentParser(
         description="LLM-powered CLI that can read, update, and run Python code via Gemini tools."
@@ -32,7 +18,8 @@ def main():
     parser.add_argument(
         'prompt',
         type=str,
-        help='Free-form prompt for the model'
+        nargs='?',
+        help='Free-form prompt for the model (optional with --resume/--fork, where it is sent as a follow-up)'
     )
     parser.add_argument(
         '--verbose',
@@ -40,128 +27,201 @@ def main():
         action='store_true',
         help='Enable detailed output'
     )
+    parser.add_argument(
+        '--max-parallel-tools',
+        type=int,
+        default=MAX_PARALLEL_TOOLS,
+        help='Maximum number of read-only tool calls to run concurrently (1 disables concurrency)'
+    )
+    session = parser.add_mutually_exclusive_group()
+    session.add_argument(
+        '--resume',
+        metavar='SESSION',
+        help='Continue a checkpointed session from its last turn'
+    )
+    session.add_argument(
+        '--fork',
+        metavar='SESSION@TURN',
+        help='Start a new session from the first TURN model turns of a checkpointed one'
+    )
+    backend_mode = parser.add_mutually_exclusive_group()
+    backend_mode.add_argument(
+        '--record',
+        metavar='DIR',
+        help='Save every model request/response pair to DIR for later --replay'
+    )
+    backend_mode.add_argument(
+        '--replay',
+        metavar='DIR',
+        help='Answer model requests from recordings in DIR instead of calling Gemini (no network)'
+    )
+    parser.add_argument(
+        '--rpm',
+        type=int,
+        default=RATE_LIMIT_RPM,
+        help='Model requests per minute to stay under (0 disables the limit); throttled requests are retried'
+    )
+    parser.add_argument(
+        '--tpm',
+        type=int,
+        default=RATE_LIMIT_TPM,
+        help='Model tokens per minute to stay under (0 disables the limit)'
+    )
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help='Record per-iteration, model and tool spans to FILE (Chrome trace JSON, or span lines if FILE ends in .jsonl) and print a summary'
+    )
+    parser.add_argument(
+        '--batch',
+        metavar='TASKS',
+        help='Run every task in a JSONL file ({"prompt": ..., "working_directory": ...} per line) concurrently'
+    )
+    parser.add_argument(
+        '--output',
+        metavar='FILE',
+        help='With --batch, where to append result lines (default: TASKS with .results.jsonl)'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help='With --batch, how many sessions run at once'
+    )
+    parser.add_argument(
+        '--overlay',
+        choices=('commit', 'discard', 'keep'),
+        help='Work in an isolated overlay (a private copy) of the working directory and, at the end, commit its '
+             'changes (only if the session succeeds), discard them or keep the overlay for later'
+    )
+    parser.add_argument(
+        '--speculate',
+        metavar='K',
+        type=int,
+        default=SPECULATIVE_ATTEMPTS,
+        help='Once a run_python_file call fails, try K fixes concurrently in isolated copies of the working '
+             'directory and keep the first one that makes the failing command pass (0 or 1 disables)'
+    )
     args = parser.parse_args()
-
-    # Start the conversation history with the user's input
-    messages = [
-        types.Content(role="user", parts=[types.Part(text=args.prompt)]),
-    ]
-
-    #  Run the agent loop: let the model call tools and respond until it finishes or hits the iteration limit
-    for _ in range(MAX_ITERS):
-        try:
-            # Send the conversation history to Gemini and get the next response
-            response = client.models.generate_content(
-                model='gemini-2.0-flash-001',
-                contents=messages,
-                config=types.GenerateContentConfig(
-                    tools=[available_functions],           # provide the list of callable tools
-                    system_instruction=system_prompt,      # guide the model's behavior
-                ),
-            )
-
-            # Check that we received a valid response
-            if not response:
-                raise RuntimeError("Gemini API returned empty response")
-
-            # Add the model's response to the conversation history
-            if getattr(response, "candidates", None):
-                for cand in response.candidates:
-                    if cand.content is not None:
-                        messages.append(cand.content)
-            
-            else:
-                # Missing candidates might indicate rate limiting or API problems
-                raise RuntimeError("Gemini API response contained no candidates")
-
-        except ValueError as e:
-            # The request had invalid parameters
-            print(f"Invalid request parameters:  {e}")
-            sys.exit(1)
-
-        except ConnectionError as e:
-            # Network connection to the API failed
-            print(f"Network error connecting to Gemini API:  {e}")
+    if args.batch and args.overlay:
+        parser.error('--batch tasks choose their overlay mode in the task file')
+    if args.batch and (args.prompt or args.resume or args.fork):
+        parser.error('--batch takes its prompts from the task file and cannot resume or fork')
+    if not args.prompt and not (args.resume or args.fork or args.batch):
+        parser.error('a prompt is required unless --resume, --fork or --batch is given')
+
+    if args.replay:
+        # Offline: recorded responses stand in for the API, so no key is needed
+        if not os.path.isdir(args.replay):
+            print(f'Error: recording directory "{args.replay}" does not exist')
             sys.exit(1)
-
-        except Exception as e:
-            # Catch any other errors from the API call
-            print(f"generate_content failed: {e}")
-            sys.exit(1)
-
-        try:
-            # Display token usage information if verbose mode is enabled
-            meta = getattr(response, "usage_metadata", None)
-            if args.verbose:
-                print()
-                print(f'User prompt: "{args.prompt}"')
-                if not meta:
-                    print("Warning:  No usage metadata available.")
-                else:
-                        print(f"Prompt tokens: {meta.prompt_token_count}")
-                        print(f"Response tokens: {meta.candidates_token_count}")
-
-            # Check if the model wants to call any tools (functions)
-            calls = getattr(response, "function_calls", None)
-            if calls:
-                for fc in calls:
-                    try:
-                        # Execute the requested function and get the result
-                        function_call_result = call_function(fc, verbose=args.verbose)
-
-                        # Ensure the function returned a properly structured result
-                        if not function_call_result.parts:
-                            raise RuntimeError(f"Function '{fc.name}' returned no parts")
-                        
-                        if not function_call_result.parts[0].function_response:
-                            raise RuntimeError(f"Function '{fc.name}' returned invalid response structure")
-
-                        # Extract the actual response data from the function result
-                        resp = function_call_result.parts[0].function_response.response
-
-                        # Add the function's output to the conversation so the model can see it
-                        messages.append(
-                            types.Content(
-                                role="user",
-                                parts=[
-                                    types.Part(
-                                        function_response=function_call_result.parts[0].function_response
-                                    )
-                                ],
-                            )
-                        )
-
-                        # Show the function output in verbose mode
-                        if args.verbose:
-                            print(f"-> {resp}")
-
-                    except RuntimeError as e:
-                        print(f"Function call error:  {e}")
-                        sys.exit(1)
-                    
-                    except (IndexError, AttributeError) as e:
-                        print(f"Function '{fc.name}' returned malformed response:  {e}")
-                        sys.exit(1)
-
-                # Go back to the start of the loop so the model can process the function results
-                continue
-
-            # If there are no function calls, check for a final text response
-            if response.text:
-                print(response.text)
-                break
-
-        except Exception as e:
-            # Handle any unexpected errors while processing the response
-            print(f"failed to read response: {e}")
+        from backends import ReplayBackend
+        backend = ReplayBackend(args.replay)
+    else:
+        # Load environment variables from .env file (if it exists)
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.environ.get("GEMINI_API_KEY")
+
+        # Exit immediately if the API key isn't configured
+        if not api_key:
+            print("Error: GEMINI_API_KEY not set.")
             sys.exit(1)
 
-    else:
-        # This executes only if the loop finished without breaking (hit max iterations)
-        print(f"Warning: Agent reached maximum iterations ({MAX_ITERS}) without completing")
+        from google import genai
+        from backends import GeminiBackend, RecordingBackend
+        from rate_limit import RequestScheduler, RateLimitedBackend
+
+        # Initialize the Gemini API client; requests are paced and retried by the scheduler
+        scheduler = RequestScheduler(rpm=args.rpm, tpm=args.tpm)
+        backend = RateLimitedBackend(GeminiBackend(genai.Client(api_key=api_key)), scheduler)
+        if args.record:
+            backend = RecordingBackend(backend, args.record)
+
+    import asyncio
+    from tracing import start_tracing
+    tracer = start_tracing() if args.trace else None
+
+    if args.batch:
+        from batch import run_batch
+
+        # One process, one client and one rate limiter for the whole task file
+        output = args.output or os.path.splitext(args.batch)[0] + ".results.jsonl"
+        failed = asyncio.run(
+            run_batch(backend, args.batch, output, concurrency=args.concurrency, verbose=args.verbose)
+        )
+        if tracer is not None:
+            tracer.write(args.trace)
+            print(tracer.summary())
+        if args.verbose and not args.replay:
+            print(scheduler.stats())
+        sys.exit(1 if failed else 0)
+
+    from agent import run_agent
+    from transcript import start_session, TranscriptError
+    from functions.overlay import Overlay
+
+    # Open (or reload) the session transcript that every turn is checkpointed to
+    overlay = None
+    try:
+        if args.overlay and not (args.resume or args.fork):
+            # New session: the transcript records the overlay, so --resume returns to it
+            overlay = Overlay.create(WORKING_DIRECTORY, isolated=True)
+            history, transcript, changed = start_session(args.prompt, working_directory=overlay.merged)
+        else:
+            history, transcript, changed = start_session(args.prompt, args.resume, args.fork)
+    except (TranscriptError, OSError) as e:
+        print(f"Error: {e}")
         sys.exit(1)
+    for path in changed:
+        print(f"Warning: changed since checkpoint: {path}")
+    work = transcript.header["working_directory"]
+    if overlay is None:
+        # A resumed session carries on in its overlay, if it had one; a fork gets
+        # a fresh overlay on top of whatever tree it was started from
+        overlay = Overlay.containing(work) if not args.fork else None
+        if args.overlay and overlay is None:
+            overlay = Overlay.create(work, isolated=True)
+        if overlay is not None:
+            work = overlay.merged
+
+    # Run the async agent loop to completion; it streams the final answer as it arrives
+    exit_code = asyncio.run(
+        run_agent(
+            backend,
+            args.prompt or transcript.header["prompt"],
+            verbose=args.verbose,
+            max_parallel_tools=args.max_parallel_tools,
+            history=history,
+            transcript=transcript,
+            working_directory=work,
+            speculate=args.speculate,
+        )
+    )
+    transcript.close()
+    if overlay is not None:
+        print(overlay.summary())
+        outcome = overlay.finish(args.overlay or "keep", exit_code == 0)
+        if outcome == "kept":
+            print(f"Overlay kept at {overlay.root}; base left unchanged")
+        elif outcome == "conflict":
+            print(f"Overlay not committed, base changed since it was created: {', '.join(overlay.conflicts)}")
+            print(f"Overlay kept at {overlay.root}; base left unchanged")
+        else:
+            print(f"Overlay {outcome}")
+    if args.verbose and not args.replay:
+        print(scheduler.stats())
+    if tracer is not None:
+        tracer.write(args.trace)
+        print(tracer.summary())
+        print(f"Trace written to {args.trace}")
+    if exit_code:
+        # The conversation so far is on disk; point at how to pick it back up
+        print(f"Session saved as {transcript.session}; continue with: python main.py --resume {transcript.session}")
+        sys.exit(exit_code)
+    if args.verbose:
+        print(f"Session saved as {transcript.session}")
 
 if __name__ == "__main__":
     # Run the main function when this script is executed directly
     main()
-    
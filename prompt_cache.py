@@ -0,0 +1,96 @@
+# python
+import time
+
+from google.genai import types
+
+from config import CONTEXT_CACHE_MIN_TOKENS, CONTEXT_CACHE_TTL_SECONDS, CONTEXT_CACHE_REFRESH_MARGIN
+
+
+class PromptCache:
+    # Keeps a server-side cached-content handle for the stable prefix of a
+    # session's requests: the system instruction, the tool schemas and the turns
+    # that are already settled (everything but the newest message). Requests then
+    # carry only the uncached suffix. A new, longer cache replaces the old one
+    # once the uncached part is itself big enough to cache; if history
+    # compaction rewrites a cached message, the cache is dropped. Any caching
+    # error (unsupported model, prefix below the API minimum, ...) turns caching
+    # off for the session and requests go out in full.
+    def __init__(self, backend, config, min_tokens=CONTEXT_CACHE_MIN_TOKENS, ttl=CONTEXT_CACHE_TTL_SECONDS,
+                 refresh_margin=CONTEXT_CACHE_REFRESH_MARGIN, clock=time.monotonic):
+        self.backend = backend
+        self.config = config
+        self.min_tokens = min_tokens
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        # Only backends that talk to the live API can cache (not record/replay)
+        self.enabled = getattr(backend, "create_cache", None) is not None
+        self.name = None
+        self.prefix = []
+        self.expires = 0.0
+        self.base_tokens = len(config.model_dump_json(exclude_none=True)) // 4
+        self.created = 0
+        self.refreshed = 0
+        self.error = None
+
+    def _prefix_intact(self, messages):
+        # Compaction replaces message objects, so identity tells us nothing changed
+        return len(messages) > len(self.prefix) and all(a is b for a, b in zip(messages, self.prefix))
+
+    async def _create(self, prefix):
+        cached = await self.backend.create_cache(contents=prefix, config=self.config, ttl=self.ttl)
+        old = self.name
+        self.name = cached.name
+        self.prefix = list(prefix)
+        self.expires = self.clock() + self.ttl
+        self.created += 1
+        if old is not None:
+            await self._delete(old)
+
+    async def _delete(self, name):
+        try:
+            await self.backend.delete_cache(name)
+        except Exception:
+            # It expires on its own anyway
+            pass
+
+    async def _drop(self):
+        name, self.name, self.prefix = self.name, None, []
+        if name is not None:
+            await self._delete(name)
+
+    async def prepare(self, history):
+        # Returns (contents, config) for the next request
+        if not self.enabled:
+            return history.messages, self.config
+        messages = history.messages
+        try:
+            if self.name is not None and not self._prefix_intact(messages):
+                await self._drop()
+            settled = len(messages) - 1
+            settled_tokens = self.base_tokens + sum(history.tokens[:settled])
+            cached_tokens = self.base_tokens + sum(history.tokens[:len(self.prefix)]) if self.name else 0
+            if settled_tokens >= self.min_tokens and settled_tokens - cached_tokens >= self.min_tokens:
+                await self._create(messages[:settled])
+            elif self.name is not None and self.clock() >= self.expires - self.refresh_margin:
+                # Keep the handle alive while the session is still using it
+                await self.backend.update_cache(self.name, ttl=self.ttl)
+                self.expires = self.clock() + self.ttl
+                self.refreshed += 1
+        except Exception as e:
+            self.enabled = False
+            self.error = f"{type(e).__name__}: {e}"
+            await self._drop()
+            return messages, self.config
+        if self.name is None:
+            return messages, self.config
+        return messages[len(self.prefix):], types.GenerateContentConfig(cached_content=self.name)
+
+    async def close(self):
+        # Delete the handle at the end of the session instead of paying for its TTL
+        await self._drop()
+
+    def stats(self):
+        if self.error:
+            return f"Context cache: disabled ({self.error})"
+        return f"Context cache: {self.created} created, {self.refreshed} refreshed"
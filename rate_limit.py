@@ -0,0 +1,285 @@
+# python
+import time
+import random
+import asyncio
+import email.utils
+
+from config import (
+    RATE_LIMIT_RPM, RATE_LIMIT_TPM, RATE_LIMIT_BURST, RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS,
+)
+from history import estimate_tokens
+
+# Status codes worth retrying: throttling and transient server errors
+_THROTTLED = 429
+_TRANSIENT = {500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    # Raised while the breaker is open; retry_after says when it will half-open
+    def __init__(self, retry_after):
+        super().__init__(f"model API circuit open; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    # Refills at rate_per_minute / 60 per second up to `burst` (default: one
+    # minute's worth). Taking more than is available waits; the level may go
+    # negative when actual usage turns out higher than estimated, which delays
+    # later callers instead. A small burst keeps a sliding-window quota (as the
+    # API enforces) from being overrun at start-up.
+    def __init__(self, rate_per_minute, burst=None, clock=time.monotonic):
+        self.capacity = float(burst or rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    async def take(self, amount=1.0):
+        # Waiters queue on the lock, so the bucket is served first come, first served
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                now = self._refill()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((amount - self.level) / self.rate)
+
+    def adjust(self, amount):
+        # Charge (or refund, if negative) the difference once actual usage is known
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def hold(self, seconds):
+        # Stop handing out capacity for a while (the server asked us to back off)
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive transient failures and rejects calls
+    # for `reset_seconds`; then lets one probe through (half-open) and closes
+    # again on its success.
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.opens = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half-open"
+
+    def before_call(self):
+        # Returns True if the caller is the half-open probe
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError(self.reset_seconds - (self.clock() - self.opened_at))
+        if state == "half-open":
+            if self.probing:
+                # Someone else is probing; check back shortly
+                raise CircuitOpenError(min(1.0, self.reset_seconds))
+            self.probing = True
+            return True
+        return False
+
+    def abandon_probe(self):
+        # The probe ended without an answer either way (e.g. it was cancelled),
+        # so the next call may probe instead
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            if self.opened_at is None or self.probing:
+                self.opens += 1
+            self.opened_at = self.clock()
+            self.probing = False
+
+
+def _status(error):
+    # HTTP status of an API error (google.genai.errors.APIError has .code)
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _seconds(value):
+    # "17s" / "1.5s" (google.rpc.RetryInfo), "17" or an HTTP date (Retry-After)
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value[:-1] if value.endswith("s") else value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(error):
+    # Server-provided delay hint: the Retry-After header, else RetryInfo in the body
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None and headers.get("retry-after") is not None:
+        delay = _seconds(headers.get("retry-after"))
+        if delay is not None:
+            return delay
+    details = getattr(error, "details", None)
+    if isinstance(details, dict):
+        for item in (details.get("error") or {}).get("details") or []:
+            if isinstance(item, dict) and item.get("retryDelay"):
+                return _seconds(item["retryDelay"])
+    return None
+
+
+def is_retryable(error):
+    if isinstance(error, (ConnectionError, TimeoutError, CircuitOpenError)):
+        return True
+    return _status(error) in _TRANSIENT or _status(error) == _THROTTLED
+
+
+class RequestScheduler:
+    # Shared by every session in the process: one requests-per-minute bucket,
+    # one tokens-per-minute bucket and one circuit breaker, so concurrent agents
+    # draw on a single quota and back off together when the API pushes back.
+    def __init__(self, rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM, burst=RATE_LIMIT_BURST, max_attempts=RETRY_MAX_ATTEMPTS,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, breaker=None, clock=time.monotonic):
+        self.requests = TokenBucket(rpm, min(burst, rpm), clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock=clock) if tpm else None
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def backoff(self, attempt, hint=None):
+        # Full jitter on an exponential cap; a server hint is a floor, plus a
+        # little jitter so sessions that were throttled together don't retry together
+        if hint is not None:
+            return hint + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def admit(self, tokens):
+        # Wait for quota before sending a request of about `tokens` prompt tokens
+        start = time.monotonic()
+        if self.requests is not None:
+            await self.requests.take(1)
+        if self.tokens is not None:
+            await self.tokens.take(tokens)
+        self.waited += time.monotonic() - start
+
+    def settle(self, estimated, actual):
+        # Reconcile the token bucket with the usage the API reported
+        if self.tokens is not None and actual is not None:
+            self.tokens.adjust(actual - estimated)
+
+    async def call(self, send, tokens):
+        # Run `send` (an async callable) under the limits, retrying transient failures
+        for attempt in range(self.max_attempts):
+            probe = False
+            try:
+                probe = self.breaker.before_call()
+                await self.admit(tokens)
+                self.calls += 1
+                result = await send()
+            except Exception as e:
+                if _status(e) in _TRANSIENT or isinstance(e, (ConnectionError, TimeoutError)):
+                    self.breaker.record_failure()
+                elif not isinstance(e, CircuitOpenError):
+                    # The API answered (throttling or a client error), so it is reachable
+                    self.breaker.record_success()
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                hint = e.retry_after if isinstance(e, CircuitOpenError) else retry_after(e)
+                if _status(e) == _THROTTLED:
+                    # Quota is shared, so every session waits out the server's hint
+                    self.throttled += 1
+                    if hint is not None and self.requests is not None:
+                        self.requests.hold(hint)
+                self.retries += 1
+                await asyncio.sleep(self.backoff(attempt, hint))
+                continue
+            except BaseException:
+                # Cancelled (e.g. a losing speculative attempt): a probe that never
+                # finished must not leave the breaker waiting for it forever
+                if probe:
+                    self.breaker.abandon_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        return (
+            f"Model requests: {self.calls} sent, {self.retries} retried, {self.throttled} throttled, "
+            f"{self.waited:.1f}s spent waiting for quota (summed over sessions), circuit {self.breaker.state} (opened {self.breaker.opens}x)"
+        )
+
+
+class RateLimitedBackend:
+    # Backend wrapper that sends every request through a shared RequestScheduler.
+    # A request is retried until its first chunk arrives; after that the stream
+    # is already being consumed and errors are passed on.
+    def __init__(self, inner, scheduler):
+        self.inner = inner
+        self.model = inner.model
+        self.scheduler = scheduler
+
+    def __getattr__(self, name):
+        # Everything else (e.g. context caching) goes straight to the wrapped backend
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def generate_content_stream(self, contents, config=None):
+        estimated = sum(estimate_tokens(c) for c in contents)
+
+        async def send():
+            stream = await self.inner.generate_content_stream(contents=contents, config=config)
+            iterator = aiter(stream)
+            try:
+                first = await anext(iterator)
+            except StopAsyncIteration:
+                first = None
+            return first, iterator
+
+        first, iterator = await self.scheduler.call(send, estimated)
+
+        async def relay():
+            meta = None
+            if first is not None:
+                meta = first.usage_metadata or meta
+                yield first
+            async for chunk in iterator:
+                meta = chunk.usage_metadata or meta
+                yield chunk
+            if meta is not None:
+                self.scheduler.settle(estimated, (meta.prompt_token_count or 0) + (meta.candidates_token_count or 0))
+
+        return relay()
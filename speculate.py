@@ -0,0 +1,147 @@
+# python
+import time
+import asyncio
+
+from history import History
+from tracing import get_tracer
+from functions.overlay import Overlay
+from functions.call_function import get_function
+
+# Speculative fixing: once a session has reproduced a failure with
+# run_python_file, K attempts continue from a fork of its history, each in its
+# own isolated overlay (a full copy) of the working directory and each nudged
+# towards a different line of attack. After every turn in which an attempt
+# changes files, the failing command is re-run in that attempt's overlay; the
+# first attempt for which it passes is committed to the session's tree and the
+# others are cancelled and discarded.
+
+# What run_python_file reports when the script itself failed (as opposed to a
+# sandbox error such as a missing file, which reproduces nothing)
+_FAILURE_MARKERS = ("\nProcess exited with code", "Process timed out", "Traceback (most recent call last)")
+
+_APPROACHES = [
+    "Start from the most likely cause.",
+    "Assume the most obvious cause is not the culprit and look for a less likely one.",
+    "Before editing, trace backwards from the failing output to where the wrong value is produced.",
+    "Look for the smallest change to existing code that could explain the failure.",
+]
+
+
+def run_failed(output):
+    return any(marker in output for marker in _FAILURE_MARKERS)
+
+
+class FailingRun:
+    # The run_python_file call that reproduced the failure, re-run to verify fixes
+    def __init__(self, file_path, args, output):
+        self.file_path = file_path
+        self.args = [str(arg) for arg in args or []]
+        self.output = output
+
+    def command(self):
+        return " ".join([self.file_path] + self.args)
+
+    def check(self, working_directory):
+        # (passed, output) of the command in working_directory; blocking
+        output = get_function("run_python_file")(working_directory, self.file_path, self.args)
+        return not output.startswith("Error:") and not run_failed(output), output
+
+
+def find_failing_run(calls, results):
+    # The first run_python_file call of a turn whose script failed, or None
+    for fc, content in zip(calls, results):
+        if fc.name != "run_python_file":
+            continue
+        output = str((content.parts[0].function_response.response or {}).get("result", ""))
+        if run_failed(output):
+            args = fc.args or {}
+            return FailingRun(args.get("file_path"), args.get("args"), output)
+    return None
+
+
+def _hint(number, attempts, failing):
+    return (
+        f"Speculative attempt {number} of {attempts}: {attempts} attempts are now fixing this failure in parallel, "
+        f"each in its own copy of the working directory. After each turn in which you change files, "
+        f"`{failing.command()}` is re-run for you; the first attempt that makes it pass is kept. "
+        + _APPROACHES[(number - 1) % len(_APPROACHES)]
+    )
+
+
+class Attempt:
+    def __init__(self, number, overlay, history):
+        self.number = number
+        self.overlay = overlay
+        self.history = history
+        self.verified = False
+        self.checks = 0
+        self.code = None
+
+
+async def race(history, failing, working_directory, attempts, run_attempt, verbose=False):
+    # Run `attempts` attempts from a fork of `history`. run_attempt(history,
+    # working_directory, verify) runs one sub-session and returns its exit code;
+    # verify is an async callable returning (passed, note) that the sub-session
+    # calls after turns that change files. Returns (winner or None, attempts).
+    start = time.perf_counter()
+    racers = []
+    for number in range(1, attempts + 1):
+        # Attempts run model-written scripts, which may write files in place, so
+        # each gets real copies rather than links shared with the base
+        overlay = await asyncio.to_thread(Overlay.create, working_directory, isolated=True)
+        fork = History.restore(history.messages)
+        fork.add_user(_hint(number, attempts, failing))
+        racers.append(Attempt(number, overlay, fork))
+
+    async def run(attempt):
+        async def verify():
+            attempt.checks += 1
+            passed, output = await asyncio.to_thread(failing.check, attempt.overlay.merged)
+            if passed:
+                attempt.verified = True
+                return True, f"Verification passed: `{failing.command()}` now succeeds.\n{output}"
+            return False, f"Verification failed: `{failing.command()}` still fails.\n{output}"
+
+        # Attempts run concurrently on the event loop, so each gets its own trace track
+        get_tracer().start_track(f"attempt {attempt.number}")
+        with get_tracer().span("attempt", "agent", attempt=attempt.number) as span:
+            try:
+                attempt.code = await run_attempt(attempt.history, attempt.overlay.merged, verify)
+            finally:
+                span.set(verified=attempt.verified, checks=attempt.checks)
+        return attempt
+
+    winner = None
+    with get_tracer().span("speculate", "agent", attempts=attempts) as span:
+        pending = {asyncio.create_task(run(attempt)) for attempt in racers}
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().verified:
+                        winner = task.result()
+                        break
+            # The first verified fix wins; the rest are no longer needed
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if winner is not None:
+                await asyncio.to_thread(winner.overlay.commit)
+        finally:
+            for task in pending:
+                task.cancel()
+            for attempt in racers:
+                await asyncio.to_thread(attempt.overlay.discard)
+        span.set(winner=winner.number if winner else None, seconds=time.perf_counter() - start)
+
+    if verbose:
+        for attempt in racers:
+            if attempt is winner:
+                state = "verified, committed"
+            elif attempt.code is None:
+                state = "cancelled"
+            else:
+                state = f"finished unverified (exit {attempt.code})"
+            turns = attempt.history.turn - history.turn
+            print(f"Attempt {attempt.number}: {state} after {turns} turns, {attempt.checks} checks")
+    return winner, racers
@@ -0,0 +1,118 @@
+# python
+import time
+import asyncio
+
+from google.genai import types
+
+
+# Offline stand-in for genai.Client used by benchmarks and tests. Each entry in
+# `turns` is the list of parts the model "returns" for one generate_content call.
+# Text parts are streamed word by word; latency is simulated with
+# first_chunk_delay (time to first byte) and chunk_delay (per streamed chunk).
+# aio.caches keeps cached contents in memory, and requests that name one are
+# billed like the API does: the cached prefix shows up in cached_content_token_count.
+class StubClient:
+    def __init__(self, turns, first_chunk_delay=0.0, chunk_delay=0.0):
+        self.turns = list(turns)
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.requests = []
+        self.caches = {}
+        self.models = _StubModels(self)
+        self.aio = _StubAio(self)
+
+    def next_chunks(self, contents):
+        # Record the request and split the next scripted turn into stream chunks
+        self.requests.append(list(contents))
+        if not self.turns:
+            raise RuntimeError("StubClient has no scripted turns left")
+        chunks = []
+        for part in self.turns.pop(0):
+            if part.text:
+                words = part.text.split(" ")
+                for i, word in enumerate(words):
+                    chunks.append(types.Part(text=word if i == len(words) - 1 else word + " "))
+            else:
+                chunks.append(part)
+        return chunks
+
+
+def _response(parts, usage=None):
+    # Wrap parts in a GenerateContentResponse shaped like the real API's
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=usage,
+    )
+
+
+def _usage(contents, parts, cached=()):
+    # Rough token counts so --verbose output has something to show
+    cached_chars = sum(len(str(c)) for c in cached)
+    prompt_chars = sum(len(str(c)) for c in contents) + cached_chars
+    response_chars = sum(len(str(p)) for p in parts)
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_chars // 4,
+        cached_content_token_count=cached_chars // 4 if cached else None,
+        candidates_token_count=response_chars // 4,
+    )
+
+
+class _StubModels:
+    def __init__(self, stub):
+        self._stub = stub
+
+    def generate_content(self, *, model, contents, config=None):
+        # Blocking call: the caller sees nothing until every chunk has been "generated"
+        chunks = self._stub.next_chunks(contents)
+        time.sleep(self._stub.first_chunk_delay + self._stub.chunk_delay * len(chunks))
+        return _response(chunks, _usage(contents, chunks))
+
+
+class _StubAsyncModels:
+    def __init__(self, stub):
+        self._stub = stub
+
+    async def generate_content_stream(self, *, model, contents, config=None):
+        stub = self._stub
+        cached = []
+        if config is not None and config.cached_content:
+            if config.cached_content not in stub.caches:
+                raise ValueError(f"cached content {config.cached_content} not found")
+            cached = stub.caches[config.cached_content]
+        chunks = stub.next_chunks(contents)
+
+        async def stream():
+            await asyncio.sleep(stub.first_chunk_delay)
+            for i, part in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(stub.chunk_delay)
+                last = i == len(chunks) - 1
+                yield _response([part], _usage(contents, chunks, cached) if last else None)
+
+        return stream()
+
+
+class _StubCaches:
+    def __init__(self, stub):
+        self._stub = stub
+        self._created = 0
+
+    async def create(self, *, model, config):
+        self._created += 1
+        name = f"cachedContents/stub-{self._created}"
+        self._stub.caches[name] = list(config.contents or [])
+        return types.CachedContent(name=name, model=model)
+
+    async def update(self, *, name, config=None):
+        if name not in self._stub.caches:
+            raise ValueError(f"cached content {name} not found")
+        return types.CachedContent(name=name)
+
+    async def delete(self, *, name, config=None):
+        self._stub.caches.pop(name, None)
+
+
+class _StubAio:
+    def __init__(self, stub):
+        self.models = _StubAsyncModels(stub)
+        self.caches = _StubCaches(stub)
@@ -0,0 +1,114 @@
+# python
+import json
+import time
+import random
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Local stand-in for the Gemini REST API, for exercising the real genai client
+# (and everything wrapped around it) without network access. It answers
+# generateContent and streamGenerateContent with a two-step script: a prompt
+# gets a get_files_info call, a function response gets a text answer. It can
+# enforce its own requests-per-minute quota (429 with Retry-After) and inject
+# random transient failures (503).
+#   server = FakeGeminiServer(rpm=60, failure_rate=0.1).start()
+#   client = genai.Client(api_key="fake", http_options=types.HttpOptions(base_url=server.url))
+class FakeGeminiServer:
+    def __init__(self, rpm=None, failure_rate=0.0, retry_after=2, latency=0.0, seed=0):
+        self.rpm = rpm
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self.httpd = None
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"server_state": self})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def admit(self):
+        # Returns None, or the (status, body, headers) of an injected failure
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            while self.recent and now - self.recent[0] >= 60:
+                self.recent.popleft()
+            if self.rpm is not None and len(self.recent) >= self.rpm:
+                self.throttled += 1
+                wait = max(1, int(60 - (now - self.recent[0])) + 1) if self.retry_after is None else self.retry_after
+                return 429, _error(429, "RESOURCE_EXHAUSTED", "Quota exceeded", f"{wait}s"), {"Retry-After": str(wait)}
+            self.recent.append(now)
+            if self.random.random() < self.failure_rate:
+                self.failed += 1
+                return 503, _error(503, "UNAVAILABLE", "The model is overloaded"), {}
+        return None
+
+    def stats(self):
+        return f"Server: {self.requests} requests, {self.throttled} throttled, {self.failed} injected failures"
+
+
+def _error(code, status, message, retry_delay=None):
+    error = {"code": code, "message": message, "status": status}
+    if retry_delay:
+        error["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay}]
+    return {"error": error}
+
+
+def _reply(request):
+    # A prompt gets a tool call; a tool result gets the final answer
+    last = (request.get("contents") or [{}])[-1]
+    if any("functionResponse" in part for part in last.get("parts", [])):
+        parts = [{"text": "The working directory contains the calculator project."}]
+    else:
+        parts = [{"functionCall": {"name": "get_files_info", "args": {}}}]
+    return {
+        "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": len(json.dumps(request)) // 4, "candidatesTokenCount": 12},
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None, stream=False):
+        data = (f"data: {json.dumps(body)}\r\n\r\n" if stream else json.dumps(body)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream" if stream else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        state = self.server_state
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if state.latency:
+            time.sleep(state.latency)
+        failure = state.admit()
+        if failure is not None:
+            status, body, headers = failure
+            self._send(status, body, headers)
+            return
+        self._send(200, _reply(request), stream=":streamGenerateContent" in self.path)
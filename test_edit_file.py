@@ -0,0 +1,65 @@
+# python
+import os
+import shutil
+import difflib
+import tempfile
+import unittest
+
+from functions.cache import new_session
+from functions.edit_file import edit_file, _apply_unified_diff, EditError
+
+
+def zero_context_diff(before, after):
+    # The n=0 form edit_file's own summaries print
+    return "\n".join(difflib.unified_diff(before.split("\n"), after.split("\n"), "a/f", "b/f", n=0, lineterm=""))
+
+
+class TestApplyUnifiedDiff(unittest.TestCase):
+    def test_insertion_hunk(self):
+        self.assertEqual(_apply_unified_diff("a\nb\nc", "@@ -2,0 +3 @@\n+X"), "a\nb\nX\nc")
+
+    def test_insertion_at_start_and_end(self):
+        self.assertEqual(_apply_unified_diff("a\nb", "@@ -0,0 +1 @@\n+X"), "X\na\nb")
+        self.assertEqual(_apply_unified_diff("a\nb", "@@ -2,0 +3 @@\n+X"), "a\nb\nX")
+
+    def test_insertion_after_earlier_hunk(self):
+        # The first hunk shifts the lines the second insertion counts from
+        diff = "@@ -1 +1,2 @@\n-a\n+A1\n+A2\n@@ -2,0 +4 @@\n+X"
+        self.assertEqual(_apply_unified_diff("a\nb\nc", diff), "A1\nA2\nb\nX\nc")
+
+    def test_zero_context_round_trip(self):
+        before = "\n".join(f"line {i}" for i in range(1, 11))
+        cases = [
+            before.replace("line 3\n", "line 3\nnew a\nnew b\n"),
+            before.replace("line 5\n", ""),
+            before.replace("line 7", "seven").replace("line 1\n", "line 1\nfirst\n"),
+            "top\n" + before + "\nbottom",
+        ]
+        for after in cases:
+            with self.subTest(after=after):
+                self.assertEqual(_apply_unified_diff(before, zero_context_diff(before, after)), after)
+
+    def test_context_mismatch(self):
+        with self.assertRaises(EditError):
+            _apply_unified_diff("a\nb\nc", "@@ -2 +2 @@\n-x\n+y")
+
+
+class TestEditFile(unittest.TestCase):
+    def setUp(self):
+        new_session()
+        self.work = tempfile.mkdtemp()
+        with open(os.path.join(self.work, "f.py"), "w") as f:
+            f.write("a\nb\nc\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.work, ignore_errors=True)
+
+    def test_insertion_diff(self):
+        result = edit_file(self.work, "f.py", diff="@@ -2,0 +3 @@\n+X")
+        self.assertTrue(result.startswith("Successfully edited"), result)
+        with open(os.path.join(self.work, "f.py")) as f:
+            self.assertEqual(f.read(), "a\nb\nX\nc\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# python
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.overlay import Overlay
+from functions.run_python_file import run_python_file
+from functions.call_function import release_working_directory
+
+# A script that rewrites an existing file in place, as model-written code may
+IN_PLACE_WRITE = 'with open("data.txt", "w") as f:\n    f.write("changed\\n")\n'
+
+
+def replace(path, text):
+    # How the write tools change a file: a new inode swapped in
+    with open(path + ".new", "w") as f:
+        f.write(text)
+    os.replace(path + ".new", path)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+class TestOverlay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.base = os.path.join(self.tmp, "base")
+        os.makedirs(self.base)
+        for name, text in (("data.txt", "original\n"), ("a.py", "a = 0\n"), ("b.py", "b = 0\n")):
+            with open(os.path.join(self.base, name), "w") as f:
+                f.write(text)
+        with open(os.path.join(self.base, "rewrite.py"), "w") as f:
+            f.write(IN_PLACE_WRITE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def create(self, name):
+        return Overlay.create(self.base, os.path.join(self.tmp, name), isolated=True)
+
+    def test_in_place_write_by_script_stays_in_overlay(self):
+        first = self.create("first")
+        second = self.create("second")
+        try:
+            output = run_python_file(first.merged, "rewrite.py")
+            self.assertNotIn("Error", output)
+        finally:
+            release_working_directory(first.merged)
+        self.assertEqual(read(os.path.join(first.merged, "data.txt")), "changed\n")
+        # Neither the base nor a sibling overlay sees the write
+        self.assertEqual(read(os.path.join(self.base, "data.txt")), "original\n")
+        self.assertEqual(read(os.path.join(second.merged, "data.txt")), "original\n")
+        self.assertEqual(first.changes(), (["data.txt"], [], []))
+        first.discard()
+        self.assertEqual(read(os.path.join(self.base, "data.txt")), "original\n")
+
+    def test_commit_applies_changes(self):
+        overlay = self.create("overlay")
+        replace(os.path.join(overlay.merged, "a.py"), "a = 1\n")
+        os.remove(os.path.join(overlay.merged, "b.py"))
+        replace(os.path.join(overlay.merged, "c.py"), "c = 1\n")
+        self.assertEqual(overlay.finish("commit"), "committed")
+        self.assertEqual(read(os.path.join(self.base, "a.py")), "a = 1\n")
+        self.assertEqual(read(os.path.join(self.base, "c.py")), "c = 1\n")
+        self.assertFalse(os.path.exists(os.path.join(self.base, "b.py")))
+
+    def test_commit_keeps_other_overlays_commits(self):
+        first = self.create("first")
+        second = self.create("second")
+        replace(os.path.join(first.merged, "a.py"), "a = 1\n")
+        replace(os.path.join(second.merged, "b.py"), "b = 2\n")
+        self.assertEqual(first.finish("commit"), "committed")
+        self.assertEqual(second.changes(), (["b.py"], [], []))
+        self.assertEqual(second.finish("commit"), "committed")
+        self.assertEqual(read(os.path.join(self.base, "a.py")), "a = 1\n")
+        self.assertEqual(read(os.path.join(self.base, "b.py")), "b = 2\n")
+
+    def test_conflicting_commit_is_refused(self):
+        first = self.create("first")
+        second = self.create("second")
+        replace(os.path.join(first.merged, "a.py"), "a = 1\n")
+        replace(os.path.join(second.merged, "a.py"), "a = 2\n")
+        self.assertEqual(first.finish("commit"), "committed")
+        self.assertEqual(second.finish("commit"), "conflict")
+        self.assertEqual(second.conflicts, ["a.py"])
+        self.assertEqual(read(os.path.join(self.base, "a.py")), "a = 1\n")
+
+    def test_root_inside_base(self):
+        overlay = Overlay.create(self.base, os.path.join(self.base, ".batch", "run", "1"), isolated=True)
+        self.assertEqual(sorted(os.listdir(overlay.merged)), ["a.py", "b.py", "data.txt", "rewrite.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
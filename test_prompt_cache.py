@@ -0,0 +1,99 @@
+# python
+import unittest
+
+from google.genai import types
+
+from backends import GeminiBackend
+from history import History
+from prompt_cache import PromptCache
+from stub_client import StubClient
+
+
+class FakeClock:
+    # Monotonic clock the tests move by hand
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def model_turn(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+class TestPromptCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = StubClient([])
+        self.clock = FakeClock()
+        self.config = types.GenerateContentConfig(system_instruction="You are a test.")
+        self.cache = PromptCache(
+            GeminiBackend(self.client), self.config, min_tokens=50, ttl=600, refresh_margin=120, clock=self.clock,
+        )
+        # Two settled messages well over min_tokens, and the newest one
+        self.history = History("first " * 100)
+        self.history.add_model(model_turn("reply " * 100))
+        self.history.add_user("next")
+
+    async def test_creates_cache_for_settled_prefix(self):
+        contents, config = await self.cache.prepare(self.history)
+        self.assertEqual(contents, self.history.messages[2:])
+        self.assertEqual(config.cached_content, self.cache.name)
+        self.assertEqual(self.client.caches[self.cache.name], self.history.messages[:2])
+        self.assertEqual(self.cache.created, 1)
+        self.assertEqual(self.cache.stats(), "Context cache: 1 created, 0 refreshed")
+
+    async def test_refreshes_before_ttl_expires(self):
+        await self.cache.prepare(self.history)
+        name = self.cache.name
+        # Still well inside the TTL: nothing to do
+        self.clock.now += 300
+        await self.cache.prepare(self.history)
+        self.assertEqual(self.cache.refreshed, 0)
+        # Within the refresh margin of expiry: the same handle is extended
+        self.clock.now += 200
+        _, config = await self.cache.prepare(self.history)
+        self.assertEqual(self.cache.refreshed, 1)
+        self.assertEqual(self.cache.expires, self.clock.now + 600)
+        self.assertEqual(config.cached_content, name)
+        self.assertEqual(self.cache.created, 1)
+
+    async def test_rewritten_prefix_drops_cache(self):
+        await self.cache.prepare(self.history)
+        old = self.cache.name
+        # Compaction replaces a cached message
+        self.history._replace(1, model_turn("short"))
+        self.cache.min_tokens = 10000
+        contents, config = await self.cache.prepare(self.history)
+        self.assertNotIn(old, self.client.caches)
+        self.assertIsNone(self.cache.name)
+        self.assertEqual(contents, self.history.messages)
+        self.assertIs(config, self.config)
+
+    async def test_close_deletes_cache(self):
+        await self.cache.prepare(self.history)
+        name = self.cache.name
+        await self.cache.close()
+        self.assertNotIn(name, self.client.caches)
+        self.assertIsNone(self.cache.name)
+
+    async def test_creation_failure_falls_back_to_full_request(self):
+        async def create(*, model, config):
+            raise ValueError("model does not support caching")
+
+        self.client.aio.caches.create = create
+        contents, config = await self.cache.prepare(self.history)
+        self.assertEqual(contents, self.history.messages)
+        self.assertIs(config, self.config)
+        self.assertFalse(self.cache.enabled)
+        self.assertEqual(self.cache.stats(), "Context cache: disabled (ValueError: model does not support caching)")
+        # Caching stays off for the rest of the session
+        self.history.add_model(model_turn("more " * 100))
+        self.history.add_user("again")
+        contents, config = await self.cache.prepare(self.history)
+        self.assertEqual(contents, self.history.messages)
+        self.assertIs(config, self.config)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+# python
+import asyncio
+import unittest
+
+from rate_limit import TokenBucket, CircuitBreaker, CircuitOpenError, RequestScheduler, retry_after
+
+
+class FakeClock:
+    # Monotonic clock the tests move by hand
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class APIError(Exception):
+    # Stand-in for google.genai.errors.APIError: an HTTP status in .code
+    def __init__(self, code, response=None, details=None):
+        super().__init__(f"status {code}")
+        self.code = code
+        self.response = response
+        self.details = details
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(60, clock=self.clock)
+
+    def test_refill_rate(self):
+        # 60 per minute refills one per second, up to the capacity
+        self.bucket.adjust(60)
+        self.assertEqual(self.bucket.level, 0)
+        self.clock.now += 10
+        self.bucket._refill()
+        self.assertAlmostEqual(self.bucket.level, 10)
+        self.clock.now += 1000
+        self.bucket._refill()
+        self.assertEqual(self.bucket.level, 60)
+
+    def test_adjust_may_go_negative(self):
+        # Usage above the estimate is charged afterwards and delays later callers
+        self.bucket.adjust(90)
+        self.assertEqual(self.bucket.level, -30)
+
+    def test_hold(self):
+        self.bucket.hold(5)
+        self.bucket.hold(2)
+        self.assertEqual(self.bucket.blocked_until, self.clock.now + 5)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(threshold=3, reset_seconds=30, clock=self.clock)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.before_call()
+        self.assertAlmostEqual(raised.exception.retry_after, 30)
+
+    def test_single_half_open_probe(self):
+        self.open_breaker()
+        self.clock.now += 31
+        self.assertEqual(self.breaker.state, "half-open")
+        self.assertTrue(self.breaker.before_call())
+        # Only one probe at a time
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertFalse(self.breaker.before_call())
+
+    def test_failed_probe_reopens(self):
+        self.open_breaker()
+        self.clock.now += 31
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+        self.assertEqual(self.breaker.opens, 2)
+
+
+class TestRequestScheduler(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(threshold=1, reset_seconds=30, clock=self.clock)
+        self.scheduler = RequestScheduler(
+            rpm=0, tpm=0, max_attempts=3, base_delay=0, breaker=self.breaker, clock=self.clock,
+        )
+
+    async def test_retries_transient_errors(self):
+        errors = [APIError(503), APIError(500)]
+
+        async def send():
+            if errors:
+                raise errors.pop(0)
+            return "ok"
+
+        self.breaker.threshold = 5
+        self.assertEqual(await self.scheduler.call(send, 10), "ok")
+        self.assertEqual(self.scheduler.retries, 2)
+        self.assertEqual(self.breaker.state, "closed")
+
+    async def test_client_errors_are_not_retried(self):
+        async def send():
+            raise APIError(400)
+
+        with self.assertRaises(APIError):
+            await self.scheduler.call(send, 10)
+        self.assertEqual(self.scheduler.retries, 0)
+
+    async def test_cancelled_probe_releases_breaker(self):
+        # A half-open probe that is cancelled (as losing speculative attempts
+        # are) must let a later call probe again
+        self.breaker.record_failure()
+        self.clock.now += 31
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(self.scheduler.call(hang, 10))
+        await started.wait()
+        self.assertTrue(self.breaker.probing)
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+        self.assertFalse(self.breaker.probing)
+
+        async def send():
+            return "ok"
+
+        self.assertEqual(await self.scheduler.call(send, 10), "ok")
+        self.assertEqual(self.breaker.state, "closed")
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_header_seconds(self):
+        self.assertEqual(retry_after(APIError(429, response=Response({"retry-after": "17"}))), 17)
+
+    def test_header_http_date(self):
+        error = APIError(429, response=Response({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+        # A date in the past means no wait
+        self.assertEqual(retry_after(error), 0)
+
+    def test_retry_info_in_body(self):
+        details = {"error": {"details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "1.5s"}]}}
+        self.assertEqual(retry_after(APIError(429, details=details)), 1.5)
+
+    def test_no_hint(self):
+        self.assertIsNone(retry_after(APIError(503)))
+
+
+if __name__ == "__main__":
+    unittest.main()
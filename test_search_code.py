@@ -0,0 +1,46 @@
+# python
+import os
+import shutil
+import tempfile
+import unittest
+
+from functions.search_code import search_code, release_index, _required_literals
+
+
+class TestRequiredLiterals(unittest.TestCase):
+    def test_plain_text(self):
+        self.assertEqual(_required_literals(r"def main\(\)"), ["def main()"])
+
+    def test_class_escapes_split_runs(self):
+        self.assertEqual(_required_literals(r"abc\d+xyz"), ["abc", "xyz"])
+
+    def test_hex_escapes_are_decoded(self):
+        self.assertEqual(_required_literals(r"\x41bcdef"), ["Abcdef"])
+        self.assertEqual(_required_literals(r"Abcdef"), ["Abcdef"])
+        self.assertEqual(_required_literals(r"\U00000041bcdef"), ["Abcdef"])
+
+    def test_escape_digits_and_names_are_not_literal(self):
+        # Octal escapes, backreferences and \N{...} take their digits or name with them
+        self.assertEqual(_required_literals(r"\101bcdef"), ["bcdef"])
+        self.assertEqual(_required_literals(r"(ab)cd\1efgh"), ["efgh"])
+        self.assertEqual(_required_literals(r"\N{LATIN CAPITAL LETTER A}bcdef"), ["bcdef"])
+
+
+class TestSearchCode(unittest.TestCase):
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        with open(os.path.join(self.work, "f.txt"), "w") as f:
+            f.write("Abcdef\n")
+
+    def tearDown(self):
+        release_index(os.path.abspath(self.work))
+        shutil.rmtree(self.work, ignore_errors=True)
+
+    def test_numeric_and_named_escapes_match(self):
+        for query in (r"\x41bcdef", r"\101bcdef", r"Abcdef", r"\N{LATIN CAPITAL LETTER A}bcdef"):
+            with self.subTest(query=query):
+                self.assertIn("f.txt:1", search_code(self.work, query, regex=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
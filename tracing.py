@@ -0,0 +1,185 @@
+# python
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Lightweight span tracing for agent sessions. Spans are recorded per
+# iteration, model call, tool call and subprocess run, each with wall time and
+# free-form attributes (tokens, bytes in/out, cache hits). The active tracer
+# lives in a ContextVar, so tool calls running in worker threads (which copy
+# the context) report to the session that started them.
+#
+# Each span lands on a track (a Chrome trace "thread"): by default the OS thread
+# it ran on. Concurrent asyncio sessions (batch tasks, speculative attempts)
+# all run on the event loop's thread, so their overlapping spans would share a
+# track without nesting; each of them starts its own track instead, which the
+# spans it opens on the loop thread use. Spans from worker threads stay on the
+# thread's track, where one tool call runs at a time.
+
+
+class Span:
+    def __init__(self, name, category, start_ns, tid, attrs):
+        self.name = name
+        self.category = category
+        self.start_ns = start_ns
+        self.end_ns = start_ns
+        self.tid = tid
+        self.attrs = attrs
+
+    @property
+    def seconds(self):
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._tids = {}
+        self._track_names = {}
+
+    def _tid(self):
+        track = _track.get()
+        if track is not None and track[0] is self and track[2] == threading.get_ident():
+            return track[1]
+        # Small stable thread numbers read better in trace viewers than idents
+        with self._lock:
+            return self._tids.setdefault(threading.get_ident(), len(self._tids) + len(self._track_names) + 1)
+
+    def start_track(self, name):
+        # Put the spans the current context (an asyncio task) opens from now on
+        # on a track of their own, labelled `name` in trace viewers
+        if not self.enabled:
+            return
+        with self._lock:
+            tid = len(self._tids) + len(self._track_names) + 1
+            self._track_names[tid] = name
+        _track.set((self, tid, threading.get_ident()))
+
+    @contextmanager
+    def span(self, name, category, **attrs):
+        if not self.enabled:
+            yield Span(name, category, 0, 0, attrs)
+            return
+        span = Span(name, category, time.perf_counter_ns() - self._origin_ns, self._tid(), attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns() - self._origin_ns
+            with self._lock:
+                self.spans.append(span)
+
+    def write_jsonl(self, path):
+        # One span per line, times in milliseconds since the tracer started
+        with open(path, "w") as f:
+            for span in sorted(self.spans, key=lambda s: s.start_ns):
+                f.write(json.dumps({
+                    "name": span.name,
+                    "cat": span.category,
+                    "start_ms": round(span.start_ns / 1e6, 3),
+                    "dur_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+                    "tid": span.tid,
+                    "attrs": span.attrs,
+                }, default=str) + "\n")
+
+    def write_chrome(self, path):
+        # Chrome trace-event format (complete "X" events), viewable in
+        # chrome://tracing or Perfetto
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_ns / 1e3,
+                "dur": (span.end_ns - span.start_ns) / 1e3,
+                "pid": 1,
+                "tid": span.tid,
+                "args": span.attrs,
+            }
+            for span in sorted(self.spans, key=lambda s: s.start_ns)
+        ]
+        # Metadata events naming the session tracks
+        events += [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in sorted(self._track_names.items())
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def write(self, path):
+        # The file extension picks the format: .jsonl for span lines, else Chrome trace
+        if path.endswith(".jsonl"):
+            self.write_jsonl(path)
+        else:
+            self.write_chrome(path)
+
+    def summary(self, top=5):
+        # End-of-run table: where the time went, the slowest tools and the
+        # iterations that consumed the most tokens
+        def by(category):
+            return [s for s in self.spans if s.category == category]
+
+        iterations = by("agent")
+        model = by("model")
+        tools = by("tool")
+        processes = by("process")
+        lines = []
+        total = sum(s.seconds for s in iterations)
+        lines.append(
+            f"Trace: {len(iterations)} iterations in {total:.2f}s; model {sum(s.seconds for s in model):.2f}s, "
+            f"tools {sum(s.seconds for s in tools):.2f}s serial ({len(tools)} calls, "
+            f"{sum(s.seconds for s in processes):.2f}s in {len(processes)} script runs)"
+        )
+
+        stats = {}
+        for span in tools:
+            entry = stats.setdefault(span.name, [0, 0.0, 0.0, 0, 0])
+            entry[0] += 1
+            entry[1] += span.seconds
+            entry[2] = max(entry[2], span.seconds)
+            entry[3] += span.attrs.get("bytes_out", 0)
+            entry[4] += span.attrs.get("cache_hits", 0)
+        if stats:
+            lines.append("")
+            lines.append(f"{'slowest tools':<20} {'calls':>5} {'total s':>8} {'max s':>7} {'bytes out':>10} {'hits':>5}")
+            for name, (calls, seconds, slowest, out, hits) in sorted(stats.items(), key=lambda i: -i[1][1])[:top]:
+                lines.append(f"{name:<20} {calls:>5} {seconds:>8.3f} {slowest:>7.3f} {out:>10} {hits:>5}")
+
+        if model:
+            lines.append("")
+            lines.append(f"{'token consumers':<20} {'prompt':>8} {'response':>8} {'model s':>8}")
+            heaviest = sorted(model, key=lambda s: -(s.attrs.get("prompt_tokens") or 0))[:top]
+            for span in heaviest:
+                lines.append(
+                    f"{'turn ' + str(span.attrs.get('turn')):<20} {span.attrs.get('prompt_tokens') or 0:>8} "
+                    f"{span.attrs.get('response_tokens') or 0:>8} {span.seconds:>8.3f}"
+                )
+        return "\n".join(lines)
+
+
+_disabled = Tracer(enabled=False)
+_current = ContextVar("tracer", default=_disabled)
+# (tracer, track tid, thread ident) of the session track started in this context
+_track = ContextVar("trace_track", default=None)
+
+
+def get_tracer():
+    # The tracer of the current session; a disabled one records nothing
+    return _current.get()
+
+
+def start_tracing():
+    # Trace everything run from the current context from now on
+    tracer = Tracer()
+    _current.set(tracer)
+    return tracer
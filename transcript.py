@@ -0,0 +1,305 @@
+# python
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import hashlib
+import secrets
+
+from google.genai import types
+
+from history import History
+
+from config import WORKING_DIRECTORY, SESSIONS_DIR, TRANSCRIPT_BLOB_MIN_CHARS, TRANSCRIPT_COMPRESS_MIN_BYTES
+
+# On-disk session log. Every record is a 5-byte header (payload length, kind)
+# followed by the payload, and records are only ever appended, so a crash can at
+# worst leave a torn record at the end, which the loader ignores.
+#   H  header:   JSON {"version", "created", "working_directory", "prompt", "forked_from"}
+#   M  message:  JSON {"turn", "content"}; long strings are replaced by {"$blob": hash}
+#   B  blob:     16-byte hash + UTF-8 text (only the text is compressed), written once per text
+#   F  files:    JSON {"turn", "files": {path: [mtime_ns, size, sha256] or null}}
+# The high bit of the kind byte marks a zlib-compressed payload.
+_RECORD = struct.Struct(">IB")
+_COMPRESSED = 0x80
+_HEADER, _MESSAGE, _BLOB, _FILES = b"H"[0], b"M"[0], b"B"[0], b"F"[0]
+_VERSION = 1
+_BLOB_KEY = "$blob"
+
+
+class TranscriptError(Exception):
+    # A session that can't be found or parsed
+    pass
+
+
+def _blob_hash(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _file_hash(abs_file):
+    digest = hashlib.sha256()
+    with open(abs_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def session_path(session, sessions_dir=SESSIONS_DIR):
+    return os.path.join(sessions_dir, f"{session}.log")
+
+
+def parse_fork(spec):
+    # "<session>@<turn>" -> (session, turn)
+    session, _, turn = spec.rpartition("@")
+    if not session or not turn.isdigit():
+        raise TranscriptError(f'Invalid fork "{spec}"; expected <session>@<turn>')
+    return session, int(turn)
+
+
+def touched_paths(calls):
+    # Files a turn's tool calls read or wrote, relative to the working directory
+    paths = []
+    for fc in calls:
+        args = fc.args or {}
+        if args.get("file_path"):
+            paths.append(args["file_path"])
+        paths.extend(args.get("file_paths") or [])
+        paths.extend(f.get("file_path") for f in args.get("files") or [] if f.get("file_path"))
+    return list(dict.fromkeys(paths))
+
+
+class Transcript:
+    # Append-only writer for one session log
+    def __init__(self, session, header, sessions_dir=SESSIONS_DIR, blobs=()):
+        self.session = session
+        self.header = header
+        self.path = session_path(session, sessions_dir)
+        self._blobs = set(blobs)
+        self._file = open(self.path, "ab")
+
+    @classmethod
+    def create(cls, working_directory, prompt, sessions_dir=SESSIONS_DIR, forked_from=None):
+        os.makedirs(sessions_dir, exist_ok=True)
+        session = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        header = {
+            "version": _VERSION,
+            "created": time.time(),
+            "working_directory": os.path.abspath(working_directory),
+            "prompt": prompt,
+            "forked_from": forked_from,
+        }
+        transcript = cls(session, header, sessions_dir)
+        transcript._write(_HEADER, json.dumps(header, separators=(",", ":")).encode())
+        transcript.flush()
+        return transcript
+
+    def _write(self, kind, payload, prefix=b""):
+        # The prefix (a blob's hash) is never compressed so it can be indexed cheaply
+        if len(payload) >= TRANSCRIPT_COMPRESS_MIN_BYTES:
+            packed = zlib.compress(payload, 6)
+            if len(packed) < len(payload):
+                kind, payload = kind | _COMPRESSED, packed
+        self._file.write(_RECORD.pack(len(prefix) + len(payload), kind))
+        self._file.write(prefix + payload)
+
+    def _dedupe(self, value):
+        # Move long strings (tool outputs, file contents) into blob records,
+        # writing each distinct text only once per session
+        if isinstance(value, str):
+            if len(value) < TRANSCRIPT_BLOB_MIN_CHARS:
+                return value
+            digest = _blob_hash(value)
+            if digest not in self._blobs:
+                self._write(_BLOB, value.encode(), prefix=digest)
+                self._blobs.add(digest)
+            return {_BLOB_KEY: digest.hex()}
+        if isinstance(value, dict):
+            return {k: self._dedupe(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._dedupe(v) for v in value]
+        return value
+
+    def record(self, turn, content):
+        # Append one types.Content; the model turn it belongs to is kept for --fork
+        data = self._dedupe(content.model_dump(mode="json", exclude_none=True))
+        self._write(_MESSAGE, json.dumps({"turn": turn, "content": data}, separators=(",", ":")).encode())
+        self.flush()
+
+    def record_files(self, turn, paths):
+        # Snapshot (mtime_ns, size, sha256) of files the turn touched so a resume
+        # can tell which of them changed in the meantime
+        abs_work = os.path.abspath(self.header["working_directory"])
+        files = {}
+        for path in paths:
+            abs_file = os.path.join(abs_work, path)
+            try:
+                st = os.stat(abs_file)
+                files[path] = [st.st_mtime_ns, st.st_size, _file_hash(abs_file)]
+            except OSError:
+                files[path] = None
+        self.record_state(turn, files)
+
+    def record_state(self, turn, files):
+        if files:
+            self._write(_FILES, json.dumps({"turn": turn, "files": files}, separators=(",", ":")).encode())
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Checkpoint:
+    # A session log loaded back into memory: header, (turn, Content) pairs and
+    # the last recorded state of every touched file
+    def __init__(self, session, header, messages, files, blobs, end):
+        self.session = session
+        self.header = header
+        self.messages = messages
+        self.files = files
+        self.blobs = blobs
+        self.end = end
+
+    @property
+    def last_turn(self):
+        return max((turn for turn, _ in self.messages), default=0)
+
+    def changed_files(self):
+        # Touched files whose content differs from the checkpoint; mtime and size
+        # are checked first so unchanged files are never rehashed
+        abs_work = os.path.abspath(self.header["working_directory"])
+        changed = []
+        for path, state in sorted(self.files.items()):
+            abs_file = os.path.join(abs_work, path)
+            try:
+                st = os.stat(abs_file)
+            except OSError:
+                if state is not None:
+                    changed.append(f"{path} (deleted)")
+                continue
+            if state is None:
+                changed.append(f"{path} (created)")
+            elif [st.st_mtime_ns, st.st_size] != state[:2] and _file_hash(abs_file) != state[2]:
+                changed.append(f"{path} (modified)")
+        return changed
+
+
+def _records(mm):
+    # Yield (kind, compressed, start, end) for every complete record
+    pos = 0
+    while pos + _RECORD.size <= len(mm):
+        length, kind = _RECORD.unpack_from(mm, pos)
+        start = pos + _RECORD.size
+        if start + length > len(mm):
+            break
+        yield kind & ~_COMPRESSED, bool(kind & _COMPRESSED), start, start + length
+        pos = start + length
+
+
+def _restore(value, mm, blobs):
+    if isinstance(value, dict):
+        if len(value) == 1 and _BLOB_KEY in value:
+            compressed, start, end = blobs[bytes.fromhex(value[_BLOB_KEY])]
+            payload = mm[start + 16:end]
+            return (zlib.decompress(payload) if compressed else payload).decode()
+        return {k: _restore(v, mm, blobs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_restore(v, mm, blobs) for v in value]
+    return value
+
+
+def load(session, upto_turn=None, sessions_dir=SESSIONS_DIR):
+    # Memory-map the log and rebuild the conversation without re-running any tool.
+    # Blob records are only indexed on the first pass and decoded when referenced.
+    path = session_path(session, sessions_dir)
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        raise TranscriptError(f'Session "{session}" not found in {sessions_dir}')
+    header = None
+    raw_messages = []
+    files = {}
+    blobs = {}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = 0
+        for kind, compressed, start, stop in _records(mm):
+            end = stop
+            if kind == _BLOB:
+                blobs[mm[start:start + 16]] = (compressed, start, stop)
+                continue
+            payload = mm[start:stop]
+            record = json.loads(zlib.decompress(payload) if compressed else payload)
+            if kind == _HEADER:
+                header = record
+            elif upto_turn is not None and record["turn"] > upto_turn:
+                continue
+            elif kind == _MESSAGE:
+                raw_messages.append(record)
+            elif kind == _FILES:
+                files.update(record["files"])
+        if header is None or header.get("version") != _VERSION:
+            raise TranscriptError(f'Session "{session}" has no readable header')
+        messages = [
+            (r["turn"], types.Content.model_validate(_restore(r["content"], mm, blobs)))
+            for r in raw_messages
+        ]
+    return Checkpoint(session, header, messages, files, set(blobs), end)
+
+
+def resume(session, sessions_dir=SESSIONS_DIR):
+    # Reopen a session for appending; a torn record left by a crash is cut off first
+    checkpoint = load(session, sessions_dir=sessions_dir)
+    path = session_path(session, sessions_dir)
+    if os.path.getsize(path) > checkpoint.end:
+        os.truncate(path, checkpoint.end)
+    transcript = Transcript(session, checkpoint.header, sessions_dir, blobs=checkpoint.blobs)
+    return checkpoint, transcript
+
+
+def fork(spec, sessions_dir=SESSIONS_DIR):
+    # Start a new session from the first <turn> model turns of an existing one
+    session, turn = parse_fork(spec)
+    checkpoint = load(session, upto_turn=turn, sessions_dir=sessions_dir)
+    if turn > checkpoint.last_turn:
+        raise TranscriptError(f'Session "{session}" only has {checkpoint.last_turn} turns')
+    transcript = Transcript.create(
+        checkpoint.header["working_directory"], checkpoint.header["prompt"], sessions_dir, forked_from=spec
+    )
+    for message_turn, content in checkpoint.messages:
+        transcript.record(message_turn, content)
+    transcript.record_state(turn, checkpoint.files)
+    return checkpoint, transcript
+
+
+def start_session(prompt, resume_session=None, fork_spec=None, working_directory=WORKING_DIRECTORY,
+                  sessions_dir=SESSIONS_DIR):
+    # Open the history and transcript for a run: a new session, a resumed one or
+    # a fork. Returns (history, transcript, changed files since the checkpoint).
+    if not resume_session and not fork_spec:
+        history = History(prompt)
+        transcript = Transcript.create(working_directory, prompt, sessions_dir)
+        transcript.record(0, history.messages[0])
+        return history, transcript, []
+
+    if resume_session:
+        checkpoint, transcript = resume(resume_session, sessions_dir)
+    else:
+        checkpoint, transcript = fork(fork_spec, sessions_dir)
+    history = History.restore([content for _, content in checkpoint.messages])
+    changed = checkpoint.changed_files()
+    notes = []
+    if changed:
+        notes.append(
+            "Note: these files changed since this session was checkpointed; re-read them before "
+            "relying on earlier tool output: " + ", ".join(changed)
+        )
+    if prompt:
+        notes.append(prompt)
+    for note in notes:
+        # Belongs to the next model turn, so a later --fork at this turn leaves it out
+        history.add_user(note)
+        transcript.record(history.turn + 1, history.messages[-1])
+    return history, transcript, changed